@@ -1,27 +1,32 @@
+import argparse
 import os
-import requests
+import sys
 from dotenv import load_dotenv
 import json
-import time
 from itertools import islice
 
 # Load environment variables from .env file
 load_dotenv()
-API_KEY = os.getenv('RIOT_API_KEY')
+# The shared client reads its key through the Function App runtime; take it
+# from RIOT_API_KEY in the environment instead of Key Vault
+os.environ.setdefault("SECRETS_FROM_ENV", "1")
+if os.getenv('RIOT_API_KEY'):
+    os.environ.setdefault("RiotApiKey", os.environ['RIOT_API_KEY'])
+
+# Reuse the Function App's shared Riot client (keep-alive sessions, rate limiter, retries)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "winning-odds-league-functionapp"))
+from shared_code.concurrency import run_region_lanes
+from shared_code.riot_client import riot_client
 
 # Riot API endpoints
 REGION = 'euw1'
 QUEUE = 'RANKED_SOLO_5x5'
-CHALLENGER_URL = f"https://{REGION}.api.riotgames.com/lol/league/v4/challengerleagues/by-queue/{QUEUE}"
-SUMMONER_URL_TEMPLATE = f"https://{REGION}.api.riotgames.com/lol/summoner/v4/summoners/{{summonerId}}"
-
-# Headers with API key
-headers = {
-    "X-Riot-Token": API_KEY
-}
+CHALLENGER_URL_TEMPLATE = "https://{region}.api.riotgames.com/lol/league/v4/challengerleagues/by-queue/{queue}"
+SUMMONER_URL_TEMPLATE = "https://{region}.api.riotgames.com/lol/summoner/v4/summoners/{summonerId}"
+CHALLENGER_URL = CHALLENGER_URL_TEMPLATE.format(region=REGION, queue=QUEUE)
 
 def get_challenger_players():
-    response = requests.get(CHALLENGER_URL, headers=headers)
+    response = riot_client.get(CHALLENGER_URL, REGION, "league-v4.challengerleagues")
     if response.status_code == 200:
         data = response.json()
         entries = data.get('entries', [])
@@ -34,6 +39,67 @@ def get_challenger_players():
     else:
         print(f"Failed to fetch Challenger data: {response.status_code} - {response.text}")
 
+def fetch_challenger_ids(region):
+    url = CHALLENGER_URL_TEMPLATE.format(region=region, queue=QUEUE)
+    response = riot_client.get(url, region, "league-v4.challengerleagues")
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch Challenger data for {region}: {response.status_code} - {response.text}")
+    return [player['summonerId'] for player in response.json().get('entries', [])]
+
+def read_shard(path):
+    # Summoner IDs already in an NDJSON shard. A line cut off by an interrupted
+    # run is truncated away, so appending can resume cleanly after it.
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            f.truncate(end)
+    for line in data[:end].splitlines():
+        if line.strip():
+            done.add(json.loads(line)['id'])
+    return done
+
+def append_account_info(region, summoner_ids, shard_path, batch_size=100):
+    # One summoner-v4 call per ID not yet in the shard; each result is
+    # appended as a single NDJSON line, so writes grow linearly with the output
+    done = read_shard(shard_path)
+    pending = [summoner_id for summoner_id in summoner_ids if summoner_id not in done]
+    print(f"[{region}] {len(done)} summoners already in {shard_path}, {len(pending)} to fetch.")
+
+    fetched = 0
+    failed = 0
+    total_batches = (len(pending) + batch_size - 1) // batch_size
+    with open(shard_path, 'a') as shard:
+        for batch_num, batch in enumerate(batched(pending, batch_size), start=1):
+            for summoner_id in batch:
+                url = SUMMONER_URL_TEMPLATE.format(region=region, summonerId=summoner_id)
+                response = riot_client.get(url, region, "summoner-v4.by-id")
+                if response.status_code == 200:
+                    shard.write(json.dumps(dict(response.json(), region=region)) + "\n")
+                    fetched += 1
+                else:
+                    # Not written, so the next run retries it
+                    print(f"[{region}] Failed to fetch account info for {summoner_id}: {response.status_code} - {response.text}")
+                    failed += 1
+            shard.flush()
+            print(f"[{region}] Batch {batch_num} of {total_batches} appended ({fetched} fetched, {failed} failed).")
+    return {"fetched": fetched, "failed": failed, "skipped": len(done)}
+
+def shard_path_for(out_dir, region):
+    return os.path.join(out_dir, f"challenger_account_info_{region}.ndjson")
+
+# Helper generator to create batches
+def batched(iterable, n):
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, n))
+        if not batch:
+            break
+        yield batch
+
 def get_account_info():
     # Load summoner IDs from the file
     try:
@@ -43,47 +109,72 @@ def get_account_info():
         print("summoner_ids file not found. Please run get_challenger_players() first.")
         return
 
-    account_info = []
-    batch_size = 100
-    delay_seconds = 120  # 2 minutes
-
-    # Helper generator to create batches
-    def batched(iterable, n):
-        it = iter(iterable)
-        while True:
-            batch = list(islice(it, n))
-            if not batch:
-                break
-            yield batch
-
-    total_batches = (len(summoner_ids) + batch_size - 1) // batch_size
-    for batch_num, batch in enumerate(batched(summoner_ids, batch_size), start=1):
-        print(f"Processing batch {batch_num} of {total_batches} ({len(batch)} summoner IDs)...")
-        for summoner_id in batch:
-            url = SUMMONER_URL_TEMPLATE.format(summonerId=summoner_id)
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                summoner_data = response.json()
-                account_info.append(summoner_data)
-            else:
-                print(f"Failed to fetch account info for {summoner_id}: {response.status_code} - {response.text}")
-        
-        # Save current batch's account info
-        with open(f'challenger_account_info_batch_{batch_num}.json', 'w') as f:
-            json.dump(account_info, f, indent=4)
-        print(f"Batch {batch_num} completed and saved to challenger_account_info_batch_{batch_num}.json")
-
-        if batch_num < total_batches:
-            print(f"Processed {batch_num * batch_size} calls. Waiting for 2 minutes to respect rate limits...\n")
-            time.sleep(delay_seconds)
-    
-    print("All batches processed successfully.")
+    shard_path = shard_path_for('.', REGION)
+    append_account_info(REGION, summoner_ids, shard_path)
+    print(f"All batches processed successfully; results are in {shard_path}.")
 
-if __name__ == "__main__":
+def compact_shards(out_dir, regions):
+    # Deduplicates every shard in place (latest line per summoner wins) and
+    # writes them all as one compact JSON array
+    combined = []
+    for region in regions:
+        path = shard_path_for(out_dir, region)
+        if not os.path.exists(path):
+            continue
+        read_shard(path)
+        records = {}
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record['id']] = record
+        with open(f"{path}.tmp", 'w') as f:
+            f.writelines(json.dumps(record) + "\n" for record in records.values())
+        os.replace(f"{path}.tmp", path)
+        combined.extend(records.values())
+
+    output = os.path.join(out_dir, 'challenger_account_info.json')
+    with open(f"{output}.tmp", 'w') as f:
+        json.dump(combined, f, separators=(',', ':'))
+    os.replace(f"{output}.tmp", output)
+    print(f"Compacted {len(combined)} summoners into {output}.")
+
+def backfill(regions, out_dir, compact=False):
+    # One lane per region: each platform has its own rate limits, so regions
+    # run in parallel and each appends to its own shard
+    os.makedirs(out_dir, exist_ok=True)
+
+    def backfill_region(region, _):
+        summoner_ids = fetch_challenger_ids(region)
+        print(f"[{region}] {len(summoner_ids)} Challenger players.")
+        return append_account_info(region, summoner_ids, shard_path_for(out_dir, region))
+
+    results = run_region_lanes({region: None for region in regions}, backfill_region)
+    for region in regions:
+        print(f"[{region}] {results[region]}")
+    if compact:
+        compact_shards(out_dir, regions)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Backfill Challenger account info into per-region NDJSON shards.")
+    parser.add_argument('--regions', default=REGION, help="comma-separated platforms, e.g. euw1,kr,na1")
+    parser.add_argument('--out-dir', default='.', help="directory for the shards (reruns resume from them)")
+    parser.add_argument('--compact', action='store_true', help="deduplicate the shards and write one combined JSON file")
+    return parser.parse_args(argv)
+
+def interactive():
     choice = input("Choose an action:\n1. Fetch Challenger Summoner IDs\n2. Fetch Account Info\nEnter 1 or 2: ")
     if choice == '1':
         get_challenger_players()
     elif choice == '2':
         get_account_info()
     else:
-        print("Invalid choice. Please enter 1 or 2.")
\ No newline at end of file
+        print("Invalid choice. Please enter 1 or 2.")
+
+if __name__ == "__main__":
+    # No arguments: the original interactive menu
+    if len(sys.argv) > 1:
+        args = parse_args(sys.argv[1:])
+        backfill(args.regions.split(','), args.out_dir, args.compact)
+    else:
+        interactive()
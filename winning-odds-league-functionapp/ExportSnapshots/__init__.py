@@ -0,0 +1,30 @@
+import azure.functions as func
+import json
+import logging
+
+from shared_code.runtime import db_connection
+from shared_code.telemetry import telemetry
+
+@telemetry.invocation("ExportSnapshots")
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('ExportSnapshots function processing a request.')
+
+    try:
+        # pyarrow is only imported once an export actually runs
+        from shared_code.export import EXPORT_ROOT, export_matches, export_summoners
+
+        # Summoners are exported as a full daily snapshot, matches only since
+        # the previous export
+        root = req.params.get("root", EXPORT_ROOT)
+
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            export_summoners(cursor, root)
+            exported = export_matches(cursor, root)
+
+        result = {"root": root, "participant_rows": exported}
+        return func.HttpResponse(json.dumps(result), mimetype="application/json", status_code=200)
+
+    except Exception as e:
+        logging.error(f"Error in ExportSnapshots: {e}")
+        return func.HttpResponse(f"Error occurred: {str(e)}", status_code=500)
@@ -1,80 +1,83 @@
-import os
-import pyodbc
 import azure.functions as func
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
 import logging
+import time
 
+from shared_code.concurrency import run_region_lanes
+from shared_code.match_index import match_index
+from shared_code.match_ingestion import INGEST_TIMELINES, ingest_player, schedule_players
+from shared_code.riot_api import routing_for
+from shared_code.runtime import db_connection
+from shared_code.telemetry import telemetry
+from shared_code.work_queue import MATCH_WORK_QUEUE, get_work_queue
+
+DEFAULT_MAX_PLAYERS = 500
+DEFAULT_TIME_BUDGET_SECONDS = 240
+
+@telemetry.invocation("FetchMatches")
 def main(req: func.HttpRequest) -> func.HttpResponse:
-    logging.info('WriteMyRiotMatches function processing a request.')
+    logging.info('FetchMatches function processing a request.')
     try:
-        # Retrieve SQL credentials from Key Vault via Managed Identity
-        vault_url = "https://myRiotDataKeyVault.vault.azure.net"
-        credential = DefaultAzureCredential()
-        secret_client = SecretClient(vault_url=vault_url, credential=credential)
+        max_players = int(req.params.get("max_players", DEFAULT_MAX_PLAYERS))
+        time_budget = float(req.params.get("time_budget", DEFAULT_TIME_BUDGET_SECONDS))
+        deadline = time.monotonic() + time_budget
+        timelines = req.params.get("timelines", "1" if INGEST_TIMELINES else "0") == "1"
 
-        sql_user = secret_client.get_secret("FunctionAppSqlUser").value
-        sql_password = secret_client.get_secret("FunctionAppSqlPassword").value
+        with db_connection() as conn:
+            players = schedule_players(conn.cursor(), max_players)
 
-        # Retrieve server and database from environment variables
-        sql_server = os.getenv("SQL_SERVER", "myriotdataserver.database.windows.net")
-        sql_database = os.getenv("SQL_DATABASE", "myRiotDataSQL")
+        # Fan out: one work item per player for the ProcessMatchQueue workers
+        if req.params.get("mode") == "queue":
+            get_work_queue(MATCH_WORK_QUEUE).send_many([list(player) for player in players])
+            message = f"Enqueued {len(players)} players for match ingestion."
+            logging.info(message)
+            return func.HttpResponse(message, status_code=202)
 
-        # Build connection string
-        connection_string = (
-            f"Driver={{ODBC Driver 18 for SQL Server}};"
-            f"Server=tcp:{sql_server},1433;"
-            f"Database={sql_database};"
-            f"Uid={sql_user};"
-            f"Pwd={sql_password};"
-            "Encrypt=yes;"
-            "TrustServerCertificate=no;"
-            "Connection Timeout=30;"
-        )
+        # One lane per routing cluster: euw1 and eun1 share the europe quota
+        players_by_routing = {}
+        for player in players:
+            players_by_routing.setdefault(routing_for(player[1]), []).append(player)
 
-        # Connect & create table if not exists
-        with pyodbc.connect(connection_string, autocommit=True) as conn:
-            cursor = conn.cursor()
-            create_table_sql = """
-            IF NOT EXISTS (
-                SELECT *
-                FROM sys.tables
-                WHERE name = 'myRiotMatches'
-            )
-            BEGIN
-                CREATE TABLE myRiotMatches (
-                    ID INT IDENTITY(1,1) PRIMARY KEY,
-                    MatchID INT NOT NULL,
-                    PlayerName VARCHAR(100) NOT NULL,
-                    Score INT NOT NULL
-                );
-            END
-            """
-            cursor.execute(create_table_sql)
+        def ingest_routing(routing, routing_players):
+            stats = {"players": 0, "matches": 0, "remaining": 0, "failed": 0}
+            with db_connection() as lane_conn:
+                lane_cursor = lane_conn.cursor()
+                for index, player in enumerate(routing_players):
+                    if time.monotonic() >= deadline:
+                        stats["remaining"] = len(routing_players) - index
+                        logging.info(f"Time budget reached for {routing}; {stats['remaining']} players left for the next run.")
+                        break
 
-            # Insert sample data
-            sample_data = [
-                (1, 'Player1', 15),
-                (2, 'Player2', 30),
-                (3, 'Player2', 50)
-            ]
-            for match_id, player_name, score in sample_data:
-                cursor.execute(
-                    """
-                    INSERT INTO myRiotMatches (MatchID, PlayerName, Score)
-                    VALUES (?, ?, ?)
-                    """,
-                    (match_id, player_name, score)
-                )
+                    # One bad player must not stop the rest of the routing
+                    # cluster; their watermark stays put and they are retried
+                    try:
+                        inserted, complete = ingest_player(lane_cursor, routing, player, timelines, deadline)
+                    except Exception as e:
+                        logging.error(f"Error ingesting matches for {player[0]} on {routing}: {e}")
+                        stats["failed"] += 1
+                        continue
+                    stats["matches"] += inserted
+                    if not complete:
+                        stats["remaining"] = len(routing_players) - index
+                        break
+                    stats["players"] += 1
+            return stats
 
-        return func.HttpResponse(
-            "myRiotMatches table created (if not existing) and sample data inserted!",
-            status_code=200
-        )
+        try:
+            results = run_region_lanes(players_by_routing, ingest_routing)
+        finally:
+            match_index.save()
+        synced = sum(r["players"] for r in results.values())
+        ingested = sum(r["matches"] for r in results.values())
+        remaining = sum(r["remaining"] for r in results.values())
+        failed = sum(r["failed"] for r in results.values())
+
+        message = f"Synced {synced} players, ingested {ingested} new matches, {failed} failed, {remaining} players remaining."
+        logging.info(message)
+        return func.HttpResponse(message, status_code=200)
 
     except Exception as e:
-        logging.error(f"Error in WriteMyRiotMatches: {e}")
+        logging.error(f"Error in FetchMatches: {e}")
         return func.HttpResponse(
             f"Error occurred: {str(e)}",
             status_code=500
-        )
\ No newline at end of file
+        )
@@ -1,102 +1,91 @@
-import os
-import pyodbc
 import azure.functions as func
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
 import logging
-import requests
 import time
 
+from shared_code.concurrency import group_by_region, run_region_lanes
+from shared_code.identity_index import identity_index
+from shared_code.puuids import commit_batch, fetch_puuids, select_pending_summoners
+from shared_code.runtime import db_connection
+from shared_code.telemetry import telemetry
+from shared_code.work_queue import PUUID_WORK_QUEUE, get_work_queue
+
+DEFAULT_TIME_BUDGET_SECONDS = 240
+# Summoners per queue message; small items keep each worker invocation short
+QUEUE_ITEM_SIZE = 20
+
+@telemetry.invocation("FetchPuuids")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('FetchPuuids function processing a request.')
 
     try:
-        # Retrieve SQL credentials from Key Vault via Managed Identity
-        vault_url = "https://myRiotDataKeyVault.vault.azure.net"
-        credential = DefaultAzureCredential()
-        secret_client = SecretClient(vault_url=vault_url, credential=credential)
-
-        sql_user = secret_client.get_secret("FunctionAppSqlUser").value
-        sql_password = secret_client.get_secret("FunctionAppSqlPassword").value
-
-        # Retrieve server and database from environment variables
-        sql_server = os.getenv("SQL_SERVER", "myriotdataserver.database.windows.net")
-        sql_database = os.getenv("SQL_DATABASE", "myRiotDataSQL")
-
-        # Build connection string
-        connection_string = (
-            f"Driver={{ODBC Driver 18 for SQL Server}};"
-            f"Server=tcp:{sql_server},1433;"
-            f"Database={sql_database};"
-            f"Uid={sql_user};"
-            f"Pwd={sql_password};"
-            "Encrypt=yes;"
-            "TrustServerCertificate=no;"
-            "Connection Timeout=30;"
-        )
-
-        # Riot API Key
-        riot_api_key = secret_client.get_secret("RiotApiKey").value
-        if not riot_api_key:
-            raise ValueError("RiotApiKey is not set in Key Vault!")
-
-        headers = {"X-Riot-Token": riot_api_key}
+        # Time budget per invocation; whatever is left is picked up by the next run
+        time_budget = float(req.params.get("time_budget", DEFAULT_TIME_BUDGET_SECONDS))
+        deadline = time.monotonic() + time_budget
 
         # Fetch summoners without PUUID
-        with pyodbc.connect(connection_string, autocommit=True) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT SummonerID, Region FROM Summoners WHERE PUUID IS NULL")
-            rows = cursor.fetchall()
-
-            batch_size = 100
-            all_batches_success = True
-            all_batch_puuids = []
-
-            for i in range(0, len(rows), batch_size):
-                batch = rows[i:i + batch_size]
-                batch_success = True
-                batch_puuids = []
-
-                for summoner_id, region in batch:
-                    puuid_url = f"https://{region}.api.riotgames.com/lol/summoner/v4/summoners/{summoner_id}"
-                    response = requests.get(puuid_url, headers=headers)
-
-                    if response.status_code == 200:
-                        puuid = response.json()["puuid"]
-                        batch_puuids.append((puuid, summoner_id, region))
-                    else:
-                        batch_success = False
-                        logging.error(f"Failed to fetch PUUID for SummonerID {summoner_id} in {region}: {response.text}")
+        with db_connection() as conn:
+            rows = select_pending_summoners(conn.cursor())
+
+        # Fan out: hand the backlog to ProcessPuuidQueue workers instead
+        if req.params.get("mode") == "queue":
+            queue = get_work_queue(PUUID_WORK_QUEUE)
+            items = [
+                {"region": region, "summoner_ids": [row[0] for row in region_rows[i:i + QUEUE_ITEM_SIZE]]}
+                for region, region_rows in group_by_region(rows).items()
+                for i in range(0, len(region_rows), QUEUE_ITEM_SIZE)
+            ]
+            queue.send_many(items)
+            message = f"Enqueued {len(items)} work items covering {len(rows)} summoners."
+            logging.info(message)
+            return func.HttpResponse(message, status_code=202)
+
+        with db_connection() as conn:
+            identity_index.refresh(conn.cursor())
+
+        batch_size = 100
+
+        # Each region has its own rate budget, so fetch regions concurrently.
+        # Every lane commits its own batches over its own pooled connection.
+        def fetch_region(region, region_rows):
+            stats = {"updated": 0, "failed": 0, "remaining": 0}
+            with db_connection() as lane_conn:
+                lane_cursor = lane_conn.cursor()
+                for i in range(0, len(region_rows), batch_size):
+                    if time.monotonic() >= deadline:
+                        stats["remaining"] = len(region_rows) - i
+                        logging.info(f"Time budget reached for {region}; {stats['remaining']} summoners left for the next run.")
                         break
 
-                if batch_success:
-                    all_batch_puuids.extend(batch_puuids)
-                    logging.info(f"Successfully processed batch starting with SummonerID {batch[0][0]}")
-                else:
-                    all_batches_success = False
-                    logging.error(f"Batch starting with SummonerID {batch[0][0]} failed. Aborting further processing.")
-                    break
-
-                # Respect Riot API rate limits
-                logging.info("Waiting 2 minutes to respect Riot API rate limits...")
-                time.sleep(120)
-
-            if all_batches_success:
-                for puuid, summoner_id, region in all_batch_puuids:
-                    cursor.execute(
-                        """
-                        UPDATE Summoners
-                        SET PUUID = ?
-                        WHERE SummonerID = ? AND Region = ?
-                        """,
-                        puuid, summoner_id, region
-                    )
-                logging.info("All batches succeeded. Database successfully updated.")
-                return func.HttpResponse("PUUIDs fetched and database updated successfully!", status_code=200)
-            else:
-                logging.error("Not all batches succeeded. No updates were made to the database.")
-                return func.HttpResponse("Failed to process all batches. No updates were made.", status_code=500)
+                    # A batch can take minutes at dev-key rates, so the
+                    # deadline is also checked per summoner inside it; what
+                    # was fetched before it is still committed
+                    batch = region_rows[i:i + batch_size]
+                    batch_puuids, batch_failures = fetch_puuids(region, [row[0] for row in batch], deadline)
+                    commit_batch(lane_cursor, batch_puuids, batch_failures)
+                    stats["updated"] += len(batch_puuids)
+                    stats["failed"] += len(batch_failures)
+                    logging.info(f"Committed batch starting with SummonerID {batch[0][0]} ({len(batch_puuids)} updated, {len(batch_failures)} failed)")
+                    unfinished = len(batch) - len(batch_puuids) - len(batch_failures)
+                    if unfinished > 0:
+                        stats["remaining"] = len(region_rows) - i - len(batch) + unfinished
+                        logging.info(f"Time budget reached for {region}; {stats['remaining']} summoners left for the next run.")
+                        break
+            return stats
+
+        try:
+            results = run_region_lanes(group_by_region(rows), fetch_region)
+        finally:
+            identity_index.save()
+        updated = sum(r["updated"] for r in results.values())
+        failed = sum(r["failed"] for r in results.values())
+        remaining = sum(r["remaining"] for r in results.values())
+
+        message = f"PUUIDs fetched: {updated} updated, {failed} failed (queued for retry), {remaining} remaining."
+        if remaining:
+            message += " Time budget reached; run again to continue."
+        logging.info(message)
+        return func.HttpResponse(message, status_code=200)
 
     except Exception as e:
         logging.error(f"Error in FetchPuuids: {e}")
-        return func.HttpResponse(f"Error occurred: {str(e)}", status_code=500)
\ No newline at end of file
+        return func.HttpResponse(f"Error occurred: {str(e)}", status_code=500)
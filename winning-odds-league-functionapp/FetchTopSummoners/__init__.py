@@ -1,60 +1,67 @@
-import os
-import pyodbc
 import azure.functions as func
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
+import hashlib
 import logging
-import requests
-import time
-
-def connect_to_database(connection_string, retries=3, delay=5):
-    for attempt in range(retries):
-        try:
-            logging.info(f"Attempting to connect to the database (Attempt {attempt + 1}/{retries})...")
-            conn = pyodbc.connect(connection_string, autocommit=True)
-            logging.info("Database connection established successfully.")
-            return conn
-        except pyodbc.Error as e:
-            logging.warning(f"Database connection attempt {attempt + 1} failed: {e}")
-            if attempt < retries - 1:
-                logging.info(f"Retrying in {delay} seconds...")
-                time.sleep(delay)
-            else:
-                logging.error("All retry attempts to connect to the database failed.")
-                raise
 
+from shared_code.bulk_write import stage_rows
+from shared_code.concurrency import run_region_lanes
+from shared_code.riot_client import riot_client
+from shared_code.runtime import db_connection
+from shared_code.telemetry import telemetry
+
+CREATE_SUMMONERS_TABLE_SQL = """
+IF NOT EXISTS (
+    SELECT *
+    FROM sys.tables
+    WHERE name = 'Summoners'
+)
+BEGIN
+    CREATE TABLE Summoners (
+        ID INT IDENTITY(1,1) PRIMARY KEY,
+        SummonerID VARCHAR(100) NOT NULL,
+        Rank VARCHAR(50) NOT NULL,
+        Region VARCHAR(10) NOT NULL,
+        PUUID VARCHAR(100) NULL
+    );
+END
+
+-- League fields and the row hash used for delta syncs
+IF COL_LENGTH('Summoners', 'RowHash') IS NULL
+BEGIN
+    ALTER TABLE Summoners ADD
+        LeaguePoints INT NULL,
+        Wins INT NULL,
+        Losses INT NULL,
+        HotStreak BIT NULL,
+        Inactive BIT NULL,
+        RowHash BINARY(20) NULL;
+END
+"""
+
+SUMMONER_STAGING_COLUMNS = [
+    ("SummonerID", "VARCHAR(100) NOT NULL"),
+    ("Region", "VARCHAR(10) NOT NULL"),
+    ("Rank", "VARCHAR(50) NOT NULL"),
+    ("LeaguePoints", "INT NOT NULL"),
+    ("Wins", "INT NOT NULL"),
+    ("Losses", "INT NOT NULL"),
+    ("HotStreak", "BIT NOT NULL"),
+    ("Inactive", "BIT NOT NULL"),
+    ("RowHash", "BINARY(20) NOT NULL"),
+]
+
+def summoner_row_hash(summoner):
+    # Everything we store from the league entry; unchanged players hash the same
+    fields = (
+        summoner["rank"], summoner["leaguePoints"], summoner["wins"],
+        summoner["losses"], summoner["hotStreak"], summoner["inactive"],
+    )
+    return hashlib.sha1("|".join(str(f) for f in fields).encode()).digest()
+
+@telemetry.invocation("FetchTopSummoners")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('FetchTopSummoners function processing a request.')
 
     try:
-        # Retrieve SQL credentials from Key Vault
-        vault_url = "https://myRiotDataKeyVault.vault.azure.net"
-        credential = DefaultAzureCredential()
-        secret_client = SecretClient(vault_url=vault_url, credential=credential)
-
-        sql_user = secret_client.get_secret("FunctionAppSqlUser").value
-        sql_password = secret_client.get_secret("FunctionAppSqlPassword").value
-
-        # Retrieve server and database from environment variables
-        sql_server = os.getenv("SQL_SERVER", "myriotdataserver.database.windows.net")
-        sql_database = os.getenv("SQL_DATABASE", "myRiotDataSQL")
-
-        # Build connection string
-        connection_string = (
-            f"Driver={{ODBC Driver 18 for SQL Server}};"
-            f"Server=tcp:{sql_server},1433;"
-            f"Database={sql_database};"
-            f"Uid={sql_user};"
-            f"Pwd={sql_password};"
-            "Encrypt=yes;"
-            "TrustServerCertificate=no;"
-            "Connection Timeout=30;"
-        )
-
-        # Riot API Key
-        riot_api_key = secret_client.get_secret("RiotApiKey").value
-        headers = {"X-Riot-Token": riot_api_key}
-
         # Regions and ranks to fetch
         regions = ["euw1", "eun1", "kr", "na1"]
         ranks = [
@@ -62,19 +69,14 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             ("grandmaster", "Grandmaster"),
         ]
 
-        # Fetch summoner data from Riot API
-        summoners = []
+        # Fetch summoner data from Riot API, one concurrent lane per region
         base_url = "https://{region}.api.riotgames.com/lol/league/v4/{rank}leagues/by-queue/RANKED_SOLO_5x5"
-        for region in regions:
-            for api_rank, rank_label in ranks:
-                url = base_url.format(region=region, rank=api_rank)
-                response = requests.get(url, headers=headers)
 
-                if response.status_code == 429:  # Rate limit exceeded
-                    retry_after = int(response.headers.get("Retry-After", 60))
-                    logging.warning(f"Rate limit exceeded. Retrying after {retry_after} seconds...")
-                    time.sleep(retry_after)
-                    continue
+        def fetch_region(region, region_ranks):
+            region_summoners = []
+            for api_rank, rank_label in region_ranks:
+                url = base_url.format(region=region, rank=api_rank)
+                response = riot_client.get(url, region, f"league-v4.{api_rank}leagues")
 
                 if response.status_code != 200:
                     raise Exception(f"Failed to fetch {rank_label} summoners for {region}: {response.text}")
@@ -84,83 +86,89 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                     raise Exception(f"Unexpected API response format: {league_data}")
 
                 for entry in league_data["entries"]:
-                    summoners.append({
+                    region_summoners.append({
                         "summonerID": entry["summonerId"],
                         "rank": rank_label,
-                        "region": region
+                        "region": region,
+                        "leaguePoints": entry.get("leaguePoints", 0),
+                        "wins": entry.get("wins", 0),
+                        "losses": entry.get("losses", 0),
+                        "hotStreak": bool(entry.get("hotStreak", False)),
+                        "inactive": bool(entry.get("inactive", False))
                     })
+            return region_summoners
+
+        results = run_region_lanes({region: ranks for region in regions}, fetch_region)
+        summoners = [s for region in regions for s in results[region]]
 
         # Ensure summoners are fetched
         if not summoners:
             logging.info("No summoners fetched from the API.")
             return func.HttpResponse("No summoners fetched from the API.", status_code=204)
 
-        # Update SQL database
-        with connect_to_database(connection_string) as conn:
+        # Update SQL database with only the rows that changed since the last run
+        with db_connection() as conn:
             cursor = conn.cursor()
-
-            # Ensure the Summoners table exists
-            create_table_sql = """
-            IF NOT EXISTS (
-                SELECT *
-                FROM sys.tables
-                WHERE name = 'Summoners'
-            )
-            BEGIN
-                CREATE TABLE Summoners (
-                    ID INT IDENTITY(1,1) PRIMARY KEY,
-                    SummonerID VARCHAR(100) NOT NULL,
-                    Rank VARCHAR(50) NOT NULL,
-                    Region VARCHAR(10) NOT NULL,
-                    PUUID VARCHAR(100) NULL
-                );
-            END
-            """
-            cursor.execute(create_table_sql)
-
-            # Create a temporary table for new data
-            cursor.execute("DROP TABLE IF EXISTS #TempSummoners;")
-            cursor.execute("""
-            CREATE TABLE #TempSummoners (
-                SummonerID VARCHAR(100) NOT NULL,
-                Rank VARCHAR(50) NOT NULL,
-                Region VARCHAR(10) NOT NULL
-            );
-            """)
-
-            # Insert new data into the temporary table
-            cursor.executemany(
-                """
-                INSERT INTO #TempSummoners (SummonerID, Rank, Region)
-                VALUES (?, ?, ?);
-                """,
-                [(s["summonerID"], s["rank"], s["region"]) for s in summoners]
-            )
-
-            # Merge data into the main table
-            cursor.execute("""
-            MERGE INTO Summoners AS Target
-            USING #TempSummoners AS Source
-            ON Target.SummonerID = Source.SummonerID AND Target.Region = Source.Region
-            WHEN MATCHED THEN
-                UPDATE SET Rank = Source.Rank
-            WHEN NOT MATCHED THEN
-                INSERT (SummonerID, Rank, Region)
-                VALUES (Source.SummonerID, Source.Rank, Source.Region);
-            """)
-
-            # Remove outdated entries
-            cursor.execute("""
-            DELETE FROM Summoners
-            WHERE NOT EXISTS (
-                SELECT 1
-                FROM #TempSummoners AS Temp
-                WHERE Summoners.SummonerID = Temp.SummonerID
-                AND Summoners.Region = Temp.Region
-            );
-            """)
-
-        return func.HttpResponse("Summoners table updated successfully!", status_code=200)
+            cursor.execute(CREATE_SUMMONERS_TABLE_SQL)
+
+            cursor.execute("SELECT SummonerID, Region, RowHash FROM Summoners")
+            stored_hashes = {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+
+            changed_rows = []
+            fresh_keys = set()
+            for s in summoners:
+                key = (s["summonerID"], s["region"])
+                fresh_keys.add(key)
+                row_hash = summoner_row_hash(s)
+                if stored_hashes.get(key) != row_hash:
+                    changed_rows.append((
+                        s["summonerID"], s["region"], s["rank"], s["leaguePoints"],
+                        s["wins"], s["losses"], s["hotStreak"], s["inactive"], row_hash
+                    ))
+            removed_keys = [key for key in stored_hashes if key not in fresh_keys]
+            inserted = sum(1 for row in changed_rows if (row[0], row[1]) not in stored_hashes)
+
+            if changed_rows:
+                stage_rows(cursor, "#ChangedSummoners", SUMMONER_STAGING_COLUMNS, changed_rows)
+                with telemetry.span("sql.merge_summoners", rows=len(changed_rows)):
+                    cursor.execute("""
+                    MERGE INTO Summoners AS Target
+                    USING #ChangedSummoners AS Source
+                    ON Target.SummonerID = Source.SummonerID AND Target.Region = Source.Region
+                    WHEN MATCHED THEN
+                        UPDATE SET
+                            Rank = Source.Rank,
+                            LeaguePoints = Source.LeaguePoints,
+                            Wins = Source.Wins,
+                            Losses = Source.Losses,
+                            HotStreak = Source.HotStreak,
+                            Inactive = Source.Inactive,
+                            RowHash = Source.RowHash
+                    WHEN NOT MATCHED THEN
+                        INSERT (SummonerID, Rank, Region, LeaguePoints, Wins, Losses, HotStreak, Inactive, RowHash)
+                        VALUES (Source.SummonerID, Source.Rank, Source.Region, Source.LeaguePoints, Source.Wins,
+                                Source.Losses, Source.HotStreak, Source.Inactive, Source.RowHash);
+                    """)
+                telemetry.count("sql.rows_written", len(changed_rows), table="Summoners")
+
+            # Remove players that dropped out of the ladder
+            if removed_keys:
+                stage_rows(cursor, "#RemovedSummoners", SUMMONER_STAGING_COLUMNS[:2], removed_keys)
+                with telemetry.span("sql.delete_summoners", rows=len(removed_keys)):
+                    cursor.execute("""
+                    DELETE s
+                    FROM Summoners AS s
+                    INNER JOIN #RemovedSummoners AS r
+                        ON s.SummonerID = r.SummonerID AND s.Region = r.Region;
+                    """)
+
+        message = (
+            f"Summoners table updated successfully! {inserted} inserted, "
+            f"{len(changed_rows) - inserted} changed, {len(removed_keys)} removed, "
+            f"{len(summoners) - len(changed_rows)} unchanged."
+        )
+        logging.info(message)
+        return func.HttpResponse(message, status_code=200)
 
     except Exception as e:
         logging.error(f"Error in FetchTopSummoners: {e}")
@@ -0,0 +1,45 @@
+import azure.functions as func
+import json
+import logging
+
+from shared_code.aggregates import bump_version
+from shared_code.odds_engine import WinOddsModel, last_fitted_at, load_match_arrays, load_model, save_model
+from shared_code.runtime import db_connection
+from shared_code.telemetry import telemetry
+
+@telemetry.invocation("FitOddsModel")
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('FitOddsModel function processing a request.')
+
+    try:
+        # Full refit by default; incremental=1 only folds in matches ingested
+        # since the last fit, starting from the stored coefficients
+        incremental = req.params.get("incremental") == "1"
+        l2 = float(req.params.get("l2", 1.0))
+
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            if incremental:
+                model = load_model(cursor)
+                arrays = load_match_arrays(cursor, since=last_fitted_at(cursor))
+            else:
+                model = WinOddsModel()
+                arrays = load_match_arrays(cursor)
+
+            if len(arrays) == 0:
+                return func.HttpResponse("No new matches to fit.", status_code=200)
+
+            model.fit(arrays, l2=l2, incremental=incremental)
+            save_model(cursor, model)
+            # Odds caches serve the model too; make them reload it
+            bump_version(cursor)
+
+        metrics = model.evaluate(arrays)
+        metrics["champions"] = int(len(model.champion_ids))
+        metrics["incremental"] = incremental
+        logging.info(f"Odds model saved: {metrics}")
+        return func.HttpResponse(json.dumps(metrics), mimetype="application/json", status_code=200)
+
+    except Exception as e:
+        logging.error(f"Error in FitOddsModel: {e}")
+        return func.HttpResponse(f"Error occurred: {str(e)}", status_code=500)
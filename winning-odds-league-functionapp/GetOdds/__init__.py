@@ -0,0 +1,64 @@
+import azure.functions as func
+import json
+import logging
+
+from shared_code.aggregates import AggregateCache, aggregate_cache
+from shared_code.lazy import lazy_import
+from shared_code.runtime import db_connection
+from shared_code.telemetry import telemetry
+
+np = lazy_import("numpy")
+
+def parse_team(value):
+    champions = [int(c) for c in value.split(",") if c.strip()]
+    if len(champions) != 5:
+        raise ValueError("A team needs exactly 5 champion IDs.")
+    return champions
+
+def win_odds(games, wins):
+    if games == 0:
+        return {"games": 0, "wins": 0, "win_rate": None, "odds": None}
+    losses = games - wins
+    return {
+        "games": games,
+        "wins": wins,
+        "win_rate": wins / games,
+        "odds": wins / losses if losses else None,
+    }
+
+@telemetry.invocation("GetOdds")
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    # Served from the in-memory aggregate cache; no SQL on the request path
+    # except the very first load on a cold instance.
+    try:
+        aggregate_cache.ensure_fresh(db_connection)
+
+        region = req.params.get("region", AggregateCache.ALL).lower()
+        tier = req.params.get("tier", AggregateCache.ALL)
+        tier = AggregateCache.ALL if tier.lower() == AggregateCache.ALL else tier.capitalize()
+        result = {"region": region, "tier": tier, "version": aggregate_cache.version}
+
+        if req.params.get("blue") and req.params.get("red"):
+            # Team composition odds from the fitted model
+            blue = np.array([parse_team(req.params["blue"])])
+            red = np.array([parse_team(req.params["red"])])
+            result["blue_win_probability"] = float(aggregate_cache.model.predict(blue, red)[0])
+        elif req.params.get("champion"):
+            champion = int(req.params["champion"])
+            result["champion"] = champion
+            if req.params.get("opponent"):
+                opponent = int(req.params["opponent"])
+                result["opponent"] = opponent
+                result.update(win_odds(*aggregate_cache.matchup(champion, opponent, region, tier)))
+            else:
+                result.update(win_odds(*aggregate_cache.champion(champion, region, tier)))
+        else:
+            return func.HttpResponse("Pass champion (and optionally opponent), or blue and red teams.", status_code=400)
+
+        return func.HttpResponse(json.dumps(result), mimetype="application/json", status_code=200)
+
+    except ValueError as e:
+        return func.HttpResponse(f"Invalid request: {str(e)}", status_code=400)
+    except Exception as e:
+        logging.error(f"Error in GetOdds: {e}")
+        return func.HttpResponse(f"Error occurred: {str(e)}", status_code=500)
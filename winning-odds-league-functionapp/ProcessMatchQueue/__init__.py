@@ -0,0 +1,45 @@
+import azure.functions as func
+import json
+import logging
+import os
+import time
+
+from shared_code.identity_index import identity_index
+from shared_code.match_index import match_index
+from shared_code.match_ingestion import ingest_player
+from shared_code.riot_api import routing_for
+from shared_code.runtime import db_connection
+from shared_code.telemetry import telemetry
+from shared_code.work_queue import MATCH_WORK_QUEUE, get_work_queue
+
+# Per work item, well inside the host timeout: up to batchSize items run at
+# once on an instance and share one regional quota
+ITEM_TIME_BUDGET_SECONDS = float(os.getenv("MATCH_QUEUE_ITEM_BUDGET_SECONDS", "120"))
+
+@telemetry.invocation("ProcessMatchQueue")
+def main(msg: func.QueueMessage) -> None:
+    # Work item: [puuid, region, last_start_time, games_now], as scheduled by
+    # FetchMatches. Raising makes the host retry and eventually poison it.
+    player = tuple(json.loads(msg.get_body().decode("utf-8")))
+    routing = routing_for(player[1])
+    logging.info(f"ProcessMatchQueue: player on {routing} (dequeue count {msg.dequeue_count}).")
+
+    deadline = time.monotonic() + ITEM_TIME_BUDGET_SECONDS
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        # Picks up matches other instances stored since the last message
+        if match_index.refresh_if_stale(cursor):
+            match_index.save()
+        identity_index.refresh(cursor)
+        inserted, complete = ingest_player(cursor, routing, player, deadline=deadline)
+    logging.info(f"ProcessMatchQueue: ingested {inserted} new matches.")
+
+    # Out of time is not a failure: the message completes instead of counting
+    # towards maxDequeueCount. The watermark hasn't moved, so a follow-up item
+    # carries on where this one stopped (stored matches are skipped); without
+    # progress the player is left to the next scheduling run.
+    if not complete:
+        if inserted:
+            get_work_queue(MATCH_WORK_QUEUE).send_many([list(player)])
+        logging.info(f"ProcessMatchQueue: time budget reached; {'re-enqueued' if inserted else 'left for the scheduler'}.")
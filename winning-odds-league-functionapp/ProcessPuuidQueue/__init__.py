@@ -0,0 +1,25 @@
+import azure.functions as func
+import json
+import logging
+
+from shared_code.identity_index import identity_index
+from shared_code.puuids import process_puuid_batch
+from shared_code.runtime import db_connection
+from shared_code.telemetry import telemetry
+
+@telemetry.invocation("ProcessPuuidQueue")
+def main(msg: func.QueueMessage) -> None:
+    # Work item: {"region": "euw1", "summoner_ids": [...]}. Raising makes the
+    # host retry the message and poison it after maxDequeueCount attempts.
+    item = json.loads(msg.get_body().decode("utf-8"))
+    region = item["region"]
+    logging.info(f"ProcessPuuidQueue: {len(item['summoner_ids'])} summoners in {region} (dequeue count {msg.dequeue_count}).")
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        identity_index.refresh(cursor)
+        updated, failed = process_puuid_batch(cursor, region, item["summoner_ids"])
+    # A warm worker handles many items; persist what it resolved so the
+    # overlay stays small and other workers on the host can map it
+    identity_index.save_if_grown()
+    logging.info(f"ProcessPuuidQueue: {updated} updated, {failed} failed in {region}.")
@@ -0,0 +1,121 @@
+"""Rows/sec for the old row-by-row writes vs. the shared bulk-write layer.
+
+Needs a scratch SQL Server database, e.g. a local container:
+
+    docker run -e ACCEPT_EULA=Y -e MSSQL_SA_PASSWORD=... -p 1433:1433 mcr.microsoft.com/mssql/server:2022-latest
+    export BENCH_SQL_CONNECTION_STRING="Driver={ODBC Driver 18 for SQL Server};Server=localhost;Uid=sa;Pwd=...;TrustServerCertificate=yes;"
+    python benchmarks/bench_bulk_write.py --rows 6000 --chunk-sizes 500,1000,5000 --output bulk_write.json
+
+--output records every row of the table (label, rows, seconds, rows/sec) with
+the server version, so before/after numbers can be quoted from the same run.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+import pyodbc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared_code.bulk_write import bulk_update, stage_rows
+
+REGIONS = ["euw1", "eun1", "kr", "na1"]
+
+STAGING_COLUMNS = [
+    ("SummonerID", "VARCHAR(100) NOT NULL"),
+    ("Rank", "VARCHAR(50) NOT NULL"),
+    ("Region", "VARCHAR(10) NOT NULL"),
+]
+
+PUUID_COLUMNS = [
+    ("PUUID", "VARCHAR(100) NOT NULL"),
+    ("SummonerID", "VARCHAR(100) NOT NULL"),
+    ("Region", "VARCHAR(10) NOT NULL"),
+]
+
+
+def make_rows(count):
+    return [(uuid.uuid4().hex + uuid.uuid4().hex[:15], "Challenger", REGIONS[i % len(REGIONS)]) for i in range(count)]
+
+
+def reset_table(cursor, rows):
+    cursor.execute("DROP TABLE IF EXISTS BenchSummoners;")
+    cursor.execute("""
+    CREATE TABLE BenchSummoners (
+        ID INT IDENTITY(1,1) PRIMARY KEY,
+        SummonerID VARCHAR(100) NOT NULL,
+        Rank VARCHAR(50) NOT NULL,
+        Region VARCHAR(10) NOT NULL,
+        PUUID VARCHAR(100) NULL
+    );
+    """)
+    stage_rows(cursor, "#Seed", STAGING_COLUMNS, rows)
+    cursor.execute("INSERT INTO BenchSummoners (SummonerID, Rank, Region) SELECT SummonerID, Rank, Region FROM #Seed;")
+
+
+def timed(label, count, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {count:>7} rows  {elapsed:8.2f}s  {count / elapsed:10.0f} rows/s")
+    return {"label": label, "rows": count, "seconds": round(elapsed, 3), "rows_per_second": round(count / elapsed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=6000)
+    parser.add_argument("--chunk-sizes", default="500,1000,5000")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    connection_string = os.environ["BENCH_SQL_CONNECTION_STRING"]
+    rows = make_rows(args.rows)
+    updates = [(uuid.uuid4().hex * 2, summoner_id, region) for summoner_id, _, region in rows]
+    results = []
+
+    with pyodbc.connect(connection_string, autocommit=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT @@VERSION")
+        server = cursor.fetchone()[0].splitlines()[0]
+
+        # Before: plain executemany into the temp table (FetchTopSummoners)
+        def plain_executemany():
+            cursor.execute("DROP TABLE IF EXISTS #TempSummoners;")
+            cursor.execute("CREATE TABLE #TempSummoners (SummonerID VARCHAR(100) NOT NULL, Rank VARCHAR(50) NOT NULL, Region VARCHAR(10) NOT NULL);")
+            cursor.fast_executemany = False
+            cursor.executemany("INSERT INTO #TempSummoners (SummonerID, Rank, Region) VALUES (?, ?, ?);", rows)
+        results.append(timed("staging insert, plain executemany", len(rows), plain_executemany))
+
+        # Before: one UPDATE round trip per row (FetchPuuids)
+        reset_table(cursor, rows)
+        def row_by_row():
+            cursor.fast_executemany = False
+            for puuid, summoner_id, region in updates:
+                cursor.execute("UPDATE BenchSummoners SET PUUID = ? WHERE SummonerID = ? AND Region = ?", puuid, summoner_id, region)
+        results.append(timed("PUUID update, row by row", len(updates), row_by_row))
+
+        # After: array-bound staging + set-based statements
+        for chunk_size in [int(c) for c in args.chunk_sizes.split(",")]:
+            results.append(timed(
+                f"staging insert, fast_executemany (chunk {chunk_size})",
+                len(rows),
+                lambda: stage_rows(cursor, "#TempSummoners", STAGING_COLUMNS, rows, chunk_size),
+            ))
+            reset_table(cursor, rows)
+            results.append(timed(
+                f"PUUID update, staged UPDATE FROM (chunk {chunk_size})",
+                len(updates),
+                lambda: bulk_update(cursor, "BenchSummoners", "#PuuidUpdates", PUUID_COLUMNS, ["SummonerID", "Region"], updates, chunk_size),
+            ))
+
+        cursor.execute("DROP TABLE IF EXISTS BenchSummoners;")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"server": server, "results": results, "args": vars(args)}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""End-to-end throughput of FetchTopSummoners, FetchPuuids and FetchMatches.
+
+Runs the real function entry points against benchmarks/mock_riot_server.py
+(started in-process) and a local SQL Server, and reports wall time,
+requests/sec and rows/sec per stage. No Key Vault or Riot key is needed.
+
+    docker compose -f benchmarks/docker-compose.yml up -d
+    export BENCH_SQL_CONNECTION_STRING="Driver={ODBC Driver 18 for SQL Server};Server=localhost;Database=tempdb;Uid=sa;Pwd=...;TrustServerCertificate=yes;"
+    python benchmarks/bench_functions.py --output results.json
+    python benchmarks/bench_functions.py --baseline results.json --tolerance 0.2
+
+With --baseline the run exits non-zero when a stage's wall time regressed by
+more than the tolerance. Tables are dropped first, so point it at a scratch
+database only.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, ".."))
+sys.path.append(HERE)
+from mock_riot_server import DEFAULT_APP_LIMITS, DEFAULT_FIXTURE, Fixtures, MockRiotServer
+
+# Dependents first
+BENCH_TABLES = [
+    "myRiotMatchFrames", "myRiotMatchParticipants", "MatchFetchTombstones", "myRiotMatches", "PlayerMatchWatermarks",
+    "ChampionMatchupStats", "ChampionStats", "AggregateVersion", "OddsModelCoefficients",
+    "PuuidFetchFailures", "Summoners",
+]
+
+# (function, query params, SQL counting the rows the stage produces)
+STAGES = [
+    ("FetchTopSummoners", {}, "SELECT COUNT(*) FROM Summoners"),
+    ("FetchPuuids", {"time_budget": "3600"}, "SELECT COUNT(*) FROM Summoners WHERE PUUID IS NOT NULL"),
+    ("FetchMatches", {"time_budget": "3600", "max_players": "100000"},
+     "SELECT (SELECT COUNT(*) FROM myRiotMatches) + (SELECT COUNT(*) FROM myRiotMatchParticipants)"),
+]
+
+
+def configure_environment(riot_url, connection_string, timelines):
+    # Must run before any shared_code import: the runtime and client read it at import time
+    os.environ["RIOT_API_BASE_URL"] = riot_url
+    os.environ["SECRETS_FROM_ENV"] = "1"
+    os.environ["RiotApiKey"] = "RGAPI-benchmark"
+    os.environ["SQL_CONNECTION_STRING"] = connection_string
+    os.environ["INGEST_TIMELINES"] = "1" if timelines else "0"
+    scratch = tempfile.mkdtemp()
+    os.environ["MATCH_INDEX_PATH"] = os.path.join(scratch, "match_index.bin")
+    os.environ["IDENTITY_INDEX_PATH"] = os.path.join(scratch, "identity_index.bin")
+    # Every run starts with an empty response cache, so reruns still hit the mock
+    os.environ["RIOT_CACHE_PATH"] = os.path.join(scratch, "riot_response_cache.sqlite3")
+
+
+def count_rows(sql):
+    from shared_code.runtime import db_connection
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql)
+            return cursor.fetchone()[0]
+        except Exception:
+            # Table not created yet
+            return 0
+
+
+def drop_tables():
+    from shared_code.runtime import db_connection
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        for table in BENCH_TABLES:
+            cursor.execute(f"DROP TABLE IF EXISTS {table};")
+
+
+def run_stage(server, name, params, count_sql):
+    import azure.functions as func
+
+    module = importlib.import_module(name)
+    rows_before = count_rows(count_sql)
+    server.reset_stats()
+    request = func.HttpRequest(method="GET", url=f"/api/{name}", params=params, body=b"")
+
+    start = time.perf_counter()
+    response = module.main(request)
+    elapsed = time.perf_counter() - start
+
+    stats = server.reset_stats()
+    rows = count_rows(count_sql) - rows_before
+    return {
+        "stage": name,
+        "status": response.status_code,
+        "message": response.get_body().decode()[:200],
+        "wall_seconds": round(elapsed, 3),
+        "requests": stats["requests"],
+        "requests_per_second": round(stats["requests"] / elapsed, 1),
+        "throttled": stats["throttled"],
+        "rows": rows,
+        "rows_per_second": round(rows / elapsed, 1),
+        "response_megabytes": round(stats["bytes"] / 1e6, 2),
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    previous = {r["stage"]: r for r in baseline["stages"]}
+    for result in results:
+        before = previous.get(result["stage"])
+        if before and result["wall_seconds"] > before["wall_seconds"] * (1 + tolerance):
+            regressions.append(f"{result['stage']}: {before['wall_seconds']}s -> {result['wall_seconds']}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--platforms", default="euw1,eun1,kr,na1")
+    parser.add_argument("--matches-per-player", type=int, default=20)
+    parser.add_argument("--app-limits", default=DEFAULT_APP_LIMITS)
+    parser.add_argument("--fault-rate", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated Riot response time in seconds")
+    parser.add_argument("--timelines", action="store_true", help="also ingest match timelines")
+    parser.add_argument("--stages", default=",".join(name for name, _, _ in STAGES))
+    parser.add_argument("--keep-tables", action="store_true", help="don't drop the tables before running")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    fixtures = Fixtures.from_file(args.fixture, platforms=tuple(args.platforms.split(",")),
+                                  matches_per_player=args.matches_per_player)
+    server = MockRiotServer(fixtures, app_limits=args.app_limits, fault_rate=args.fault_rate,
+                            latency=args.latency).start()
+    configure_environment(server.url, os.environ["BENCH_SQL_CONNECTION_STRING"], args.timelines)
+    print(f"Mock Riot API on {server.url}: {len(fixtures.summoners)} summoners, {len(fixtures.matches)} matches")
+
+    if not args.keep_tables:
+        drop_tables()
+
+    selected = args.stages.split(",")
+    results = []
+    try:
+        for name, params, count_sql in STAGES:
+            if name in selected:
+                results.append(run_stage(server, name, params, count_sql))
+    finally:
+        server.stop()
+
+    print(f"{'stage':<18} {'status':>6} {'wall s':>8} {'requests':>9} {'req/s':>8} {'429s':>6} {'rows':>8} {'rows/s':>9}")
+    for r in results:
+        print(f"{r['stage']:<18} {r['status']:>6} {r['wall_seconds']:>8.2f} {r['requests']:>9} "
+              f"{r['requests_per_second']:>8.1f} {r['throttled']:>6} {r['rows']:>8} {r['rows_per_second']:>9.1f}")
+    total = sum(r["wall_seconds"] for r in results)
+    print(f"end-to-end wall time: {total:.2f}s")
+
+    report = {"stages": results, "wall_seconds": round(total, 3), "args": vars(args)}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = [r["stage"] for r in results if r["status"] >= 400]
+    if failed:
+        print(f"Failed stages: {', '.join(failed)}")
+        sys.exit(1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions beyond tolerance:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
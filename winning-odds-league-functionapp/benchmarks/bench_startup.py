@@ -0,0 +1,206 @@
+"""Cold-start cost per function: module import time and first-invocation time.
+
+Every sample runs in a fresh interpreter, like a new Consumption-plan worker:
+it imports the function module (and with it shared_code), then calls main()
+once. azure.functions is imported before the clock starts, since the worker
+has it loaded already. Also lists which heavy dependencies were pulled in by
+the import alone; with lazy imports that should be none of them.
+
+    python benchmarks/bench_startup.py --import-only
+    python benchmarks/bench_startup.py --runs 5 --output startup.json
+    python benchmarks/bench_startup.py --baseline startup.json --tolerance 0.2
+
+The invocation phase runs against benchmarks/mock_riot_server.py and
+BENCH_SQL_CONNECTION_STRING (see bench_functions.py), and expects the tables
+bench_functions.py leaves behind. Index snapshots and the Riot response
+cache start empty on every run.
+"""
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, ".."))
+
+HEAVY_MODULES = (
+    "pyodbc", "requests", "numpy", "pyarrow", "ijson",
+    "azure.identity", "azure.keyvault.secrets", "azure.storage.queue",
+)
+
+FUNCTIONS = [
+    "FetchTopSummoners", "FetchPuuids", "FetchMatches", "ProcessPuuidQueue",
+    "ProcessMatchQueue", "GetOdds", "FitOddsModel", "ExportSnapshots",
+]
+
+
+def trigger_payloads(fixtures, export_root):
+    # (trigger, payload) per function. Budgets are kept small: the point is
+    # the fixed cost of a first call (secrets, connection, index loads), not
+    # the work itself.
+    platform, summoner_id = next(iter(fixtures.summoners))
+    puuid = fixtures.summoners[(platform, summoner_id)]
+    return {
+        "FetchTopSummoners": ("http", {}),
+        "FetchPuuids": ("http", {"time_budget": "0"}),
+        "FetchMatches": ("http", {"time_budget": "0", "max_players": "1"}),
+        "ProcessPuuidQueue": ("queue", {"region": platform, "summoner_ids": [summoner_id]}),
+        "ProcessMatchQueue": ("queue", [puuid, platform, 0, 0]),
+        "GetOdds": ("http", {"champion": "1"}),
+        "FitOddsModel": ("http", {}),
+        "ExportSnapshots": ("http", {"root": export_root}),
+    }
+
+
+def run_child(name, trigger=None, payload=None):
+    import azure.functions as func
+
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    import_seconds = time.perf_counter() - start
+    result = {
+        "import_ms": round(import_seconds * 1000, 1),
+        "heavy_modules": [m for m in HEAVY_MODULES if m in sys.modules],
+    }
+    if trigger is None:
+        return result
+
+    start = time.perf_counter()
+    if trigger == "http":
+        request = func.HttpRequest(method="GET", url=f"/api/{name}", params=payload, body=b"")
+        status = module.main(request).status_code
+    else:
+        message = func.QueueMessage(body=json.dumps(payload).encode(), dequeue_count=1)
+        try:
+            module.main(message)
+            status = 200
+        except Exception as e:
+            result["error"] = str(e)[:200]
+            status = 500
+    result["first_call_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    result["status"] = status
+    return result
+
+
+def sample(name, trigger_payload):
+    # One cold process; index snapshots and the response cache go to a fresh
+    # directory each time
+    scratch = tempfile.mkdtemp()
+    env = dict(os.environ,
+               MATCH_INDEX_PATH=os.path.join(scratch, "match_index.bin"),
+               IDENTITY_INDEX_PATH=os.path.join(scratch, "identity_index.bin"),
+               RIOT_CACHE_PATH=os.path.join(scratch, "riot_response_cache.sqlite3"))
+    command = [sys.executable, os.path.abspath(__file__), "--child", name]
+    if trigger_payload:
+        command += ["--trigger", trigger_payload[0], "--payload", json.dumps(trigger_payload[1])]
+
+    start = time.perf_counter()
+    completed = subprocess.run(command, env=env, capture_output=True, text=True)
+    process_ms = round((time.perf_counter() - start) * 1000, 1)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{name} failed to start:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_ms"] = process_ms
+    return result
+
+
+def summarize(name, samples):
+    def median(key):
+        values = [s[key] for s in samples if key in s]
+        return round(statistics.median(values), 1) if values else None
+
+    summary = {
+        "function": name,
+        "runs": len(samples),
+        "import_ms": median("import_ms"),
+        "import_max_ms": max(s["import_ms"] for s in samples),
+        "first_call_ms": median("first_call_ms"),
+        "process_ms": median("process_ms"),
+        "heavy_modules": samples[-1]["heavy_modules"],
+    }
+    if "status" in samples[-1]:
+        summary["status"] = samples[-1]["status"]
+    summary["cold_start_ms"] = round(summary["import_ms"] + (summary["first_call_ms"] or 0), 1)
+    return summary
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    previous = {r["function"]: r for r in baseline["functions"]}
+    for result in results:
+        before = previous.get(result["function"])
+        if before and result["cold_start_ms"] > before["cold_start_ms"] * (1 + tolerance):
+            regressions.append(f"{result['function']}: {before['cold_start_ms']}ms -> {result['cold_start_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--functions", default=",".join(FUNCTIONS))
+    parser.add_argument("--runs", type=int, default=3, help="cold processes per function")
+    parser.add_argument("--import-only", action="store_true", help="skip main(); needs no SQL Server")
+    parser.add_argument("--platforms", default="euw1")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--trigger", help=argparse.SUPPRESS)
+    parser.add_argument("--payload", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        payload = json.loads(args.payload) if args.payload else None
+        print(json.dumps(run_child(args.child, args.trigger, payload)))
+        return
+
+    server = None
+    payloads = {}
+    if not args.import_only:
+        sys.path.append(HERE)
+        from bench_functions import configure_environment
+        from mock_riot_server import DEFAULT_FIXTURE, Fixtures, MockRiotServer
+
+        fixtures = Fixtures.from_file(DEFAULT_FIXTURE, platforms=tuple(args.platforms.split(",")), matches_per_player=5)
+        server = MockRiotServer(fixtures, latency=0.02).start()
+        configure_environment(server.url, os.environ["BENCH_SQL_CONNECTION_STRING"], timelines=False)
+        payloads = trigger_payloads(fixtures, tempfile.mkdtemp())
+
+    results = []
+    try:
+        for name in args.functions.split(","):
+            samples = [sample(name, payloads.get(name)) for _ in range(args.runs)]
+            results.append(summarize(name, samples))
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(f"{'function':<18} {'import ms':>10} {'max ms':>8} {'1st call ms':>12} {'process ms':>11}  heavy imports")
+    for r in results:
+        first_call = "-" if r["first_call_ms"] is None else f"{r['first_call_ms']:.1f}"
+        print(f"{r['function']:<18} {r['import_ms']:>10.1f} {r['import_max_ms']:>8.1f} {first_call:>12} "
+              f"{r['process_ms']:>11.1f}  {', '.join(r['heavy_modules']) or '-'}")
+
+    report = {"functions": results, "args": vars(args)}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = [r["function"] for r in results if r.get("status", 200) >= 400]
+    if failed:
+        print(f"Failed first calls: {', '.join(failed)}")
+        sys.exit(1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions beyond tolerance:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""Local stand-in for the Riot API, for benchmarks and offline runs.
+
+Serves league-v4, summoner-v4 and match-v5 (ids, match, timeline) responses
+generated deterministically from riot-api-test/challenger_players.json, with
+Riot-style X-App/X-Method rate-limit headers and 429s when a window is
+exceeded. Requests are expected under /{host}/..., which is what RiotClient
+sends when RIOT_API_BASE_URL points here:
+
+    python benchmarks/mock_riot_server.py --port 8089
+    export RIOT_API_BASE_URL=http://127.0.0.1:8089
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_FIXTURE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "riot-api-test", "challenger_players.json"
+)
+
+DEFAULT_PLATFORMS = ("euw1", "eun1", "kr", "na1")
+
+# Production app key and documented method limits
+DEFAULT_APP_LIMITS = "500:10,30000:600"
+METHOD_LIMITS = {
+    "league-v4.challengerleagues": "30:10,500:600",
+    "league-v4.grandmasterleagues": "30:10,500:600",
+    "summoner-v4.by-id": "1600:60",
+    "match-v5.ids-by-puuid": "2000:10",
+    "match-v5.match": "2000:10",
+    "match-v5.timeline": "2000:10",
+}
+
+ROUTES = [
+    (re.compile(r"^/lol/league/v4/(challenger|grandmaster)leagues/by-queue/[A-Za-z0-9_]+$"), "league"),
+    (re.compile(r"^/lol/summoner/v4/summoners/([^/]+)$"), "summoner"),
+    (re.compile(r"^/lol/match/v5/matches/by-puuid/([^/]+)/ids$"), "match_ids"),
+    (re.compile(r"^/lol/match/v5/matches/([A-Z0-9]+_\d+)/timeline$"), "timeline"),
+    (re.compile(r"^/lol/match/v5/matches/([A-Z0-9]+_\d+)$"), "match"),
+]
+
+POSITIONS = ("TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY")
+# Real payloads carry ~100 challenge stats and perks per participant; padding
+# keeps match and timeline bodies close to production size
+CHALLENGE_KEYS = [f"stat{i}" for i in range(120)]
+
+
+def parse_limits(value):
+    return [tuple(int(part) for part in item.split(":")) for item in value.split(",") if item]
+
+
+def _digest(*parts):
+    return hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+
+
+class FixedWindow:
+    def __init__(self, limit, seconds):
+        self.limit = limit
+        self.seconds = seconds
+        self.started = 0.0
+        self.count = 0
+
+    def _roll(self, now):
+        if now - self.started >= self.seconds:
+            self.started = now
+            self.count = 0
+
+    def retry_after(self, now):
+        self._roll(now)
+        if self.count >= self.limit:
+            return max(1, math.ceil(self.started + self.seconds - now))
+        return 0
+
+
+class RateLimitState:
+    """Riot-style fixed windows per host (app) and per host+method."""
+
+    def __init__(self, app_limits, method_limits):
+        self.app_limits = app_limits
+        self.method_limits = method_limits
+        self.lock = threading.Lock()
+        self.windows = {}
+
+    def _windows(self, key, limits):
+        windows = self.windows.get(key)
+        if windows is None:
+            windows = self.windows[key] = [FixedWindow(limit, seconds) for limit, seconds in limits]
+        return windows
+
+    def hit(self, host, method):
+        # Returns (headers, limit type or None); throttled calls don't count
+        now = time.monotonic()
+        method_limits = parse_limits(self.method_limits.get(method, "2000:10"))
+        with self.lock:
+            app = self._windows(host, self.app_limits)
+            per_method = self._windows((host, method), method_limits)
+            limit_type, retry_after = None, 0
+            for kind, windows in (("application", app), ("method", per_method)):
+                wait = max(w.retry_after(now) for w in windows)
+                if wait > retry_after:
+                    limit_type, retry_after = kind, wait
+            if limit_type is None:
+                for w in app + per_method:
+                    w.count += 1
+            headers = {
+                "X-App-Rate-Limit": ",".join(f"{w.limit}:{w.seconds}" for w in app),
+                "X-App-Rate-Limit-Count": ",".join(f"{w.count}:{w.seconds}" for w in app),
+                "X-Method-Rate-Limit": ",".join(f"{w.limit}:{w.seconds}" for w in per_method),
+                "X-Method-Rate-Limit-Count": ",".join(f"{w.count}:{w.seconds}" for w in per_method),
+            }
+            if limit_type:
+                headers["Retry-After"] = str(retry_after)
+                headers["X-Rate-Limit-Type"] = limit_type
+            return headers, limit_type
+
+
+class Fixtures:
+    """Deterministic ladder, summoner and match data for a set of platforms.
+
+    Challenger entries come from the recorded league; grandmaster entries are
+    derived from them. Every player gets matches_per_player ranked games, each
+    shared with nine other players of the same platform.
+    """
+
+    def __init__(self, league, platforms=DEFAULT_PLATFORMS, matches_per_player=20, seed=0):
+        self.league = league
+        self.platforms = platforms
+        self.summoners = {}
+        self.leagues = {}
+        self.matches = {}
+        self.matches_by_puuid = {}
+        rng = random.Random(seed)
+        now_ms = int(time.time() * 1000)
+
+        for platform in platforms:
+            for tier in ("challenger", "grandmaster"):
+                entries = []
+                for entry in league["entries"]:
+                    summoner_id = entry["summonerId"] if tier == "challenger" else _digest(tier, entry["summonerId"])[:47]
+                    entry = dict(entry, summonerId=summoner_id)
+                    if tier == "grandmaster":
+                        entry["leaguePoints"] = max(0, entry["leaguePoints"] - 700)
+                    entries.append(entry)
+                    self.summoners[(platform, summoner_id)] = _digest(platform, summoner_id)[:78]
+                self.leagues[(platform, tier)] = dict(league, tier=tier.upper(), entries=entries)
+
+            puuids = [puuid for (p, _), puuid in self.summoners.items() if p == platform]
+            match_count = len(puuids) * matches_per_player // 10
+            for n in range(match_count):
+                match_id = f"{platform.upper()}_{7_000_000_000 + n}"
+                players = rng.sample(puuids, 10)
+                start_ms = now_ms - rng.randint(0, 13 * 24 * 3600) * 1000
+                self.matches[match_id] = (platform, players, start_ms, rng.randint(900, 2400), rng.random() < 0.52)
+                for puuid in players:
+                    self.matches_by_puuid.setdefault(puuid, []).append(match_id)
+        for match_ids in self.matches_by_puuid.values():
+            # match-v5 lists newest first
+            match_ids.sort(key=lambda m: -self.matches[m][2])
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_FIXTURE, **kwargs):
+        with open(path) as f:
+            return cls(json.load(f), **kwargs)
+
+    def summoner(self, platform, summoner_id):
+        puuid = self.summoners.get((platform, summoner_id))
+        if puuid is None:
+            return None
+        return {"id": summoner_id, "accountId": _digest("account", puuid)[:56], "puuid": puuid,
+                "profileIconId": 4568, "revisionDate": 1736000000000, "summonerLevel": 612}
+
+    def match_ids(self, puuid, query):
+        start_time = int(query.get("startTime", ["0"])[0]) * 1000
+        start = int(query.get("start", ["0"])[0])
+        count = int(query.get("count", ["20"])[0])
+        ids = [m for m in self.matches_by_puuid.get(puuid, []) if self.matches[m][2] >= start_time]
+        return ids[start:start + count]
+
+    def match(self, match_id):
+        if match_id not in self.matches:
+            return None
+        platform, players, start_ms, duration, blue_wins = self.matches[match_id]
+        rng = random.Random(match_id)
+        champions = rng.sample(range(1, 170), 10)
+        participants = []
+        for i, puuid in enumerate(players):
+            team_id = 100 if i < 5 else 200
+            participants.append({
+                "participantId": i + 1,
+                "puuid": puuid,
+                "teamId": team_id,
+                "teamPosition": POSITIONS[i % 5],
+                "championId": champions[i],
+                "championName": f"Champion{champions[i]}",
+                "kills": rng.randint(0, 15),
+                "deaths": rng.randint(0, 12),
+                "assists": rng.randint(0, 20),
+                "win": (team_id == 100) == blue_wins,
+                "challenges": {key: rng.random() for key in CHALLENGE_KEYS},
+                "perks": {"styles": [{"style": 8000, "selections": [{"perk": 8005, "var1": 1, "var2": 2, "var3": 3}] * 4}]},
+            })
+        return {
+            "metadata": {"dataVersion": "2", "matchId": match_id, "participants": players},
+            "info": {
+                "gameCreation": start_ms - 60_000,
+                "gameDuration": duration,
+                "gameStartTimestamp": start_ms,
+                "gameVersion": "14.24.644.2327",
+                "platformId": platform.upper(),
+                "queueId": 420,
+                "participants": participants,
+                "teams": [
+                    {"teamId": 100, "win": blue_wins, "bans": [], "objectives": {}},
+                    {"teamId": 200, "win": not blue_wins, "bans": [], "objectives": {}},
+                ],
+            },
+        }
+
+    def timeline(self, match_id):
+        if match_id not in self.matches:
+            return None
+        _, players, _, duration, _ = self.matches[match_id]
+        rng = random.Random(f"{match_id}/timeline")
+        frames = []
+        for minute in range(duration // 60 + 1):
+            frames.append({
+                "timestamp": minute * 60_000,
+                "participantFrames": {
+                    str(pid): {
+                        "participantId": pid,
+                        "totalGold": 500 + minute * rng.randint(250, 450),
+                        "xp": minute * rng.randint(300, 500),
+                        "minionsKilled": minute * rng.randint(4, 9),
+                        "jungleMinionsKilled": rng.randint(0, minute + 1),
+                        "championStats": {key: rng.randint(0, 500) for key in CHALLENGE_KEYS[:25]},
+                        "damageStats": {key: rng.randint(0, 5000) for key in CHALLENGE_KEYS[:12]},
+                    }
+                    for pid in range(1, 11)
+                },
+                "events": [{"type": "ITEM_PURCHASED", "participantId": rng.randint(1, 10),
+                            "itemId": rng.randint(1000, 7000), "timestamp": minute * 60_000 + i}
+                           for i in range(rng.randint(5, 25))],
+            })
+        return {"metadata": {"dataVersion": "2", "matchId": match_id, "participants": players},
+                "info": {"frameInterval": 60_000, "frames": frames}}
+
+
+class MockRiotServer:
+    """Threaded HTTP server over Fixtures. fault_rate injects 503s and
+    service 429s to exercise the client's retry paths."""
+
+    def __init__(self, fixtures, host="127.0.0.1", port=0, app_limits=DEFAULT_APP_LIMITS,
+                 method_limits=None, fault_rate=0.0, latency=0.0):
+        self.fixtures = fixtures
+        self.limits = RateLimitState(parse_limits(app_limits), method_limits or METHOD_LIMITS)
+        self.fault_rate = fault_rate
+        self.latency = latency
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "faults": 0, "bytes": 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-riot", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_stats(self):
+        with self.stats_lock:
+            snapshot = dict(self.stats)
+            for key in self.stats:
+                self.stats[key] = 0
+        return snapshot
+
+    def _count(self, key, amount=1):
+        with self.stats_lock:
+            self.stats[key] += amount
+
+    def route(self, host, path, query):
+        # -> (method name, status, body)
+        for pattern, kind in ROUTES:
+            match = pattern.match(path)
+            if not match:
+                continue
+            if kind == "league":
+                tier = match.group(1)
+                return f"league-v4.{tier}leagues", 200, self.fixtures.leagues.get((host, tier), {"entries": []})
+            if kind == "summoner":
+                body = self.fixtures.summoner(host, match.group(1))
+                return "summoner-v4.by-id", 200 if body else 404, body
+            if kind == "match_ids":
+                return "match-v5.ids-by-puuid", 200, self.fixtures.match_ids(match.group(1), query)
+            body = getattr(self.fixtures, kind)(match.group(1))
+            return f"match-v5.{kind}", 200 if body else 404, body
+        return None, 404, None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server._count("requests")
+                parts = urlsplit(self.path)
+                host, _, path = parts.path.lstrip("/").partition("/")
+                method, status, body = server.route(host, "/" + path, parse_qs(parts.query))
+                if method is None:
+                    return self._send(404, {"status": {"message": "Data not found - no route", "status_code": 404}})
+
+                headers, limit_type = server.limits.hit(host, method)
+                if limit_type:
+                    server._count("throttled")
+                    return self._send(429, {"status": {"message": "Rate limit exceeded", "status_code": 429}}, headers)
+                if server.fault_rate and random.random() < server.fault_rate:
+                    server._count("faults")
+                    if random.random() < 0.5:
+                        return self._send(503, {"status": {"message": "Service unavailable", "status_code": 503}}, headers)
+                    headers = dict(headers, **{"Retry-After": "1", "X-Rate-Limit-Type": "service"})
+                    return self._send(429, {"status": {"message": "Rate limit exceeded", "status_code": 429}}, headers)
+                if server.latency:
+                    time.sleep(server.latency)
+                if status == 404:
+                    body = {"status": {"message": "Data not found", "status_code": 404}}
+                self._send(status, body, headers)
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode()
+                gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+                if gzipped:
+                    payload = gzip.compress(payload, compresslevel=1)
+                server._count("bytes", len(payload))
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json;charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                if gzipped:
+                    self.send_header("Content-Encoding", "gzip")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--platforms", default=",".join(DEFAULT_PLATFORMS))
+    parser.add_argument("--matches-per-player", type=int, default=20)
+    parser.add_argument("--app-limits", default=DEFAULT_APP_LIMITS)
+    parser.add_argument("--fault-rate", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+
+    fixtures = Fixtures.from_file(args.fixture, platforms=tuple(args.platforms.split(",")),
+                                  matches_per_player=args.matches_per_player)
+    server = MockRiotServer(fixtures, args.host, args.port, args.app_limits, fault_rate=args.fault_rate,
+                            latency=args.latency)
+    print(f"Mock Riot API on {server.url}: {len(fixtures.summoners)} summoners, {len(fixtures.matches)} matches")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
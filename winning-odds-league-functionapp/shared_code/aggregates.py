@@ -0,0 +1,235 @@
+import logging
+import os
+import threading
+import time
+
+from shared_code.telemetry import telemetry
+
+CREATE_AGGREGATE_TABLES_SQL = """
+IF NOT EXISTS (
+    SELECT *
+    FROM sys.tables
+    WHERE name = 'ChampionStats'
+)
+BEGIN
+    CREATE TABLE ChampionStats (
+        ChampionID INT NOT NULL,
+        Region VARCHAR(10) NOT NULL,
+        Tier VARCHAR(50) NOT NULL,
+        Games INT NOT NULL,
+        Wins INT NOT NULL,
+        PRIMARY KEY (ChampionID, Region, Tier)
+    );
+END
+
+IF NOT EXISTS (
+    SELECT *
+    FROM sys.tables
+    WHERE name = 'ChampionMatchupStats'
+)
+BEGIN
+    CREATE TABLE ChampionMatchupStats (
+        ChampionID INT NOT NULL,
+        OpponentChampionID INT NOT NULL,
+        Region VARCHAR(10) NOT NULL,
+        Tier VARCHAR(50) NOT NULL,
+        Games INT NOT NULL,
+        Wins INT NOT NULL,
+        PRIMARY KEY (ChampionID, OpponentChampionID, Region, Tier)
+    );
+END
+
+IF NOT EXISTS (
+    SELECT *
+    FROM sys.tables
+    WHERE name = 'AggregateVersion'
+)
+BEGIN
+    CREATE TABLE AggregateVersion (
+        ID INT NOT NULL PRIMARY KEY,
+        Version BIGINT NOT NULL
+    );
+END
+"""
+
+# A match's tier is the highest tracked rank among its players
+MATCH_TIERS_SQL = """
+SELECT p.MatchID, MAX(m.Platform) AS Region,
+    CASE MAX(CASE s.Rank WHEN 'Challenger' THEN 2 WHEN 'Grandmaster' THEN 1 ELSE 0 END)
+        WHEN 2 THEN 'Challenger'
+        WHEN 1 THEN 'Grandmaster'
+        ELSE 'Unranked'
+    END AS Tier
+INTO {tiers_table}
+FROM {participants} AS p
+INNER JOIN {matches} AS m ON m.MatchID = p.MatchID
+LEFT JOIN Summoners AS s ON s.PUUID = p.PUUID
+GROUP BY p.MatchID;
+"""
+
+MERGE_CHAMPION_STATS_SQL = """
+MERGE INTO ChampionStats WITH (HOLDLOCK) AS Target
+USING (
+    SELECT p.ChampionID, t.Region, t.Tier, COUNT(*) AS Games, SUM(CAST(p.Win AS INT)) AS Wins
+    FROM {participants} AS p
+    INNER JOIN {tiers_table} AS t ON t.MatchID = p.MatchID
+    GROUP BY p.ChampionID, t.Region, t.Tier
+) AS Source
+ON Target.ChampionID = Source.ChampionID AND Target.Region = Source.Region AND Target.Tier = Source.Tier
+WHEN MATCHED THEN
+    UPDATE SET Games = Target.Games + Source.Games, Wins = Target.Wins + Source.Wins
+WHEN NOT MATCHED THEN
+    INSERT (ChampionID, Region, Tier, Games, Wins)
+    VALUES (Source.ChampionID, Source.Region, Source.Tier, Source.Games, Source.Wins);
+"""
+
+# Lane matchups: same position, opposite teams
+MERGE_MATCHUP_STATS_SQL = """
+MERGE INTO ChampionMatchupStats WITH (HOLDLOCK) AS Target
+USING (
+    SELECT a.ChampionID, b.ChampionID AS OpponentChampionID, t.Region, t.Tier,
+        COUNT(*) AS Games, SUM(CAST(a.Win AS INT)) AS Wins
+    FROM {participants} AS a
+    INNER JOIN {participants} AS b
+        ON b.MatchID = a.MatchID AND b.TeamPosition = a.TeamPosition AND b.TeamID <> a.TeamID
+    INNER JOIN {tiers_table} AS t ON t.MatchID = a.MatchID
+    GROUP BY a.ChampionID, b.ChampionID, t.Region, t.Tier
+) AS Source
+ON Target.ChampionID = Source.ChampionID AND Target.OpponentChampionID = Source.OpponentChampionID
+    AND Target.Region = Source.Region AND Target.Tier = Source.Tier
+WHEN MATCHED THEN
+    UPDATE SET Games = Target.Games + Source.Games, Wins = Target.Wins + Source.Wins
+WHEN NOT MATCHED THEN
+    INSERT (ChampionID, OpponentChampionID, Region, Tier, Games, Wins)
+    VALUES (Source.ChampionID, Source.OpponentChampionID, Source.Region, Source.Tier, Source.Games, Source.Wins);
+"""
+
+BUMP_VERSION_SQL = "UPDATE AggregateVersion SET Version = Version + 1 WHERE ID = 1;"
+
+
+def _apply_aggregates(cursor, participants, matches):
+    with telemetry.span("sql.update_aggregates"):
+        cursor.execute("DROP TABLE IF EXISTS #MatchTiers;")
+        cursor.execute(MATCH_TIERS_SQL.format(tiers_table="#MatchTiers", participants=participants, matches=matches))
+        cursor.execute(MERGE_CHAMPION_STATS_SQL.format(participants=participants, tiers_table="#MatchTiers"))
+        cursor.execute(MERGE_MATCHUP_STATS_SQL.format(participants=participants, tiers_table="#MatchTiers"))
+        cursor.execute(BUMP_VERSION_SQL)
+
+
+def ensure_aggregate_tables(cursor):
+    cursor.execute(CREATE_AGGREGATE_TABLES_SQL)
+    cursor.execute("SELECT Version FROM AggregateVersion WHERE ID = 1")
+    if cursor.fetchone() is None:
+        cursor.execute("INSERT INTO AggregateVersion (ID, Version) VALUES (1, 0);")
+        cursor.execute("SELECT OBJECT_ID('myRiotMatchParticipants')")
+        if cursor.fetchone()[0] is not None:
+            # First run: seed the aggregates from matches ingested before they existed
+            logging.info("Building champion aggregates from existing matches...")
+            _apply_aggregates(cursor, "myRiotMatchParticipants", "myRiotMatches")
+
+
+def bump_version(cursor):
+    # Anything the odds cache serves changed (aggregates or model coefficients)
+    ensure_aggregate_tables(cursor)
+    cursor.execute(BUMP_VERSION_SQL)
+
+
+def update_aggregates(cursor, participants_table, matches_table):
+    # Fold a batch of newly inserted matches into the aggregates and bump the
+    # version so odds caches on other instances reload
+    _apply_aggregates(cursor, participants_table, matches_table)
+    aggregate_cache.invalidate()
+
+
+def get_version(cursor):
+    cursor.execute("SELECT Version FROM AggregateVersion WHERE ID = 1")
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class AggregateCache:
+    """In-memory copy of the aggregate tables and odds model for the odds endpoint.
+
+    Lookups are plain dict gets. Besides the stored (region, tier) rows, totals
+    over all regions and/or tiers are precomputed under the "all" key. Only the
+    first load blocks a request; afterwards the version row is polled in the
+    background at most every check_interval seconds and the cache is reloaded
+    when ingestion (or a model refit) has bumped it.
+    """
+
+    ALL = "all"
+
+    def __init__(self, check_interval=float(os.getenv("ODDS_CACHE_CHECK_SECONDS", "15"))):
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = 0.0
+        self.refreshing = False
+        self.champions = {}
+        self.matchups = {}
+        self.model = None
+
+    def invalidate(self):
+        self.checked_at = 0.0
+
+    def _add(self, table, key_prefix, region, tier, games, wins):
+        for r in (region, self.ALL):
+            for t in (tier, self.ALL):
+                key = key_prefix + (r, t)
+                current = table.get(key, (0, 0))
+                table[key] = (current[0] + games, current[1] + wins)
+
+    def _load(self, cursor, version):
+        from shared_code.odds_engine import load_model
+
+        champions = {}
+        matchups = {}
+        cursor.execute("SELECT ChampionID, Region, Tier, Games, Wins FROM ChampionStats")
+        for champion_id, region, tier, games, wins in cursor.fetchall():
+            self._add(champions, (champion_id,), region, tier, games, wins)
+        cursor.execute("SELECT ChampionID, OpponentChampionID, Region, Tier, Games, Wins FROM ChampionMatchupStats")
+        for champion_id, opponent_id, region, tier, games, wins in cursor.fetchall():
+            self._add(matchups, (champion_id, opponent_id), region, tier, games, wins)
+        model = load_model(cursor)
+        # Swap in complete objects so concurrent readers never see a partial load
+        self.champions, self.matchups, self.model = champions, matchups, model
+        self.version = version
+        logging.info(f"Odds cache loaded at version {version}: {len(champions)} champion and {len(matchups)} matchup keys.")
+
+    def _refresh(self, connect):
+        try:
+            with connect() as conn:
+                cursor = conn.cursor()
+                if self.version is None:
+                    ensure_aggregate_tables(cursor)
+                version = get_version(cursor)
+                if version != self.version:
+                    self._load(cursor, version)
+            self.checked_at = time.monotonic()
+        finally:
+            self.refreshing = False
+
+    def ensure_fresh(self, connect):
+        # connect: context manager yielding a DB connection, only used when a
+        # version check is due
+        if time.monotonic() - self.checked_at < self.check_interval:
+            return
+        with self.lock:
+            if self.refreshing or time.monotonic() - self.checked_at < self.check_interval:
+                return
+            self.refreshing = True
+            if self.version is None:
+                # Nothing to serve yet, so the first load has to block
+                self._refresh(connect)
+                return
+        threading.Thread(target=self._refresh, args=(connect,), name="odds-cache-refresh", daemon=True).start()
+
+    def champion(self, champion_id, region=ALL, tier=ALL):
+        return self.champions.get((champion_id, region, tier), (0, 0))
+
+    def matchup(self, champion_id, opponent_id, region=ALL, tier=ALL):
+        return self.matchups.get((champion_id, opponent_id, region, tier), (0, 0))
+
+
+# Shared by the odds endpoint on a warm instance
+aggregate_cache = AggregateCache()
@@ -0,0 +1,67 @@
+import logging
+import os
+from itertools import islice
+
+from shared_code.telemetry import telemetry
+
+# Rows per executemany call; larger chunks mean fewer round trips but more
+# memory for pyodbc's parameter arrays.
+DEFAULT_CHUNK_SIZE = int(os.getenv("BULK_WRITE_CHUNK_SIZE", "1000"))
+
+
+def chunked(rows, size):
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def bulk_insert(cursor, table, columns, rows, chunk_size=None):
+    # fast_executemany binds whole parameter arrays, so a chunk is sent in a
+    # single round trip instead of one per row.
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)});"
+    cursor.fast_executemany = True
+    total = 0
+    for chunk in chunked(rows, chunk_size):
+        with telemetry.span("sql.insert_chunk", table=table, rows=len(chunk)):
+            cursor.executemany(sql, chunk)
+        total += len(chunk)
+    return total
+
+
+def create_staging_table(cursor, staging_table, column_definitions):
+    # column_definitions: [("SummonerID", "VARCHAR(100) NOT NULL"), ...]
+    columns_sql = ",\n    ".join(f"{name} {sql_type}" for name, sql_type in column_definitions)
+    cursor.execute(f"DROP TABLE IF EXISTS {staging_table};")
+    cursor.execute(f"CREATE TABLE {staging_table} (\n    {columns_sql}\n);")
+
+
+def stage_rows(cursor, staging_table, column_definitions, rows, chunk_size=None):
+    create_staging_table(cursor, staging_table, column_definitions)
+    columns = [name for name, _ in column_definitions]
+    count = bulk_insert(cursor, staging_table, columns, rows, chunk_size)
+    logging.info(f"Staged {count} rows into {staging_table}.")
+    return count
+
+
+def bulk_update(cursor, target_table, staging_table, column_definitions, key_columns, rows, chunk_size=None):
+    # Stage the rows, then apply them with a single set-based UPDATE ... FROM
+    if stage_rows(cursor, staging_table, column_definitions, rows, chunk_size) == 0:
+        return 0
+
+    value_columns = [name for name, _ in column_definitions if name not in key_columns]
+    set_sql = ", ".join(f"Target.{name} = Source.{name}" for name in value_columns)
+    join_sql = " AND ".join(f"Target.{name} = Source.{name}" for name in key_columns)
+    with telemetry.span("sql.update", table=target_table):
+        cursor.execute(f"""
+        UPDATE Target
+        SET {set_sql}
+        FROM {target_table} AS Target
+        INNER JOIN {staging_table} AS Source
+            ON {join_sql};
+        """)
+    telemetry.count("sql.rows_written", cursor.rowcount, table=target_table)
+    return cursor.rowcount
@@ -0,0 +1,34 @@
+import contextvars
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def group_by_region(rows, region_index=1):
+    # [(summoner_id, region), ...] -> {region: [(summoner_id, region), ...]}
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row[region_index]].append(row)
+    return dict(grouped)
+
+
+def run_region_lanes(items_by_region, lane_fn):
+    # One worker thread per regional host. Every region has its own Riot quota,
+    # so lanes only ever wait on their own limiter buckets and the total wall
+    # time is that of the slowest region. Exceptions are re-raised here. Lanes
+    # run in a copy of the caller's context so telemetry stays attributed to
+    # the current invocation.
+    if not items_by_region:
+        return {}
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(items_by_region), thread_name_prefix="region-lane") as executor:
+        futures = {
+            executor.submit(contextvars.copy_context().run, lane_fn, region, items): region
+            for region, items in items_by_region.items()
+        }
+        for future in as_completed(futures):
+            region = futures[future]
+            results[region] = future.result()
+            logging.info(f"Region lane {region} finished.")
+    return results
@@ -0,0 +1,119 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from shared_code.lazy import lazy_import
+
+pyodbc = lazy_import("pyodbc")
+
+
+def build_connection_string(sql_user, sql_password):
+    # Retrieve server and database from environment variables
+    sql_server = os.getenv("SQL_SERVER", "myriotdataserver.database.windows.net")
+    sql_database = os.getenv("SQL_DATABASE", "myRiotDataSQL")
+
+    return (
+        f"Driver={{ODBC Driver 18 for SQL Server}};"
+        f"Server=tcp:{sql_server},1433;"
+        f"Database={sql_database};"
+        f"Uid={sql_user};"
+        f"Pwd={sql_password};"
+        "Encrypt=yes;"
+        "TrustServerCertificate=no;"
+        "Connection Timeout=30;"
+    )
+
+
+def is_login_failure(error):
+    # SQLSTATE 28000 = invalid authorization specification (bad user/password)
+    return bool(error.args) and error.args[0] == "28000"
+
+
+def connect_to_database(connection_string, retries=3, delay=5):
+    for attempt in range(retries):
+        try:
+            logging.info(f"Attempting to connect to the database (Attempt {attempt + 1}/{retries})...")
+            conn = pyodbc.connect(connection_string, autocommit=True)
+            logging.info("Database connection established successfully.")
+            return conn
+        except pyodbc.Error as e:
+            logging.warning(f"Database connection attempt {attempt + 1} failed: {e}")
+            if is_login_failure(e):
+                # Retrying with the same credentials won't help
+                raise
+            if attempt < retries - 1:
+                logging.info(f"Retrying in {delay} seconds...")
+                time.sleep(delay)
+            else:
+                logging.error("All retry attempts to connect to the database failed.")
+                raise
+
+
+class ConnectionPool:
+    """Small pool of autocommit pyodbc connections kept across warm invocations.
+
+    Idle connections are validated with a cheap query before reuse if they have
+    been idle for longer than validate_after seconds.
+    """
+
+    def __init__(self, connect, max_idle=5, validate_after=30):
+        self.connect = connect
+        self.max_idle = max_idle
+        self.validate_after = validate_after
+        self.lock = threading.Lock()
+        self.idle = []
+
+    def _is_alive(self, conn):
+        try:
+            conn.cursor().execute("SELECT 1").fetchone()
+            return True
+        except pyodbc.Error as e:
+            logging.info(f"Discarding stale pooled connection: {e}")
+            return False
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                if not self.idle:
+                    break
+                conn, released_at = self.idle.pop()
+            if time.monotonic() - released_at < self.validate_after or self._is_alive(conn):
+                return conn
+            self._close(conn)
+        return self.connect()
+
+    def release(self, conn):
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append((conn, time.monotonic()))
+                return
+        self._close(conn)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+
+    def clear(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except pyodbc.Error:
+            # The connection may be broken; don't hand it to the next caller
+            self._close(conn)
+            raise
+        except Exception:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
@@ -0,0 +1,216 @@
+import glob
+import json
+import logging
+import os
+import tempfile
+import uuid
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from shared_code.match_index import CATCH_UP_OVERLAP
+
+# Local path or an Azure Files mount shared with the analysts' tooling
+EXPORT_ROOT = os.getenv("EXPORT_ROOT", os.path.join(tempfile.gettempdir(), "exports"))
+STATE_FILE = "_export_state.json"
+
+DICT_STRING = pa.dictionary(pa.int32(), pa.string())
+PARTITIONING = ds.partitioning(pa.schema([("region", DICT_STRING), ("date", DICT_STRING)]), flavor="hive")
+
+SUMMONER_SCHEMA = pa.schema([
+    ("summoner_id", pa.string()),
+    ("puuid", pa.string()),
+    ("rank", DICT_STRING),
+    ("league_points", pa.int32()),
+    ("wins", pa.int32()),
+    ("losses", pa.int32()),
+    ("hot_streak", pa.bool_()),
+    ("inactive", pa.bool_()),
+    ("region", DICT_STRING),
+    ("date", DICT_STRING),
+])
+
+PARTICIPANT_SCHEMA = pa.schema([
+    ("match_id", pa.string()),
+    ("queue_id", pa.int16()),
+    ("game_version", DICT_STRING),
+    ("game_start", pa.timestamp("ms", tz="UTC")),
+    ("game_duration", pa.int32()),
+    ("puuid", pa.string()),
+    ("team_id", pa.int16()),
+    ("team_position", DICT_STRING),
+    ("champion_id", pa.int16()),
+    ("champion_name", DICT_STRING),
+    ("kills", pa.int16()),
+    ("deaths", pa.int16()),
+    ("assists", pa.int16()),
+    ("win", pa.bool_()),
+    ("region", DICT_STRING),
+    ("date", DICT_STRING),
+])
+
+
+def _write(batches, schema, root, export_id, replace_partitions=False):
+    # Hive-style region=.../date=... directories. File names carry the export
+    # ID, so incremental exports never overwrite each other and an unfinished
+    # one can be found and removed. replace_partitions drops whatever a
+    # partition held before it is written, for full snapshots.
+    ds.write_dataset(
+        batches,
+        root,
+        schema=schema,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"part-{export_id}-{{i}}.parquet",
+        existing_data_behavior="delete_matching" if replace_partitions else "overwrite_or_ignore",
+    )
+
+
+def _record_batches(cursor, schema, to_columns, fetch_size):
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            return
+        columns = to_columns(rows)
+        if columns is None:
+            continue
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema,
+        )
+
+
+def export_summoners(cursor, root=EXPORT_ROOT, snapshot_date=None, fetch_size=10_000):
+    snapshot_date = snapshot_date or datetime.now(timezone.utc).date().isoformat()
+    cursor.execute("""
+    SELECT SummonerID, PUUID, Rank, LeaguePoints, Wins, Losses, HotStreak, Inactive, Region
+    FROM Summoners
+    """)
+
+    def to_columns(rows):
+        columns = [list(column) for column in zip(*rows)]
+        return columns + [[snapshot_date] * len(rows)]
+
+    # A rerun on the same day replaces that day's partitions instead of adding
+    # a second copy of the snapshot
+    path = os.path.join(root, "summoners")
+    batches = _record_batches(cursor, SUMMONER_SCHEMA, to_columns, fetch_size)
+    _write(batches, SUMMONER_SCHEMA, path, uuid.uuid4().hex, replace_partitions=True)
+    logging.info(f"Exported Summoners snapshot for {snapshot_date} to {path}.")
+
+
+def _load_state(root):
+    try:
+        with open(os.path.join(root, STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(root, state):
+    os.makedirs(root, exist_ok=True)
+    tmp_path = os.path.join(root, f"{STATE_FILE}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, os.path.join(root, STATE_FILE))
+
+
+def _remove_export(path, export_id):
+    # Files of an export that never recorded its state; its rows are exported again
+    for file_path in glob.glob(os.path.join(path, "*", "*", f"part-{export_id}-*.parquet")):
+        os.remove(file_path)
+
+
+def export_matches(cursor, root=EXPORT_ROOT, fetch_size=50_000):
+    # Incremental: only matches ingested since the previous export are written.
+    # Like the match index, the query starts CATCH_UP_OVERLAP before the saved
+    # watermark so lanes that committed late are not skipped; matches already
+    # exported inside that window are remembered in the state and left out.
+    state = _load_state(root)
+    path = os.path.join(root, "matches")
+    if state.get("matches_pending_export"):
+        _remove_export(path, state.pop("matches_pending_export"))
+
+    exported_until = state.get("matches_exported_until")
+    exported_until = datetime.fromisoformat(exported_until) if exported_until else None
+    recent = state.get("matches_exported_recent", {})
+
+    sql = """
+    SELECT m.MatchID, m.QueueID, m.GameVersion, m.GameStart, m.GameDuration,
+        p.PUUID, p.TeamID, p.TeamPosition, p.ChampionID, p.ChampionName,
+        p.Kills, p.Deaths, p.Assists, p.Win, m.Platform, m.IngestedAt
+    FROM myRiotMatches AS m
+    INNER JOIN myRiotMatchParticipants AS p ON p.MatchID = m.MatchID
+    """
+    if exported_until is None:
+        cursor.execute(sql)
+    else:
+        cursor.execute(sql + " WHERE m.IngestedAt > ?", exported_until - CATCH_UP_OVERLAP)
+
+    # Recorded before writing, so a crash mid-export is cleaned up next time
+    export_id = uuid.uuid4().hex
+    state["matches_pending_export"] = export_id
+    _save_state(root, state)
+
+    exported = 0
+    high_water = exported_until
+    # Exported match IDs the next run's overlap window can return again
+    written = {}
+
+    def to_columns(rows):
+        nonlocal exported, high_water, written
+        rows = [row for row in rows if row[0] not in recent]
+        if not rows:
+            return None
+        exported += len(rows)
+        high_water = max([row[-1] for row in rows] + ([high_water] if high_water else []))
+        window_start = high_water - CATCH_UP_OVERLAP
+        written = {match_id: ingested_at for match_id, ingested_at in written.items() if ingested_at > window_start}
+        written.update((row[0], row[-1]) for row in rows if row[-1] > window_start)
+        columns = [list(column) for column in zip(*rows)][:-1]
+        game_start = columns[3]
+        columns[3] = [datetime.fromtimestamp(ms / 1000, tz=timezone.utc) for ms in game_start]
+        return columns + [[start.date().isoformat() for start in columns[3]]]
+
+    _write(_record_batches(cursor, PARTICIPANT_SCHEMA, to_columns, fetch_size), PARTICIPANT_SCHEMA, path, export_id)
+
+    if high_water is not None:
+        window_start = high_water - CATCH_UP_OVERLAP
+        recent.update((match_id, ingested_at.isoformat()) for match_id, ingested_at in written.items())
+        state["matches_exported_recent"] = {
+            match_id: ingested_at for match_id, ingested_at in recent.items()
+            if datetime.fromisoformat(ingested_at) > window_start
+        }
+        state["matches_exported_until"] = high_water.isoformat()
+    del state["matches_pending_export"]
+    _save_state(root, state)
+    logging.info(f"Exported {exported} participant rows to {path}.")
+    return exported
+
+
+def read_snapshot(path, columns=None, filters=None):
+    # Memory-mapped read of an exported dataset, e.g.
+    # read_snapshot(".../matches", columns=["champion_id", "win"], filters=[("region", "=", "euw1")])
+    partitioning = ds.HivePartitioning.discover(infer_dictionary=True)
+    return pq.read_table(path, columns=columns, filters=filters, partitioning=partitioning, memory_map=True)
+
+
+def load_exported_match_arrays(root=EXPORT_ROOT):
+    # Same MatchArrays as odds_engine.load_match_arrays, read from the export
+    # instead of the production database
+    import numpy as np
+    from shared_code.odds_engine import BLUE_TEAM, build_match_arrays
+
+    table = read_snapshot(os.path.join(root, "matches"), columns=["match_id", "team_id", "champion_id", "win"])
+    team_ids = table.column("team_id").to_numpy()
+    wins = table.column("win").to_numpy(zero_copy_only=False)
+    # A blue participant who won, or a red one who lost, means blue won
+    winning_teams = np.where((team_ids == BLUE_TEAM) == wins, BLUE_TEAM, 200)
+    return build_match_arrays(
+        table.column("match_id").to_numpy(zero_copy_only=False),
+        team_ids,
+        table.column("champion_id").to_numpy(),
+        winning_teams,
+    )
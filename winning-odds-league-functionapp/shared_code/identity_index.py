@@ -0,0 +1,228 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from shared_code.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+INDEX_PATH = os.getenv("IDENTITY_INDEX_PATH", os.path.join(tempfile.gettempdir(), "identity_index.bin"))
+# SummonerID -> PUUID never changes, so an old snapshot is never wrong, it only
+# misses newer players; it is merged with Summoners again after this long
+MAX_AGE_SECONDS = int(os.getenv("IDENTITY_INDEX_MAX_AGE_SECONDS", str(6 * 3600)))
+# Long-lived queue workers fold the overlay into the arrays and save once it
+# holds this many players
+MAX_RECENT = int(os.getenv("IDENTITY_INDEX_MAX_RECENT", "1000"))
+
+_MAGIC = b"WOLIDX3\n"
+_HEADER_LENGTH = struct.Struct("<I")
+_ARRAYS = ("summoner_keys", "summoner_puuids", "puuids", "puuid_regions")
+
+
+def _summoner_key(summoner_id, region):
+    return f"{region}:{summoner_id}".encode()
+
+
+def _lookup(sorted_keys, key):
+    i = int(np.searchsorted(sorted_keys, key))
+    if i < len(sorted_keys) and sorted_keys[i] == key:
+        return i
+    return None
+
+
+class IdentityIndex:
+    """In-process SummonerID/Region <-> PUUID lookups.
+
+    Identifiers are stored as sorted fixed-width byte arrays (one allocation
+    per column instead of a dict or str object per player) and looked up with
+    searchsorted. Regions are interned as uint8 codes. Players added since the
+    arrays were built live in small overlay dicts until the next save().
+
+    The snapshot file is memory-mapped, so a warm instance (or a second worker
+    on the same host) gets the index without reading it into its own heap.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.built_at = None
+        self.regions = []
+        # Created on first use, so importing this module doesn't import numpy
+        self.summoner_keys = None
+        self.summoner_puuids = None
+        self.puuids = None
+        self.puuid_regions = None
+        self.recent = {}
+        self.recent_regions = {}
+        self._mmap = None
+
+    def __len__(self):
+        return (0 if self.summoner_keys is None else len(self.summoner_keys)) + len(self.recent)
+
+    def _ensure_arrays(self):
+        if self.summoner_keys is None:
+            self.summoner_keys = np.empty(0, dtype="S1")
+            self.summoner_puuids = np.empty(0, dtype="S1")
+            self.puuids = np.empty(0, dtype="S1")
+            self.puuid_regions = np.empty(0, dtype=np.uint8)
+
+    def _region_code(self, region):
+        if region not in self.regions:
+            self.regions.append(region)
+        return self.regions.index(region)
+
+    def _build(self, rows):
+        # rows: (puuid, summoner_id, region); earlier rows win on duplicates
+        self._ensure_arrays()
+        existing = zip(
+            self.summoner_puuids.tolist(),
+            (key.split(b":", 1) for key in self.summoner_keys.tolist()),
+        )
+        rows = list(rows) + [(p.decode(), s.decode(), r.decode()) for p, (r, s) in existing]
+        if not rows:
+            return
+        keys = np.array([_summoner_key(summoner_id, region) for _, summoner_id, region in rows])
+        puuids = np.array([puuid.encode() for puuid, _, _ in rows])
+        codes = np.array([self._region_code(region) for _, _, region in rows], dtype=np.uint8)
+
+        keys, first = np.unique(keys, return_index=True)
+        self.summoner_keys = keys
+        self.summoner_puuids = puuids[first]
+        by_puuid, first = np.unique(puuids, return_index=True)
+        self.puuids = by_puuid
+        self.puuid_regions = codes[first]
+        self.recent = {}
+        self.recent_regions = {}
+
+    def rebuild(self, cursor):
+        # Union of the current index and every PUUID stored in Summoners, so
+        # players who dropped off the ladder stay resolvable
+        cursor.execute("SELECT PUUID, SummonerID, Region FROM Summoners WHERE PUUID IS NOT NULL")
+        rows = [tuple(row) for row in cursor.fetchall()]
+        with self.lock:
+            self._build(list(self.recent.values()) + rows)
+            self.built_at = time.time()
+        logging.info(f"Identity index rebuilt with {len(self)} summoners.")
+
+    def refresh(self, cursor):
+        if self.built_at is None:
+            self.load()
+        if self.built_at is None or time.time() - self.built_at > MAX_AGE_SECONDS:
+            self.rebuild(cursor)
+            self.save()
+
+    def add(self, rows):
+        # rows: (puuid, summoner_id, region), as returned by fetch_puuids
+        with self.lock:
+            for puuid, summoner_id, region in rows:
+                self.recent[(summoner_id, region)] = (puuid, summoner_id, region)
+                self.recent_regions[puuid] = region
+
+    def save_if_grown(self, max_recent=MAX_RECENT):
+        # Returns True if the overlay was compacted and saved
+        if len(self.recent) < max_recent:
+            return False
+        self.save()
+        return True
+
+    def _puuid_for(self, summoner_id, region):
+        recent = self.recent.get((summoner_id, region))
+        if recent:
+            return recent[0]
+        if self.summoner_keys is None:
+            return None
+        i = _lookup(self.summoner_keys, _summoner_key(summoner_id, region))
+        return None if i is None else self.summoner_puuids[i].decode()
+
+    def puuid_for(self, summoner_id, region):
+        with self.lock:
+            return self._puuid_for(summoner_id, region)
+
+    def known_puuids(self, region, summoner_ids):
+        # {summoner_id: puuid} for the IDs already resolved
+        known = {}
+        with self.lock:
+            for summoner_id in summoner_ids:
+                puuid = self._puuid_for(summoner_id, region)
+                if puuid:
+                    known[summoner_id] = puuid
+        return known
+
+    def region_for(self, puuid):
+        return self.regions_for([puuid])[0]
+
+    def regions_for(self, puuids):
+        # Vectorized PUUID -> region (None if unknown), e.g. for the ten
+        # participants of a match
+        if not puuids:
+            return []
+        keys = np.array([p.encode() for p in puuids])
+        with self.lock:
+            self._ensure_arrays()
+            positions = np.minimum(np.searchsorted(self.puuids, keys), max(len(self.puuids) - 1, 0))
+            found = (self.puuids[positions] == keys) if len(self.puuids) else np.zeros(len(keys), dtype=bool)
+            return [
+                self.regions[self.puuid_regions[position]] if hit else self.recent_regions.get(puuid)
+                for puuid, position, hit in zip(puuids, positions.tolist(), found.tolist())
+            ]
+
+    def save(self):
+        # Layout: magic, header length, JSON header (regions, array dtypes and
+        # offsets), then each array 8-byte aligned so it can be mapped in place
+        with self.lock:
+            self._ensure_arrays()
+            if self.recent:
+                self._build(list(self.recent.values()))
+            arrays = {name: getattr(self, name) for name in _ARRAYS}
+            header = {"built_at": self.built_at, "regions": self.regions, "arrays": {}}
+            offset = 0
+            for name, array in arrays.items():
+                header["arrays"][name] = {"dtype": array.dtype.str, "count": len(array), "offset": offset}
+                offset += (array.nbytes + 7) // 8 * 8
+            header_bytes = json.dumps(header).encode()
+            preamble = len(_MAGIC) + _HEADER_LENGTH.size + len(header_bytes)
+            padding = b"\0" * ((preamble + 7) // 8 * 8 - preamble)
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_MAGIC + _HEADER_LENGTH.pack(len(header_bytes) + len(padding)) + header_bytes + padding)
+                for array in arrays.values():
+                    data = array.tobytes()
+                    f.write(data + b"\0" * ((len(data) + 7) // 8 * 8 - len(data)))
+            os.replace(tmp_path, self.path)
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if mapped[:len(_MAGIC)] != _MAGIC:
+                raise ValueError("not an identity index snapshot")
+            (header_length,) = _HEADER_LENGTH.unpack_from(mapped, len(_MAGIC))
+            start = len(_MAGIC) + _HEADER_LENGTH.size
+            header = json.loads(bytes(mapped[start:start + header_length]).rstrip(b"\0"))
+            data_start = start + header_length
+            arrays = {
+                name: np.frombuffer(mapped, dtype=np.dtype(spec["dtype"]), count=spec["count"], offset=data_start + spec["offset"])
+                for name, spec in header["arrays"].items()
+            }
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            logging.info(f"No usable identity index at {self.path}: {e}")
+            return False
+
+        with self.lock:
+            for name in _ARRAYS:
+                setattr(self, name, arrays[name])
+            self.regions = header["regions"]
+            self.built_at = header["built_at"]
+            self._mmap = mapped
+        logging.info(f"Identity index loaded from {self.path} ({len(self)} summoners).")
+        return True
+
+
+# Loaded once per warm instance
+identity_index = IdentityIndex()
@@ -0,0 +1,29 @@
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    The Functions worker imports every function (and so all of shared_code)
+    before the first invocation runs. Heavy dependencies such as pyodbc,
+    requests and numpy are referenced through this instead, so each one is
+    only paid for by the instance that actually uses it, and only once.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            # importlib serializes concurrent first imports itself
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from shared_code.matches import existing_match_ids
+
+DEFAULT_CAPACITY = 1_000_000
+DEFAULT_ERROR_RATE = 0.001
+INDEX_PATH = os.getenv("MATCH_INDEX_PATH", os.path.join(tempfile.gettempdir(), "match_index.bin"))
+# Re-read a little before the saved watermark so rows committed out of order are not lost
+CATCH_UP_OVERLAP = timedelta(minutes=5)
+# Queue workers on other instances keep adding matches; a long-lived worker
+# catches up with them at least this often
+MAX_AGE_SECONDS = int(os.getenv("MATCH_INDEX_MAX_AGE_SECONDS", "60"))
+
+# Bumped whenever the layout changes; any other prefix is rebuilt, not parsed
+_MAGIC = b"WOLMIDX2"
+_HEADER = struct.Struct("<QQIQ")
+
+
+class BloomFilter:
+    def __init__(self, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE, num_bits=None, num_hashes=None, bits=None, count=0):
+        self.capacity = capacity
+        self.num_bits = num_bits or max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = num_hashes or max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key):
+        # Only keys that set at least one new bit count towards the fill, so
+        # re-adding known keys (catch-up overlap, release()) doesn't inflate it
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def to_bytes(self):
+        return _HEADER.pack(self.capacity, self.num_bits, self.num_hashes, self.count) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        capacity, num_bits, num_hashes, count = _HEADER.unpack_from(data)
+        if len(data) - _HEADER.size != (num_bits + 7) // 8:
+            raise ValueError("Bloom filter size doesn't match its header")
+        return cls(capacity, num_bits=num_bits, num_hashes=num_hashes, bits=bytearray(data[_HEADER.size:]), count=count)
+
+
+class MatchIndex:
+    """Membership index of match IDs already stored in myRiotMatches.
+
+    The Bloom filter answers "definitely new" without touching the database;
+    only possible hits are confirmed against myRiotMatches. The filter is
+    persisted to INDEX_PATH together with the IngestedAt high-water mark, so a
+    new worker only has to read rows ingested since the last save.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.watermark = None
+        self.refreshed_at = None
+        self.in_flight = set()
+
+    def _load_file(self):
+        try:
+            with open(self.path, "rb") as f:
+                if f.read(len(_MAGIC)) != _MAGIC:
+                    raise ValueError("not a current match index snapshot")
+                watermark = f.readline().decode().strip()
+                bloom = BloomFilter.from_bytes(f.read())
+            return bloom, datetime.fromisoformat(watermark) if watermark else None
+        except (OSError, ValueError, struct.error) as e:
+            logging.info(f"No usable match index at {self.path}: {e}")
+            return None, None
+
+    def _read_ids(self, cursor, since=None):
+        # Tombstoned IDs are indexed too, so they are confirmed against SQL
+        # instead of being treated as definitely new
+        if since is None:
+            cursor.execute(
+                "SELECT MatchID, IngestedAt FROM myRiotMatches "
+                "UNION ALL SELECT MatchID, IngestedAt FROM MatchFetchTombstones"
+            )
+        else:
+            since = since - CATCH_UP_OVERLAP
+            cursor.execute(
+                "SELECT MatchID, IngestedAt FROM myRiotMatches WHERE IngestedAt > ? "
+                "UNION ALL SELECT MatchID, IngestedAt FROM MatchFetchTombstones WHERE IngestedAt > ?",
+                since, since
+            )
+        return cursor.fetchall()
+
+    def refresh(self, cursor):
+        with self.lock:
+            if self.bloom is None:
+                self.bloom, self.watermark = self._load_file()
+
+            if self.bloom is None:
+                rows = self._rebuild(cursor)
+            else:
+                rows = self._read_ids(cursor, self.watermark)
+                self._add_rows(rows)
+                if self.bloom.count > self.bloom.capacity:
+                    rows = self._rebuild(cursor)
+            self.refreshed_at = time.monotonic()
+            logging.info(f"Match index refreshed with {len(rows)} rows ({self.bloom.count} keys).")
+
+    def _rebuild(self, cursor):
+        # Full rebuild from the authoritative key set, sized with headroom
+        cursor.execute("SELECT (SELECT COUNT(*) FROM myRiotMatches) + (SELECT COUNT(*) FROM MatchFetchTombstones)")
+        total = cursor.fetchone()[0]
+        self.bloom = BloomFilter(capacity=max(DEFAULT_CAPACITY, 2 * total))
+        self.watermark = None
+        rows = self._read_ids(cursor)
+        self._add_rows(rows)
+        return rows
+
+    def _add_rows(self, rows):
+        for match_id, ingested_at in rows:
+            self.bloom.add(match_id)
+            if self.watermark is None or ingested_at > self.watermark:
+                self.watermark = ingested_at
+
+    def refresh_if_stale(self, cursor, max_age=MAX_AGE_SECONDS):
+        # Returns True if the index was refreshed
+        if self.refreshed_at is not None and time.monotonic() - self.refreshed_at < max_age:
+            return False
+        self.refresh(cursor)
+        return True
+
+    def claim_new(self, cursor, match_ids):
+        # Returns the IDs this caller should fetch: not stored yet and not being
+        # fetched by another lane. Callers must release() them afterwards.
+        with self.lock:
+            candidates = [m for m in set(match_ids) if m not in self.in_flight]
+            maybe_stored = [m for m in candidates if m in self.bloom]
+        stored = existing_match_ids(cursor, maybe_stored) if maybe_stored else set()
+        with self.lock:
+            new_ids = [m for m in candidates if m not in stored and m not in self.in_flight]
+            self.in_flight.update(new_ids)
+        return new_ids
+
+    def release(self, match_ids, stored=True):
+        with self.lock:
+            for match_id in match_ids:
+                self.in_flight.discard(match_id)
+                if stored:
+                    self.bloom.add(match_id)
+
+    def save(self):
+        with self.lock:
+            if self.bloom is None:
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_MAGIC)
+                f.write(((self.watermark.isoformat() if self.watermark else "") + "\n").encode())
+                f.write(self.bloom.to_bytes())
+            os.replace(tmp_path, self.path)
+
+
+# Loaded once per warm instance
+match_index = MatchIndex()
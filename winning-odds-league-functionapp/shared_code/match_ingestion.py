@@ -0,0 +1,155 @@
+import logging
+import os
+import time
+from collections import Counter
+
+from shared_code.aggregates import ensure_aggregate_tables
+from shared_code.bulk_write import chunked
+from shared_code.identity_index import identity_index
+from shared_code.match_index import match_index
+from shared_code.match_stream import PERMANENT_FAILURE_STATUS, stream_matches
+from shared_code.matches import CREATE_MATCH_TABLES_SQL, write_frames, write_matches, write_tombstones, write_watermarks
+from shared_code.riot_client import riot_client
+from shared_code.scheduler import build_refresh_queue
+from shared_code.telemetry import telemetry
+
+RANKED_SOLO_QUEUE = 420
+IDS_PAGE_SIZE = 100
+# First sync of a player only looks this far back instead of their whole history
+INITIAL_LOOKBACK_SECONDS = 14 * 24 * 3600
+# match-v5 filters on game start; re-list the last hour so games that were still
+# in progress during the previous sync are not missed. Duplicates are skipped.
+WATERMARK_OVERLAP_SECONDS = 3600
+# Parsed matches are written every this many matches, so a player with a long
+# backlog never holds more than one batch of rows in memory
+MATCH_WRITE_BATCH = int(os.getenv("MATCH_WRITE_BATCH", "50"))
+# Timelines are large and optional; FetchMatches can override this per run
+INGEST_TIMELINES = os.getenv("INGEST_TIMELINES", "0") == "1"
+
+MATCH_IDS_URL = "https://{routing}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids"
+MATCH_URL = "https://{routing}.api.riotgames.com/lol/match/v5/matches/{match_id}"
+TIMELINE_URL = "https://{routing}.api.riotgames.com/lol/match/v5/matches/{match_id}/timeline"
+
+
+def schedule_players(cursor, max_players):
+    # Only players whose wins + losses moved since their last sync (plus
+    # never-synced and long-idle ones) are queued, most games played first.
+    # Each player is (puuid, region, last_start_time, games_now).
+    cursor.execute(CREATE_MATCH_TABLES_SQL)
+    ensure_aggregate_tables(cursor)
+    match_index.refresh(cursor)
+    identity_index.refresh(cursor)
+    cursor.execute(
+        """
+        SELECT s.PUUID, s.Region, w.LastStartTime, s.Wins + s.Losses, w.GamesAtLastSync, w.LastSynced
+        FROM Summoners AS s
+        LEFT JOIN PlayerMatchWatermarks AS w ON w.PUUID = s.PUUID
+        WHERE s.PUUID IS NOT NULL
+        """
+    )
+    candidates = [
+        ((puuid, region, last_start_time, games_now), games_now, games_at_last_sync, last_synced)
+        for puuid, region, last_start_time, games_now, games_at_last_sync, last_synced in cursor.fetchall()
+    ]
+    players = build_refresh_queue(candidates, max_players)
+    logging.info(f"Scheduled {len(players)} of {len(candidates)} players for a match refresh.")
+    return players
+
+
+def list_match_ids(routing, puuid, start_time):
+    # Returns None when the PUUID itself is rejected (e.g. it was encrypted
+    # with a rotated API key); retrying won't help
+    match_ids = []
+    start = 0
+    while True:
+        url = (
+            MATCH_IDS_URL.format(routing=routing, puuid=puuid)
+            + f"?startTime={start_time}&queue={RANKED_SOLO_QUEUE}&start={start}&count={IDS_PAGE_SIZE}"
+        )
+        response = riot_client.get(url, routing, "match-v5.ids-by-puuid")
+        if response.status_code in PERMANENT_FAILURE_STATUS:
+            logging.warning(f"{response.status_code} listing matches for {puuid} on {routing}; parking the player.")
+            return None
+        if response.status_code != 200:
+            raise Exception(f"Failed to list matches for {puuid} on {routing}: {response.text}")
+
+        page = response.json()
+        match_ids.extend(page)
+        if len(page) < IDS_PAGE_SIZE:
+            return match_ids
+        start += IDS_PAGE_SIZE
+
+
+def count_tracked_participants(routing, participant_rows):
+    # Ladder coverage of the stored matches: participants who are tracked
+    # players, by home region, resolved in-process by the identity index
+    # instead of joining every batch against Summoners
+    regions = identity_index.regions_for([row[1] for row in participant_rows])
+    for region, count in Counter(region for region in regions if region).items():
+        telemetry.count("matches.tracked_participants", count, routing=routing, region=region)
+
+
+def ingest_player(cursor, routing, player, timelines=INGEST_TIMELINES, deadline=None):
+    # Safe to repeat: matches are insert-only and the watermark only moves
+    # forward once the player's matches are stored. Returns (inserted,
+    # complete); past the deadline the player is left unfinished and the
+    # watermark stays put, so the next run picks up the rest.
+    puuid, region, last_start_time, games_now = player
+    sync_started = int(time.time())
+    if last_start_time is None:
+        start_time = sync_started - INITIAL_LOOKBACK_SECONDS
+    else:
+        start_time = last_start_time - WATERMARK_OVERLAP_SECONDS
+
+    match_ids = list_match_ids(routing, puuid, start_time)
+    if match_ids is None:
+        # Parked: recorded as synced at the old start time, so the scheduler
+        # skips the player until their game count moves or they go idle
+        # instead of putting them first again on every run
+        parked_start = last_start_time if last_start_time is not None else start_time
+        write_watermarks(cursor, [(puuid, region, parked_start, games_now)])
+        telemetry.count("matches.players_parked", routing=routing)
+        return 0, True
+
+    # Teammates and opponents share matches; only fetch each one once
+    new_ids = match_index.claim_new(cursor, match_ids)
+
+    inserted = 0
+    stored_ids = set()
+    unavailable = []
+    out_of_time = False
+
+    def until_deadline(items):
+        # Checked before each match is fetched, not just between players
+        nonlocal out_of_time
+        items = iter(items)
+        while deadline is None or time.monotonic() < deadline:
+            try:
+                yield next(items)
+            except StopIteration:
+                return
+        out_of_time = True
+
+    try:
+        parsed = stream_matches(routing, sorted(new_ids), MATCH_URL, TIMELINE_URL if timelines else None, unavailable)
+        for batch in chunked(until_deadline(parsed), MATCH_WRITE_BATCH):
+            participant_rows = [row for _, rows, _ in batch for row in rows]
+            inserted += write_matches(cursor, [match_row for match_row, _, _ in batch], participant_rows)
+            count_tracked_participants(routing, participant_rows)
+            write_frames(cursor, [row for _, _, frame_rows in batch for row in frame_rows])
+            stored_ids.update(match_row[0] for match_row, _, _ in batch)
+        write_tombstones(cursor, unavailable)
+        stored_ids.update(unavailable)
+    finally:
+        # Batches written before a failure are stored (autocommit); the rest
+        # are left for the next run
+        match_index.release(stored_ids)
+        match_index.release(set(new_ids) - stored_ids, stored=False)
+
+    if out_of_time:
+        logging.info(f"Time budget reached during {puuid}; {len(set(new_ids) - stored_ids)} matches left for the next run.")
+        return inserted, False
+
+    # Matches first, then the watermark, so a crash never skips games
+    write_watermarks(cursor, [(puuid, region, sync_started, games_now)])
+    return inserted, True
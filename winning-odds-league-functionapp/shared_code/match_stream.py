@@ -0,0 +1,132 @@
+import logging
+import os
+
+from shared_code.lazy import lazy_import
+from shared_code.matches import parse_match
+from shared_code.riot_client import riot_client
+from shared_code.telemetry import telemetry
+
+ijson = lazy_import("ijson")
+
+# match-v5 statuses that won't change on a retry; the match is skipped
+PERMANENT_FAILURE_STATUS = {400, 404, 410}
+# Timeline frames are one per minute; only these minutes are stored
+TIMELINE_MINUTES = frozenset(int(m) for m in os.getenv("TIMELINE_MINUTES", "10,15,20").split(","))
+
+# Fields parse_match reads; everything else in the payload is skipped
+MATCH_INFO_FIELDS = {"platformId", "queueId", "gameVersion", "gameStartTimestamp", "gameDuration"}
+PARTICIPANT_FIELDS = {"puuid", "teamId", "teamPosition", "championId", "championName", "kills", "deaths", "assists", "win"}
+FRAME_FIELDS = {"totalGold", "xp", "minionsKilled", "jungleMinionsKilled"}
+
+PARTICIPANT_PREFIX = "info.participants.item"
+TEAM_PREFIX = "info.teams.item"
+FRAME_PREFIX = "info.frames.item"
+PARTICIPANT_FRAMES_PREFIX = "info.frames.item.participantFrames."
+
+
+def parse_match_stream(stream):
+    # Event-level parse of a MatchDto. Only the fields we store are collected
+    # into a skeleton MatchDto, so memory doesn't grow with the size of the
+    # payload (perks, challenges, objectives, ...).
+    info = {"participants": [], "teams": []}
+    data = {"metadata": {}, "info": info}
+    current = None
+    for prefix, event, value in ijson.parse(stream):
+        if prefix == "metadata.matchId":
+            data["metadata"]["matchId"] = value
+        elif prefix.startswith(PARTICIPANT_PREFIX):
+            if prefix == PARTICIPANT_PREFIX:
+                if event == "start_map":
+                    current = {}
+                elif event == "end_map":
+                    info["participants"].append(current)
+            else:
+                field = prefix[len(PARTICIPANT_PREFIX) + 1:]
+                if field in PARTICIPANT_FIELDS:
+                    current[field] = value
+        elif prefix.startswith(TEAM_PREFIX):
+            if prefix == TEAM_PREFIX:
+                if event == "start_map":
+                    current = {}
+                elif event == "end_map":
+                    info["teams"].append(current)
+            elif prefix in ("info.teams.item.teamId", "info.teams.item.win"):
+                current[prefix[len(TEAM_PREFIX) + 1:]] = value
+        elif prefix.startswith("info.") and prefix[5:] in MATCH_INFO_FIELDS:
+            info[prefix[5:]] = value
+    return parse_match(data)
+
+
+def parse_timeline_stream(stream, minutes=TIMELINE_MINUTES):
+    # MatchTimelineDto -> [(MatchID, PUUID, Minute, TotalGold, XP, CreepScore)]
+    # for the selected minutes. Events, which make up most of the payload, are
+    # tokenized but never built into objects.
+    match_id = None
+    puuids = []
+    frames = {}
+    minute = -1
+    for prefix, event, value in ijson.parse(stream):
+        if prefix == FRAME_PREFIX:
+            if event == "start_map":
+                minute += 1
+        elif prefix.startswith(PARTICIPANT_FRAMES_PREFIX):
+            if minute not in minutes:
+                continue
+            participant_id, _, field = prefix[len(PARTICIPANT_FRAMES_PREFIX):].partition(".")
+            if field in FRAME_FIELDS:
+                frames.setdefault((minute, int(participant_id)), {})[field] = value
+        elif prefix == "metadata.matchId":
+            match_id = value
+        elif prefix == "metadata.participants.item":
+            puuids.append(value)
+
+    rows = []
+    for (frame_minute, participant_id), fields in sorted(frames.items()):
+        if participant_id > len(puuids):
+            continue
+        rows.append((
+            match_id,
+            puuids[participant_id - 1],
+            frame_minute,
+            fields.get("totalGold", 0),
+            fields.get("xp", 0),
+            fields.get("minionsKilled", 0) + fields.get("jungleMinionsKilled", 0),
+        ))
+    return rows
+
+
+def fetch_parsed(url, routing, method, parse):
+    # Streams the response body straight into the parser instead of
+    # materializing it with response.json(). Returns None when the resource
+    # is permanently unavailable.
+    response = riot_client.get(url, routing, method, stream=True)
+    try:
+        if response.status_code in PERMANENT_FAILURE_STATUS:
+            logging.warning(f"{response.status_code} for {url}; skipping.")
+            return None
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch {url}: {response.text}")
+        response.raw.decode_content = True
+        # Includes reading the body, which streams in as it is parsed
+        with telemetry.span("riot.parse", method=method):
+            return parse(response.raw)
+    finally:
+        response.close()
+
+
+def stream_matches(routing, match_ids, match_url, timeline_url=None, unavailable=None):
+    # Generator pipeline: yields (match_row, participant_rows, frame_rows) one
+    # match at a time, so callers can write in batches as they go. IDs that
+    # can't be fetched are appended to unavailable.
+    for match_id in match_ids:
+        parsed = fetch_parsed(match_url.format(routing=routing, match_id=match_id), routing, "match-v5.match", parse_match_stream)
+        if parsed is None:
+            if unavailable is not None:
+                unavailable.append(match_id)
+            continue
+        frame_rows = []
+        if timeline_url:
+            frame_rows = fetch_parsed(
+                timeline_url.format(routing=routing, match_id=match_id), routing, "match-v5.timeline", parse_timeline_stream
+            ) or []
+        yield parsed[0], parsed[1], frame_rows
@@ -0,0 +1,295 @@
+import logging
+
+from shared_code.aggregates import update_aggregates
+from shared_code.bulk_write import create_staging_table, stage_rows
+from shared_code.telemetry import telemetry
+
+CREATE_MATCH_TABLES_SQL = """
+-- The first version of myRiotMatches only held sample rows with an INT MatchID
+IF EXISTS (
+    SELECT *
+    FROM sys.columns
+    WHERE object_id = OBJECT_ID('myRiotMatches') AND name = 'PlayerName'
+)
+BEGIN
+    DROP TABLE myRiotMatches;
+END
+
+IF NOT EXISTS (
+    SELECT *
+    FROM sys.tables
+    WHERE name = 'myRiotMatches'
+)
+BEGIN
+    CREATE TABLE myRiotMatches (
+        MatchID VARCHAR(30) NOT NULL PRIMARY KEY,
+        Platform VARCHAR(10) NOT NULL,
+        QueueID INT NOT NULL,
+        GameVersion VARCHAR(30) NULL,
+        GameStart BIGINT NOT NULL,
+        GameDuration INT NOT NULL,
+        WinningTeam INT NULL,
+        IngestedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+    );
+END
+
+IF NOT EXISTS (
+    SELECT *
+    FROM sys.tables
+    WHERE name = 'myRiotMatchParticipants'
+)
+BEGIN
+    CREATE TABLE myRiotMatchParticipants (
+        MatchID VARCHAR(30) NOT NULL,
+        PUUID VARCHAR(100) NOT NULL,
+        TeamID INT NOT NULL,
+        TeamPosition VARCHAR(20) NULL,
+        ChampionID INT NOT NULL,
+        ChampionName VARCHAR(30) NULL,
+        Kills INT NOT NULL,
+        Deaths INT NOT NULL,
+        Assists INT NOT NULL,
+        Win BIT NOT NULL,
+        PRIMARY KEY (MatchID, PUUID)
+    );
+END
+
+IF NOT EXISTS (
+    SELECT *
+    FROM sys.tables
+    WHERE name = 'PlayerMatchWatermarks'
+)
+BEGIN
+    CREATE TABLE PlayerMatchWatermarks (
+        PUUID VARCHAR(100) NOT NULL PRIMARY KEY,
+        Region VARCHAR(10) NOT NULL,
+        LastStartTime BIGINT NOT NULL,
+        LastSynced DATETIME2 NOT NULL
+    );
+END
+
+IF NOT EXISTS (
+    SELECT *
+    FROM sys.tables
+    WHERE name = 'myRiotMatchFrames'
+)
+BEGIN
+    CREATE TABLE myRiotMatchFrames (
+        MatchID VARCHAR(30) NOT NULL,
+        PUUID VARCHAR(100) NOT NULL,
+        Minute INT NOT NULL,
+        TotalGold INT NOT NULL,
+        XP INT NOT NULL,
+        CreepScore INT NOT NULL,
+        PRIMARY KEY (MatchID, PUUID, Minute)
+    );
+END
+
+-- Match IDs that can never be fetched (e.g. 404 from match-v5), so they
+-- aren't claimed and requested again on every run
+IF NOT EXISTS (
+    SELECT *
+    FROM sys.tables
+    WHERE name = 'MatchFetchTombstones'
+)
+BEGIN
+    CREATE TABLE MatchFetchTombstones (
+        MatchID VARCHAR(30) NOT NULL PRIMARY KEY,
+        IngestedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+    );
+END
+
+-- Wins + losses at the last sync, used by the refresh scheduler
+IF COL_LENGTH('PlayerMatchWatermarks', 'GamesAtLastSync') IS NULL
+BEGIN
+    ALTER TABLE PlayerMatchWatermarks ADD GamesAtLastSync INT NULL;
+END
+"""
+
+MATCH_COLUMNS = [
+    ("MatchID", "VARCHAR(30) NOT NULL"),
+    ("Platform", "VARCHAR(10) NOT NULL"),
+    ("QueueID", "INT NOT NULL"),
+    ("GameVersion", "VARCHAR(30) NULL"),
+    ("GameStart", "BIGINT NOT NULL"),
+    ("GameDuration", "INT NOT NULL"),
+    ("WinningTeam", "INT NULL"),
+]
+
+PARTICIPANT_COLUMNS = [
+    ("MatchID", "VARCHAR(30) NOT NULL"),
+    ("PUUID", "VARCHAR(100) NOT NULL"),
+    ("TeamID", "INT NOT NULL"),
+    ("TeamPosition", "VARCHAR(20) NULL"),
+    ("ChampionID", "INT NOT NULL"),
+    ("ChampionName", "VARCHAR(30) NULL"),
+    ("Kills", "INT NOT NULL"),
+    ("Deaths", "INT NOT NULL"),
+    ("Assists", "INT NOT NULL"),
+    ("Win", "BIT NOT NULL"),
+]
+
+FRAME_COLUMNS = [
+    ("MatchID", "VARCHAR(30) NOT NULL"),
+    ("PUUID", "VARCHAR(100) NOT NULL"),
+    ("Minute", "INT NOT NULL"),
+    ("TotalGold", "INT NOT NULL"),
+    ("XP", "INT NOT NULL"),
+    ("CreepScore", "INT NOT NULL"),
+]
+
+WATERMARK_COLUMNS = [
+    ("PUUID", "VARCHAR(100) NOT NULL"),
+    ("Region", "VARCHAR(10) NOT NULL"),
+    ("LastStartTime", "BIGINT NOT NULL"),
+    ("GamesAtLastSync", "INT NULL"),
+]
+
+
+def parse_match(data):
+    # match-v5 MatchDto -> (match row, [participant rows])
+    match_id = data["metadata"]["matchId"]
+    info = data["info"]
+
+    winning_team = next((team["teamId"] for team in info.get("teams", []) if team.get("win")), None)
+    match_row = (
+        match_id,
+        info.get("platformId", match_id.split("_")[0]).lower(),
+        info["queueId"],
+        info.get("gameVersion"),
+        info["gameStartTimestamp"],
+        info["gameDuration"],
+        winning_team,
+    )
+
+    participant_rows = [
+        (
+            match_id,
+            p["puuid"],
+            p["teamId"],
+            p.get("teamPosition") or None,
+            p["championId"],
+            p.get("championName"),
+            p["kills"],
+            p["deaths"],
+            p["assists"],
+            bool(p["win"]),
+        )
+        for p in info["participants"]
+    ]
+    return match_row, participant_rows
+
+
+def write_matches(cursor, match_rows, participant_rows):
+    # Insert-only: a match that is already stored is never rewritten. The
+    # UPDLOCK, HOLDLOCK range locks make the existence check and the insert
+    # atomic, so concurrent workers writing the same match don't collide on
+    # the primary key; the later one waits and then inserts nothing.
+    if not match_rows:
+        return 0
+
+    stage_rows(cursor, "#NewMatches", MATCH_COLUMNS, match_rows)
+    stage_rows(cursor, "#NewParticipants", PARTICIPANT_COLUMNS, participant_rows)
+
+    match_columns = ", ".join(name for name, _ in MATCH_COLUMNS)
+    participant_columns = ", ".join(name for name, _ in PARTICIPANT_COLUMNS)
+    create_staging_table(cursor, "#InsertedMatches", MATCH_COLUMNS[:2])
+    with telemetry.span("sql.insert_matches", matches=len(match_rows)):
+        cursor.execute(f"""
+        INSERT INTO myRiotMatches ({match_columns})
+        OUTPUT inserted.MatchID, inserted.Platform INTO #InsertedMatches (MatchID, Platform)
+        SELECT {match_columns}
+        FROM #NewMatches AS Source
+        WHERE NOT EXISTS (SELECT 1 FROM myRiotMatches AS m WITH (UPDLOCK, HOLDLOCK) WHERE m.MatchID = Source.MatchID);
+        """)
+        inserted = cursor.rowcount
+        cursor.execute(f"""
+        INSERT INTO myRiotMatchParticipants ({participant_columns})
+        SELECT {participant_columns}
+        FROM #NewParticipants AS Source
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM myRiotMatchParticipants AS p WITH (UPDLOCK, HOLDLOCK)
+            WHERE p.MatchID = Source.MatchID AND p.PUUID = Source.PUUID
+        );
+        """)
+        participants_inserted = cursor.rowcount
+    telemetry.count("sql.rows_written", inserted, table="myRiotMatches")
+    telemetry.count("sql.rows_written", participants_inserted, table="myRiotMatchParticipants")
+    logging.info(f"Inserted {inserted} matches and {participants_inserted} participant rows.")
+
+    # Only matches inserted by this call count towards the odds aggregates
+    if inserted > 0:
+        update_aggregates(cursor, "#NewParticipants", "#InsertedMatches")
+    return inserted
+
+
+def write_frames(cursor, frame_rows):
+    if not frame_rows:
+        return 0
+    stage_rows(cursor, "#NewFrames", FRAME_COLUMNS, frame_rows)
+    frame_columns = ", ".join(name for name, _ in FRAME_COLUMNS)
+    with telemetry.span("sql.insert_frames", rows=len(frame_rows)):
+        cursor.execute(f"""
+        INSERT INTO myRiotMatchFrames ({frame_columns})
+        SELECT {frame_columns}
+        FROM #NewFrames AS Source
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM myRiotMatchFrames AS f WITH (UPDLOCK, HOLDLOCK)
+            WHERE f.MatchID = Source.MatchID AND f.PUUID = Source.PUUID AND f.Minute = Source.Minute
+        );
+        """)
+    telemetry.count("sql.rows_written", cursor.rowcount, table="myRiotMatchFrames")
+    return cursor.rowcount
+
+
+def write_watermarks(cursor, watermark_rows):
+    if not watermark_rows:
+        return
+    stage_rows(cursor, "#NewWatermarks", WATERMARK_COLUMNS, watermark_rows)
+    with telemetry.span("sql.merge_watermarks", rows=len(watermark_rows)):
+        cursor.execute("""
+        MERGE INTO PlayerMatchWatermarks AS Target
+        USING #NewWatermarks AS Source
+        ON Target.PUUID = Source.PUUID
+        WHEN MATCHED THEN
+            UPDATE SET
+                LastStartTime = Source.LastStartTime,
+                Region = Source.Region,
+                GamesAtLastSync = Source.GamesAtLastSync,
+                LastSynced = SYSUTCDATETIME()
+        WHEN NOT MATCHED THEN
+            INSERT (PUUID, Region, LastStartTime, GamesAtLastSync, LastSynced)
+            VALUES (Source.PUUID, Source.Region, Source.LastStartTime, Source.GamesAtLastSync, SYSUTCDATETIME());
+        """)
+
+
+def write_tombstones(cursor, match_ids):
+    if not match_ids:
+        return
+    stage_rows(cursor, "#NewTombstones", MATCH_COLUMNS[:1], [(match_id,) for match_id in match_ids])
+    cursor.execute("""
+    INSERT INTO MatchFetchTombstones (MatchID)
+    SELECT DISTINCT Source.MatchID
+    FROM #NewTombstones AS Source
+    WHERE NOT EXISTS (SELECT 1 FROM MatchFetchTombstones AS t WITH (UPDLOCK, HOLDLOCK) WHERE t.MatchID = Source.MatchID);
+    """)
+    logging.info(f"Recorded {cursor.rowcount} unavailable matches.")
+
+
+def existing_match_ids(cursor, match_ids):
+    # Stored or tombstoned, i.e. never worth fetching again
+    found = set()
+    match_ids = list(match_ids)
+    # SQL Server allows at most 2100 parameters per statement
+    for i in range(0, len(match_ids), 1000):
+        chunk = match_ids[i:i + 1000]
+        placeholders = ", ".join("?" for _ in chunk)
+        cursor.execute(
+            f"SELECT MatchID FROM myRiotMatches WHERE MatchID IN ({placeholders}) "
+            f"UNION ALL SELECT MatchID FROM MatchFetchTombstones WHERE MatchID IN ({placeholders})",
+            *chunk, *chunk
+        )
+        found.update(row[0] for row in cursor.fetchall())
+    return found
@@ -0,0 +1,244 @@
+import logging
+from operator import itemgetter
+
+from shared_code.bulk_write import stage_rows
+from shared_code.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+BLUE_TEAM = 100
+# Stored with the coefficients; the intercept captures blue-side advantage
+INTERCEPT_ID = -1
+
+CREATE_MODEL_TABLE_SQL = """
+IF NOT EXISTS (
+    SELECT *
+    FROM sys.tables
+    WHERE name = 'OddsModelCoefficients'
+)
+BEGIN
+    CREATE TABLE OddsModelCoefficients (
+        ChampionID INT NOT NULL PRIMARY KEY,
+        Coefficient FLOAT NOT NULL,
+        Games INT NOT NULL,
+        FittedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+    );
+END
+"""
+
+MODEL_COLUMNS = [
+    ("ChampionID", "INT NOT NULL"),
+    ("Coefficient", "FLOAT NOT NULL"),
+    ("Games", "INT NOT NULL"),
+]
+
+
+class MatchArrays:
+    """Columnar view of stored matches: one row per match, champions per side."""
+
+    def __init__(self, match_ids, blue_champions, red_champions, blue_win):
+        self.match_ids = match_ids
+        self.blue_champions = blue_champions
+        self.red_champions = red_champions
+        self.blue_win = blue_win
+
+    def __len__(self):
+        return len(self.match_ids)
+
+
+def load_match_arrays(cursor, since=None, fetch_size=50_000):
+    # Participants arrive as flat columns and are reshaped into (matches, 5)
+    # arrays per side; matches without exactly 5 players per team are dropped.
+    sql = """
+    SELECT p.MatchID, p.TeamID, p.ChampionID, m.WinningTeam
+    FROM myRiotMatchParticipants AS p
+    INNER JOIN myRiotMatches AS m ON m.MatchID = p.MatchID
+    WHERE m.WinningTeam IS NOT NULL
+    """
+    params = []
+    if since is not None:
+        sql += " AND m.IngestedAt > ?"
+        params.append(since)
+    cursor.execute(sql + " ORDER BY p.MatchID, p.TeamID, p.ChampionID", *params)
+
+    # Each fetchmany chunk becomes one typed array per column; fromiter over
+    # itemgetter walks the rows in C instead of a Python loop per row
+    dtypes = (object, np.int16, np.int32, np.int16)
+    chunks = [[] for _ in dtypes]
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        for position, (chunk, dtype) in enumerate(zip(chunks, dtypes)):
+            chunk.append(np.fromiter(map(itemgetter(position), rows), dtype=dtype, count=len(rows)))
+    columns = [np.concatenate(chunk) if chunk else np.empty(0, dtype=dtype) for chunk, dtype in zip(chunks, dtypes)]
+    return build_match_arrays(*columns)
+
+
+def build_match_arrays(match_ids, team_ids, champion_ids, winning_teams):
+    # Fixed-width strings (sized to the longest ID) sort much faster in
+    # np.unique than Python objects
+    match_ids = np.asarray(match_ids, dtype=str)
+    team_ids = np.asarray(team_ids, dtype=np.int16)
+    champion_ids = np.asarray(champion_ids, dtype=np.int32)
+    winning_teams = np.asarray(winning_teams, dtype=np.int16)
+    if len(match_ids) == 0:
+        empty = np.empty((0, 5), dtype=np.int32)
+        return MatchArrays(np.empty(0, dtype=str), empty, empty, np.empty(0, dtype=bool))
+
+    unique_ids, match_index = np.unique(match_ids, return_inverse=True)
+    is_blue = team_ids == BLUE_TEAM
+    blue_counts = np.bincount(match_index[is_blue], minlength=len(unique_ids))
+    red_counts = np.bincount(match_index[~is_blue], minlength=len(unique_ids))
+    complete = (blue_counts == 5) & (red_counts == 5)
+    if not complete.all():
+        logging.info(f"Skipping {int((~complete).sum())} matches without 5 players per side.")
+
+    keep = complete[match_index]
+    order = np.lexsort((champion_ids[keep], ~is_blue[keep], match_index[keep]))
+    champions = champion_ids[keep][order].reshape(-1, 10)
+    winners = np.zeros(len(unique_ids), dtype=np.int16)
+    winners[match_index] = winning_teams
+
+    return MatchArrays(
+        unique_ids[complete],
+        champions[:, :5],
+        champions[:, 5:],
+        winners[complete] == BLUE_TEAM,
+    )
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class WinOddsModel:
+    """Logistic team-composition model.
+
+    logit P(blue wins) = intercept + sum(strength[blue champions]) - sum(strength[red champions])
+    """
+
+    def __init__(self, champion_ids=None, coefficients=None, intercept=0.0, games=None):
+        self.champion_ids = np.asarray(champion_ids if champion_ids is not None else [], dtype=np.int32)
+        self.coefficients = np.asarray(coefficients if coefficients is not None else np.zeros(len(self.champion_ids)), dtype=np.float64)
+        self.intercept = float(intercept)
+        self.games = np.asarray(games if games is not None else np.zeros(len(self.champion_ids)), dtype=np.int64)
+        self._build_lookup()
+
+    def _build_lookup(self):
+        # Dense champion id -> column lookup; unknown champions map to a zero column
+        size = int(self.champion_ids.max()) + 2 if len(self.champion_ids) else 1
+        self.lookup = np.full(size, len(self.champion_ids), dtype=np.int32)
+        self.lookup[self.champion_ids] = np.arange(len(self.champion_ids), dtype=np.int32)
+        self._padded = np.append(self.coefficients, 0.0)
+
+    def _columns(self, champions):
+        champions = np.asarray(champions, dtype=np.int64)
+        in_range = (champions >= 0) & (champions < len(self.lookup) - 1)
+        return np.where(in_range, self.lookup[np.clip(champions, 0, len(self.lookup) - 1)], len(self.champion_ids))
+
+    def _design(self, arrays, champion_ids):
+        # Sparse-as-dense (matches x champions) matrix with +1 blue / -1 red;
+        # champion_ids is sorted, so columns are found with searchsorted
+        rows = np.repeat(np.arange(len(arrays)), 5)
+        x = np.zeros((len(arrays), len(champion_ids) + 1), dtype=np.float64)
+        x[:, -1] = 1.0
+        np.add.at(x, (rows, np.searchsorted(champion_ids, arrays.blue_champions).ravel()), 1.0)
+        np.add.at(x, (rows, np.searchsorted(champion_ids, arrays.red_champions).ravel()), -1.0)
+        return x
+
+    def fit(self, arrays, l2=1.0, max_iter=25, tol=1e-6, incremental=False):
+        # Newton/IRLS, warm-started from the current coefficients. With
+        # incremental=True only new matches are passed in and the L2 penalty
+        # pulls towards the current model instead of towards zero, so an
+        # update doesn't need the full history.
+        if len(arrays) == 0:
+            return self
+        champion_ids = np.union1d(self.champion_ids, np.union1d(arrays.blue_champions, arrays.red_champions)).astype(np.int32)
+        x = self._design(arrays, champion_ids)
+        y = arrays.blue_win.astype(np.float64)
+
+        beta = np.zeros(x.shape[1])
+        beta[:-1] = self.predict_strengths(champion_ids)
+        beta[-1] = self.intercept
+        prior = beta.copy() if incremental else np.zeros_like(beta)
+        penalty = np.full(x.shape[1], l2)
+        penalty[-1] = 0.0
+
+        for iteration in range(max_iter):
+            p = _sigmoid(x @ beta)
+            gradient = x.T @ (p - y) + penalty * (beta - prior)
+            hessian = (x * (p * (1 - p))[:, None]).T @ x + np.diag(penalty + 1e-9)
+            step = np.linalg.solve(hessian, gradient)
+            beta -= step
+            if np.max(np.abs(step)) < tol:
+                break
+        logging.info(f"Odds model fitted on {len(arrays)} matches in {iteration + 1} Newton steps.")
+
+        games = np.count_nonzero(x[:, :-1], axis=0)
+        if incremental:
+            games = games + np.append(self.games, 0)[self._columns(champion_ids)]
+        self.champion_ids = champion_ids
+        self.coefficients = beta[:-1]
+        self.intercept = beta[-1]
+        self.games = games.astype(np.int64)
+        self._build_lookup()
+        return self
+
+    def predict_strengths(self, champion_ids):
+        return self._padded[self._columns(champion_ids)]
+
+    def predict(self, blue_champions, red_champions):
+        # (k, 5) champion id arrays per side -> (k,) P(blue wins), in one pass
+        blue = self._padded[self._columns(blue_champions)].sum(axis=-1)
+        red = self._padded[self._columns(red_champions)].sum(axis=-1)
+        return _sigmoid(self.intercept + blue - red)
+
+    def evaluate(self, arrays):
+        if len(arrays) == 0:
+            return {"matches": 0}
+        p = np.clip(self.predict(arrays.blue_champions, arrays.red_champions), 1e-12, 1 - 1e-12)
+        y = arrays.blue_win
+        return {
+            "matches": int(len(arrays)),
+            "log_loss": float(-np.mean(np.where(y, np.log(p), np.log(1 - p)))),
+            "accuracy": float(np.mean((p >= 0.5) == y)),
+        }
+
+
+def save_model(cursor, model):
+    cursor.execute(CREATE_MODEL_TABLE_SQL)
+    rows = [(INTERCEPT_ID, float(model.intercept), int(model.games.sum() // 10))]
+    rows += [(int(c), float(b), int(g)) for c, b, g in zip(model.champion_ids, model.coefficients, model.games)]
+    stage_rows(cursor, "#OddsModel", MODEL_COLUMNS, rows)
+    cursor.execute("""
+    MERGE INTO OddsModelCoefficients AS Target
+    USING #OddsModel AS Source
+    ON Target.ChampionID = Source.ChampionID
+    WHEN MATCHED THEN
+        UPDATE SET Coefficient = Source.Coefficient, Games = Source.Games, FittedAt = SYSUTCDATETIME()
+    WHEN NOT MATCHED THEN
+        INSERT (ChampionID, Coefficient, Games)
+        VALUES (Source.ChampionID, Source.Coefficient, Source.Games);
+    """)
+
+
+def last_fitted_at(cursor):
+    cursor.execute(CREATE_MODEL_TABLE_SQL)
+    cursor.execute("SELECT MAX(FittedAt) FROM OddsModelCoefficients")
+    return cursor.fetchone()[0]
+
+
+def load_model(cursor):
+    cursor.execute(CREATE_MODEL_TABLE_SQL)
+    cursor.execute("SELECT ChampionID, Coefficient, Games FROM OddsModelCoefficients ORDER BY ChampionID")
+    intercept = 0.0
+    champion_ids, coefficients, games = [], [], []
+    for champion_id, coefficient, champion_games in cursor.fetchall():
+        if champion_id == INTERCEPT_ID:
+            intercept = coefficient
+        else:
+            champion_ids.append(champion_id)
+            coefficients.append(coefficient)
+            games.append(champion_games)
+    return WinOddsModel(champion_ids, coefficients, intercept, games)
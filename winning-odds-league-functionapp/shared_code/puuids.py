@@ -0,0 +1,139 @@
+import logging
+import time
+
+from shared_code.bulk_write import bulk_update, stage_rows
+from shared_code.identity_index import identity_index
+from shared_code.riot_client import riot_client
+from shared_code.telemetry import telemetry
+
+# Summoners that failed this many times are skipped until the row is reset
+MAX_ATTEMPTS = 5
+
+CREATE_FAILURES_TABLE_SQL = """
+IF NOT EXISTS (
+    SELECT *
+    FROM sys.tables
+    WHERE name = 'PuuidFetchFailures'
+)
+BEGIN
+    CREATE TABLE PuuidFetchFailures (
+        SummonerID VARCHAR(100) NOT NULL,
+        Region VARCHAR(10) NOT NULL,
+        Attempts INT NOT NULL,
+        LastError VARCHAR(500) NULL,
+        LastAttempt DATETIME2 NOT NULL,
+        PRIMARY KEY (SummonerID, Region)
+    );
+END
+"""
+
+PUUID_STAGING_COLUMNS = [
+    ("PUUID", "VARCHAR(100) NOT NULL"),
+    ("SummonerID", "VARCHAR(100) NOT NULL"),
+    ("Region", "VARCHAR(10) NOT NULL"),
+]
+
+FAILURE_STAGING_COLUMNS = [
+    ("SummonerID", "VARCHAR(100) NOT NULL"),
+    ("Region", "VARCHAR(10) NOT NULL"),
+    ("LastError", "VARCHAR(500) NULL"),
+]
+
+def commit_batch(cursor, batch_puuids, batch_failures):
+    if batch_puuids:
+        bulk_update(cursor, "Summoners", "#PuuidUpdates", PUUID_STAGING_COLUMNS, ["SummonerID", "Region"], batch_puuids)
+        cursor.execute("""
+        DELETE f
+        FROM PuuidFetchFailures AS f
+        INNER JOIN #PuuidUpdates AS u
+            ON f.SummonerID = u.SummonerID AND f.Region = u.Region;
+        """)
+
+    if batch_failures:
+        stage_rows(cursor, "#PuuidFailures", FAILURE_STAGING_COLUMNS, batch_failures)
+        with telemetry.span("sql.merge_failures", rows=len(batch_failures)):
+            cursor.execute("""
+            MERGE INTO PuuidFetchFailures AS Target
+            USING #PuuidFailures AS Source
+            ON Target.SummonerID = Source.SummonerID AND Target.Region = Source.Region
+            WHEN MATCHED THEN
+                UPDATE SET Attempts = Target.Attempts + 1, LastError = Source.LastError, LastAttempt = SYSUTCDATETIME()
+            WHEN NOT MATCHED THEN
+                INSERT (SummonerID, Region, Attempts, LastError, LastAttempt)
+                VALUES (Source.SummonerID, Source.Region, 1, Source.LastError, SYSUTCDATETIME());
+            """)
+
+
+def select_pending_summoners(cursor):
+    # Rows with a PUUID are done, so the table itself is the checkpoint; failed
+    # IDs are parked in PuuidFetchFailures and retried after fresh ones.
+    # Active players come first since only they need match refreshes.
+    cursor.execute(CREATE_FAILURES_TABLE_SQL)
+    cursor.execute(
+        """
+        SELECT s.SummonerID, s.Region
+        FROM Summoners AS s
+        LEFT JOIN PuuidFetchFailures AS f
+            ON f.SummonerID = s.SummonerID AND f.Region = s.Region
+        WHERE s.PUUID IS NULL
+        AND (f.Attempts IS NULL OR f.Attempts < ?)
+        ORDER BY CASE WHEN f.SummonerID IS NULL THEN 0 ELSE 1 END,
+            ISNULL(s.Inactive, 0),
+            ISNULL(s.Wins + s.Losses, 0) DESC,
+            f.LastAttempt
+        """,
+        MAX_ATTEMPTS
+    )
+    return cursor.fetchall()
+
+
+def fetch_puuids(region, summoner_ids, deadline=None):
+    # Summoners already in the identity index (e.g. players back on the ladder
+    # after dropping off, whose rows were re-inserted without a PUUID) are
+    # resolved without an API call. Past the deadline no further calls are
+    # made; summoners in neither returned list are left for the next run.
+    known = identity_index.known_puuids(region, summoner_ids)
+    puuids = []
+    fetched = []
+    failures = []
+    # Each summoner once, even if the batch repeats an ID
+    for summoner_id in dict.fromkeys(summoner_ids):
+        if summoner_id in known:
+            puuids.append((known[summoner_id], summoner_id, region))
+            continue
+        # A full rate-limit window can hold a call back for most of two
+        # minutes, so the wait counts against the deadline too
+        if deadline is not None and time.monotonic() + riot_client.limiter.wait_time(region, "summoner-v4.by-id") >= deadline:
+            break
+        puuid_url = f"https://{region}.api.riotgames.com/lol/summoner/v4/summoners/{summoner_id}"
+        response = riot_client.get(puuid_url, region, "summoner-v4.by-id")
+
+        if response.status_code == 200:
+            row = (response.json()["puuid"], summoner_id, region)
+            puuids.append(row)
+            fetched.append(row)
+        else:
+            logging.error(f"Failed to fetch PUUID for SummonerID {summoner_id} in {region}: {response.text}")
+            failures.append((summoner_id, region, f"{response.status_code}: {response.text[:400]}"))
+    identity_index.add(fetched)
+    if known:
+        logging.info(f"Resolved {len(known)} PUUIDs in {region} from the identity index.")
+    return puuids, failures
+
+
+def process_puuid_batch(cursor, region, summoner_ids):
+    # Fetch and commit one batch. Safe to repeat: summoners that already have a
+    # PUUID (e.g. from an earlier delivery of the same work item) are skipped.
+    pending = []
+    for i in range(0, len(summoner_ids), 1000):
+        chunk = summoner_ids[i:i + 1000]
+        placeholders = ", ".join("?" for _ in chunk)
+        cursor.execute(
+            f"SELECT SummonerID FROM Summoners WHERE Region = ? AND PUUID IS NULL AND SummonerID IN ({placeholders})",
+            region, *chunk
+        )
+        pending.extend(row[0] for row in cursor.fetchall())
+
+    puuids, failures = fetch_puuids(region, pending)
+    commit_batch(cursor, puuids, failures)
+    return len(puuids), len(failures)
@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+from collections import deque
+
+# Limits used before Riot has told us the real ones (development key defaults)
+DEFAULT_APP_LIMITS = [(20, 1), (100, 120)]
+
+
+def parse_rate_limit_header(value):
+    # "20:1,100:120" -> [(20, 1), (100, 120)]
+    pairs = []
+    if not value:
+        return pairs
+    for part in value.split(","):
+        try:
+            count, seconds = part.strip().split(":")
+            pairs.append((int(count), int(seconds)))
+        except ValueError:
+            logging.warning(f"Ignoring malformed rate limit entry: {part!r}")
+    return pairs
+
+
+class RateLimitWindow:
+    def __init__(self, limit, seconds):
+        self.limit = limit
+        self.seconds = seconds
+        self.timestamps = deque()
+
+    def _expire(self, now):
+        while self.timestamps and self.timestamps[0] <= now - self.seconds:
+            self.timestamps.popleft()
+
+    def wait_time(self, now):
+        self._expire(now)
+        if len(self.timestamps) < self.limit:
+            return 0.0
+        # Oldest request in the window has to age out before we can send again
+        return self.timestamps[len(self.timestamps) - self.limit] + self.seconds - now
+
+    def record(self, now):
+        self.timestamps.append(now)
+
+    def sync_count(self, server_count, now):
+        # Riot counts requests from every instance sharing the key; if it saw more
+        # than we did, pad the window so our local view is never too optimistic.
+        self._expire(now)
+        missing = server_count - len(self.timestamps)
+        for _ in range(missing):
+            self.timestamps.append(now)
+
+
+class RateLimitBucket:
+    def __init__(self, limits=None):
+        self.windows = [RateLimitWindow(limit, seconds) for limit, seconds in (limits or [])]
+        self.blocked_until = 0.0
+
+    def wait_time(self, now):
+        wait = self.blocked_until - now
+        for window in self.windows:
+            wait = max(wait, window.wait_time(now))
+        return max(wait, 0.0)
+
+    def record(self, now):
+        for window in self.windows:
+            window.record(now)
+
+    def set_limits(self, limits):
+        current = {window.seconds: window for window in self.windows}
+        if sorted(current) == sorted(seconds for _, seconds in limits) and all(
+            current[seconds].limit == limit for limit, seconds in limits
+        ):
+            return
+        windows = []
+        for limit, seconds in limits:
+            window = RateLimitWindow(limit, seconds)
+            if seconds in current:
+                window.timestamps = current[seconds].timestamps
+            windows.append(window)
+        self.windows = windows
+
+    def sync_counts(self, counts, now):
+        by_seconds = {seconds: count for count, seconds in counts}
+        for window in self.windows:
+            if window.seconds in by_seconds:
+                window.sync_count(by_seconds[window.seconds], now)
+
+
+class RiotRateLimiter:
+    """Tracks Riot's app-level and method-level rate limits per regional host.
+
+    Call acquire() before every request and update() with every response; the
+    limits themselves are learned from the X-*-Rate-Limit response headers.
+    """
+
+    def __init__(self, default_app_limits=DEFAULT_APP_LIMITS, clock=time.monotonic, sleep=time.sleep):
+        self.default_app_limits = default_app_limits
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.app_buckets = {}
+        self.method_buckets = {}
+
+    def _buckets(self, region, method):
+        app_bucket = self.app_buckets.get(region)
+        if app_bucket is None:
+            app_bucket = self.app_buckets[region] = RateLimitBucket(self.default_app_limits)
+        method_bucket = self.method_buckets.get((region, method))
+        if method_bucket is None:
+            method_bucket = self.method_buckets[(region, method)] = RateLimitBucket()
+        return app_bucket, method_bucket
+
+    def wait_time(self, region, method):
+        # Seconds acquire() would block right now, without taking a slot
+        with self.lock:
+            now = self.clock()
+            app_bucket, method_bucket = self._buckets(region, method)
+            return max(app_bucket.wait_time(now), method_bucket.wait_time(now))
+
+    def acquire(self, region, method):
+        while True:
+            with self.lock:
+                now = self.clock()
+                app_bucket, method_bucket = self._buckets(region, method)
+                wait = max(app_bucket.wait_time(now), method_bucket.wait_time(now))
+                if wait <= 0:
+                    app_bucket.record(now)
+                    method_bucket.record(now)
+                    return
+            logging.debug(f"Rate limit reached for {region} {method}, waiting {wait:.2f}s")
+            self.sleep(wait)
+
+    def update(self, region, method, response):
+        headers = response.headers
+        with self.lock:
+            now = self.clock()
+            app_bucket, method_bucket = self._buckets(region, method)
+
+            app_limits = parse_rate_limit_header(headers.get("X-App-Rate-Limit"))
+            if app_limits:
+                app_bucket.set_limits(app_limits)
+                app_bucket.sync_counts(parse_rate_limit_header(headers.get("X-App-Rate-Limit-Count")), now)
+
+            method_limits = parse_rate_limit_header(headers.get("X-Method-Rate-Limit"))
+            if method_limits:
+                method_bucket.set_limits(method_limits)
+                method_bucket.sync_counts(parse_rate_limit_header(headers.get("X-Method-Rate-Limit-Count")), now)
+
+            if response.status_code == 429:
+                retry_after = float(headers.get("Retry-After", 1))
+                limit_type = headers.get("X-Rate-Limit-Type", "service")
+                # Application limits block the whole region; method and service
+                # limits only block the endpoint that was throttled.
+                bucket = app_bucket if limit_type == "application" else method_bucket
+                bucket.blocked_until = max(bucket.blocked_until, now + retry_after)
+                logging.warning(f"Rate limited ({limit_type}) on {region} {method}. Backing off {retry_after}s.")
+
+    def headroom(self, region):
+        # Smallest number of requests still available across the region's app windows
+        with self.lock:
+            bucket = self.app_buckets.get(region)
+            if bucket is None or not bucket.windows:
+                return None
+            now = self.clock()
+            for window in bucket.windows:
+                window._expire(now)
+            return min(window.limit - len(window.timestamps) for window in bucket.windows)
+
+
+# One limiter per worker process so warm invocations keep their rate-limit state
+riot_rate_limiter = RiotRateLimiter()
@@ -0,0 +1,153 @@
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import closing
+from urllib.parse import urlencode
+
+from shared_code.lazy import lazy_import
+
+requests = lazy_import("requests")
+
+ENABLED = os.getenv("RIOT_CACHE", "1") == "1"
+CACHE_PATH = os.getenv("RIOT_CACHE_PATH", os.path.join(tempfile.gettempdir(), "riot_response_cache.sqlite3"))
+MAX_BYTES = int(float(os.getenv("RIOT_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+# Seconds a 200 response stays valid, by API (the part of the limiter method
+# name before the dot). Apex ladders are recomputed every few minutes; a
+# summoner's IDs never change. Anything not listed is never cached.
+ENDPOINT_TTLS = {
+    "league-v4": float(os.getenv("RIOT_CACHE_LEAGUE_TTL_SECONDS", "300")),
+    "summoner-v4": math.inf,
+}
+
+
+class ResponseCache:
+    """SQLite store of Riot API responses, keyed by request URL.
+
+    Entries expire after their endpoint's TTL and the least recently used
+    ones are evicted once the stored (compressed) bodies exceed max_bytes.
+    Shared by concurrent lanes and by separate processes on the same machine
+    (e.g. overlapping developer runs); any SQLite error is treated as a miss.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES, ttls=ENDPOINT_TTLS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = ttls
+        self.lock = threading.Lock()
+        self.ready = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return closing(conn)
+
+    def _ensure_schema(self):
+        # On first use rather than at import, to keep cold starts cheap
+        with self.lock:
+            if self.ready:
+                return
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    method TEXT NOT NULL,
+                    content_type TEXT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NULL,
+                    last_used REAL NOT NULL
+                )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_last_used ON responses (last_used)")
+            self.ready = True
+
+    def ttl_for(self, method):
+        return self.ttls.get(method.split(".", 1)[0], 0)
+
+    @staticmethod
+    def key_for(url, params=None):
+        if params:
+            url = f"{url}?{urlencode(sorted(dict(params).items()))}"
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def get(self, url, params=None):
+        # A requests.Response rebuilt from the stored body, or None on a miss
+        key = self.key_for(url, params)
+        now = time.time()
+        try:
+            self._ensure_schema()
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT content_type, body, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                content_type, body, expires_at = row
+                if expires_at is not None and expires_at <= now:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logging.warning(f"Response cache read failed: {e}")
+            return None
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.encoding = "utf-8"
+        response._content = zlib.decompress(body)
+        if content_type:
+            response.headers["Content-Type"] = content_type
+        return response
+
+    def put(self, url, params, method, response):
+        ttl = self.ttl_for(method)
+        if not ttl:
+            return
+        body = zlib.compress(response.content)
+        now = time.time()
+        try:
+            self._ensure_schema()
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, method, content_type, body, size, expires_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self.key_for(url, params), method, response.headers.get("Content-Type"), body, len(body),
+                     None if ttl == math.inf else now + ttl, now),
+                )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            logging.warning(f"Response cache write failed: {e}")
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Down to 90% so eviction doesn't run again on the very next write
+        excess = total - int(self.max_bytes * 0.9)
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            evicted.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        logging.info(f"Response cache over {self.max_bytes} bytes; evicted {len(evicted)} least recently used entries.")
+
+    def clear(self):
+        self._ensure_schema()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+
+# Shared by every RiotClient in the process; RIOT_CACHE=0 turns it off
+response_cache = ResponseCache() if ENABLED else None
@@ -0,0 +1,26 @@
+# match-v5 lives on the regional routing clusters, not on the platform hosts
+PLATFORM_ROUTING = {
+    "euw1": "europe",
+    "eun1": "europe",
+    "tr1": "europe",
+    "ru": "europe",
+    "na1": "americas",
+    "br1": "americas",
+    "la1": "americas",
+    "la2": "americas",
+    "kr": "asia",
+    "jp1": "asia",
+    "oc1": "sea",
+    "ph2": "sea",
+    "sg2": "sea",
+    "th2": "sea",
+    "tw2": "sea",
+    "vn2": "sea",
+}
+
+
+def routing_for(platform):
+    try:
+        return PLATFORM_ROUTING[platform.lower()]
+    except KeyError:
+        raise ValueError(f"No match-v5 routing cluster known for platform {platform}")
@@ -0,0 +1,151 @@
+import logging
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from shared_code.lazy import lazy_import
+from shared_code.rate_limiter import riot_rate_limiter
+from shared_code.response_cache import response_cache
+from shared_code.telemetry import telemetry
+
+requests = lazy_import("requests")
+
+RETRYABLE_STATUS = {500, 502, 503, 504}
+
+
+class RiotClient:
+    """Riot API client shared by every function (and the offline scripts).
+
+    Keeps one keep-alive Session per host, so repeated calls to
+    {region}.api.riotgames.com reuse TCP+TLS connections. Every request waits
+    on the rate limiter; 429s are replayed after Retry-After, and 5xx and
+    connection errors are retried with jittered exponential backoff. Endpoints
+    with a TTL in the response cache are answered from it when possible.
+    """
+
+    def __init__(self, limiter=riot_rate_limiter, max_retries=3, backoff_base=0.5, backoff_cap=30,
+                 pool_size=8, timeout=(5, 30), sleep=time.sleep, base_url=os.getenv("RIOT_API_BASE_URL"),
+                 cache=response_cache):
+        self.limiter = limiter
+        self.cache = cache
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.sleep = sleep
+        # e.g. http://127.0.0.1:8089 to run against benchmarks/mock_riot_server.py
+        self.base_url = base_url
+        self.lock = threading.Lock()
+        self.sessions = {}
+
+    def resolve(self, url):
+        # https://euw1.api.riotgames.com/lol/... -> {base_url}/euw1/lol/...
+        if not self.base_url:
+            return url
+        parts = urlsplit(url)
+        base = urlsplit(self.base_url)
+        host = parts.netloc.split(".")[0]
+        return urlunsplit((base.scheme, base.netloc, f"{base.path.rstrip('/')}/{host}{parts.path}", parts.query, ""))
+
+    def session_for(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Accept-Encoding": "gzip, deflate", "Accept": "application/json"})
+                self.sessions[host] = session
+            return session
+
+    def _backoff(self, attempt):
+        # Full jitter: spread retries from concurrent workers apart
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def get(self, url, region, method, headers=None, **kwargs):
+        # Returns the final response; callers handle non-200 statuses (and
+        # close it when passing stream=True). Without explicit headers the
+        # cached Key Vault API key is used, and a 401/403 refetches it once in
+        # case the key was rotated.
+        url = self.resolve(url)
+        # Streamed bodies (match payloads) are never cached
+        cacheable = self.cache is not None and not kwargs.get("stream") and self.cache.ttl_for(method)
+        if cacheable:
+            cached = self.cache.get(url, kwargs.get("params"))
+            if cached is not None:
+                telemetry.count("riot.cache_hits", region=region, method=method)
+                return cached
+            telemetry.count("riot.cache_misses", region=region, method=method)
+
+        use_runtime_key = headers is None
+        if use_runtime_key:
+            from shared_code import runtime
+            headers = runtime.riot_headers()
+
+        session = self.session_for(url)
+        key_refreshed = False
+        attempt = 0
+        while True:
+            wait_started = time.perf_counter()
+            self.limiter.acquire(region, method)
+            telemetry.count("riot.rate_limit_wait_ms", round((time.perf_counter() - wait_started) * 1000), region=region)
+            telemetry.count("riot.requests", region=region, method=method)
+            try:
+                with telemetry.span("riot.request", region=region, method=method) as span:
+                    response = session.get(url, headers=headers, timeout=self.timeout, **kwargs)
+                    span["status"] = response.status_code
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                telemetry.count("riot.retries", region=region, method=method, reason=type(e).__name__)
+                logging.warning(f"{type(e).__name__} for {url}; retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                self.sleep(delay)
+                continue
+            self.limiter.update(region, method, response)
+            headroom = self.limiter.headroom(region)
+            if headroom is not None:
+                telemetry.gauge("riot.rate_limit_headroom", headroom, region=region)
+
+            if response.status_code in (401, 403) and use_runtime_key and not key_refreshed:
+                logging.warning(f"{response.status_code} from {url}; refreshing RiotApiKey from Key Vault.")
+                runtime.invalidate_secrets("RiotApiKey")
+                headers = runtime.riot_headers()
+                key_refreshed = True
+                response.close()
+                continue
+
+            if response.status_code == 429:
+                telemetry.count("riot.throttled", region=region, method=method,
+                                limit_type=response.headers.get("X-Rate-Limit-Type", "service"))
+
+            if response.status_code == 429 and attempt < self.max_retries:
+                # The limiter has already blocked this bucket for Retry-After
+                attempt += 1
+                telemetry.count("riot.retries", region=region, method=method, reason="429")
+                logging.warning(f"429 from {url}; replaying (retry {attempt}/{self.max_retries})")
+                response.close()
+                continue
+
+            if response.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                delay = self._backoff(attempt)
+                attempt += 1
+                telemetry.count("riot.retries", region=region, method=method, reason=str(response.status_code))
+                logging.warning(f"{response.status_code} from {url}; retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                self.sleep(delay)
+                response.close()
+                continue
+
+            if cacheable and response.status_code == 200:
+                self.cache.put(url, kwargs.get("params"), method, response)
+            return response
+
+
+# One client per worker process so connections stay warm between invocations
+riot_client = RiotClient()
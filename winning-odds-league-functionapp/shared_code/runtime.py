@@ -0,0 +1,101 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from shared_code.database import ConnectionPool, build_connection_string, connect_to_database, is_login_failure, pyodbc
+from shared_code.telemetry import telemetry
+
+# Module-level runtime context. Azure Functions keeps the worker process alive
+# between invocations, so everything here is built once per warm instance.
+VAULT_URL = os.getenv("KEY_VAULT_URL", "https://myRiotDataKeyVault.vault.azure.net")
+SECRET_TTL_SECONDS = int(os.getenv("SECRET_TTL_SECONDS", "3600"))
+SQL_SECRET_NAMES = ("FunctionAppSqlUser", "FunctionAppSqlPassword")
+# Local runs (benchmarks, func start): read secrets from environment variables
+# of the same name instead of Key Vault, and optionally use a full connection
+# string, e.g. for a SQL Server container
+SECRETS_FROM_ENV = os.getenv("SECRETS_FROM_ENV") == "1"
+SQL_CONNECTION_STRING = os.getenv("SQL_CONNECTION_STRING")
+
+_lock = threading.Lock()
+_secret_client = None
+_secrets = {}
+_pool = None
+
+
+def _get_secret_client():
+    global _secret_client
+    with _lock:
+        if _secret_client is None:
+            # Imported here: the Azure SDK takes a noticeable share of a cold
+            # start and isn't needed at all when SECRETS_FROM_ENV is set
+            from azure.identity import DefaultAzureCredential
+            from azure.keyvault.secrets import SecretClient
+
+            _secret_client = SecretClient(vault_url=VAULT_URL, credential=DefaultAzureCredential())
+        return _secret_client
+
+
+def get_secret(name):
+    cached = _secrets.get(name)
+    if cached and time.monotonic() - cached[1] < SECRET_TTL_SECONDS:
+        return cached[0]
+
+    if SECRETS_FROM_ENV:
+        value = os.getenv(name)
+    else:
+        with telemetry.span("secret.fetch", secret=name):
+            value = _get_secret_client().get_secret(name).value
+    _secrets[name] = (value, time.monotonic())
+    return value
+
+
+def invalidate_secrets(*names):
+    # Called when a cached secret stops working (e.g. after a key rotation)
+    for name in names or list(_secrets):
+        _secrets.pop(name, None)
+
+
+def riot_headers():
+    riot_api_key = get_secret("RiotApiKey")
+    if not riot_api_key:
+        raise ValueError("RiotApiKey is not set in Key Vault!")
+    return {"X-Riot-Token": riot_api_key}
+
+
+def get_connection_string():
+    if SQL_CONNECTION_STRING:
+        return SQL_CONNECTION_STRING
+    return build_connection_string(*(get_secret(name) for name in SQL_SECRET_NAMES))
+
+
+def _connect():
+    with telemetry.span("db.connect"):
+        return _connect_with_refresh()
+
+
+def _connect_with_refresh():
+    try:
+        return connect_to_database(get_connection_string())
+    except pyodbc.Error as e:
+        if not is_login_failure(e):
+            raise
+        # Credentials were probably rotated; refetch them once and retry
+        logging.warning("Database login failed; refreshing SQL credentials from Key Vault.")
+        invalidate_secrets(*SQL_SECRET_NAMES)
+        return connect_to_database(get_connection_string())
+
+
+def get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ConnectionPool(_connect, max_idle=int(os.getenv("SQL_POOL_SIZE", "5")))
+        return _pool
+
+
+@contextmanager
+def db_connection():
+    with get_pool().connection() as conn:
+        yield conn
@@ -0,0 +1,43 @@
+import heapq
+import os
+from datetime import datetime, timezone
+
+# Ranked solo wins + losses move by one for every game played, so a player whose
+# total hasn't changed since the last match sync has no new ranked matches.
+# Idle players are still revisited after this long in case a game was missed.
+MAX_IDLE_SECONDS = int(os.getenv("SCHEDULER_MAX_IDLE_SECONDS", str(7 * 24 * 3600)))
+# How much one hour of staleness weighs against one new game
+STALENESS_WEIGHT_PER_HOUR = float(os.getenv("SCHEDULER_STALENESS_WEIGHT", "0.1"))
+
+
+def refresh_priority(games_now, games_at_last_sync, last_synced, now):
+    # Returns None for players that don't need a refresh yet
+    if last_synced is None or games_at_last_sync is None:
+        # Never synced (or synced before we tracked games): highest priority
+        return float("inf")
+
+    if last_synced.tzinfo is None:
+        last_synced = last_synced.replace(tzinfo=timezone.utc)
+    staleness = max((now - last_synced).total_seconds(), 0.0)
+    games_delta = (games_now or 0) - games_at_last_sync
+
+    if games_delta <= 0 and staleness < MAX_IDLE_SECONDS:
+        return None
+    return max(games_delta, 0) + staleness / 3600 * STALENESS_WEIGHT_PER_HOUR
+
+
+def build_refresh_queue(candidates, limit, now=None):
+    # candidates: iterable of (player, games_now, games_at_last_sync, last_synced)
+    # Returns up to `limit` players, most urgent first.
+    now = now or datetime.now(timezone.utc)
+    heap = []
+    for sequence, (player, games_now, games_at_last_sync, last_synced) in enumerate(candidates):
+        priority = refresh_priority(games_now, games_at_last_sync, last_synced, now)
+        if priority is None:
+            continue
+        item = (priority, -sequence, player)
+        if len(heap) < limit:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    return [player for _, _, player in sorted(heap, reverse=True)]
@@ -0,0 +1,182 @@
+import contextvars
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# "otel" exports spans and metrics through OpenTelemetry, to Application
+# Insights when APPLICATIONINSIGHTS_CONNECTION_STRING is set (needs the
+# optional azure-monitor-opentelemetry package). "json" appends every event to
+# TELEMETRY_JSON_PATH as NDJSON. Either way each invocation logs a summary.
+EXPORTER = os.getenv("TELEMETRY_EXPORTER", "none").lower()
+JSON_PATH = os.getenv("TELEMETRY_JSON_PATH", os.path.join(tempfile.gettempdir(), "telemetry.ndjson"))
+SERVICE_NAME = "winning-odds-league"
+
+# The invocation being recorded; run_region_lanes copies it into lane threads
+_current = contextvars.ContextVar("telemetry_invocation", default=None)
+
+
+class InvocationStats:
+    """Per-invocation totals: span count/total/max by name and counter sums."""
+
+    def __init__(self, function_name):
+        self.function_name = function_name
+        self.lock = threading.Lock()
+        self.spans = {}
+        self.counters = {}
+        self.events = []
+
+    def add(self, event, keep_event):
+        with self.lock:
+            if event["type"] == "span":
+                count, total, longest = self.spans.get(event["name"], (0, 0.0, 0.0))
+                duration = event["duration_ms"]
+                self.spans[event["name"]] = (count + 1, total + duration, max(longest, duration))
+            elif event["type"] == "counter":
+                self.counters[event["name"]] = self.counters.get(event["name"], 0) + event["value"]
+            if keep_event:
+                self.events.append(event)
+
+    def summary(self, gauges):
+        with self.lock:
+            return {
+                "function": self.function_name,
+                "spans": {
+                    name: {"count": count, "total_ms": round(total, 1), "max_ms": round(longest, 1)}
+                    for name, (count, total, longest) in sorted(self.spans.items(), key=lambda item: -item[1][1])
+                },
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": {f"{name}{_label(attributes)}": value for (name, attributes), value in sorted(gauges.items())},
+            }
+
+
+def _label(attributes):
+    return "[" + ",".join(f"{k}={v}" for k, v in attributes) + "]" if attributes else ""
+
+
+class Telemetry:
+    """Spans, counters and gauges for the pipeline's hot paths.
+
+    span() times a block, count() adds to a counter and gauge() sets a value
+    (e.g. rate-limit headroom per region). Everything recorded inside
+    invocation() is summarised when the invocation ends.
+    """
+
+    def __init__(self, exporter=EXPORTER, json_path=JSON_PATH):
+        self.exporter = exporter
+        self.json_path = json_path
+        self.lock = threading.Lock()
+        self.gauges = {}
+        self.tracer = None
+        self.meter = None
+        self.counters = {}
+        self.observed_gauges = set()
+
+    def _init_otel(self):
+        # Optional dependency: only imported when exporting to OpenTelemetry
+        with self.lock:
+            if self.tracer is not None:
+                return
+            from opentelemetry import metrics, trace
+
+            if os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING"):
+                from azure.monitor.opentelemetry import configure_azure_monitor
+
+                configure_azure_monitor()
+            self.meter = metrics.get_meter(SERVICE_NAME)
+            self.tracer = trace.get_tracer(SERVICE_NAME)
+
+    def _record(self, event):
+        stats = _current.get()
+        if stats is not None:
+            stats.add(event, keep_event=self.exporter == "json")
+        elif self.exporter == "json":
+            self._write([event])
+
+    def _write(self, events):
+        try:
+            with self.lock, open(self.json_path, "a") as f:
+                for event in events:
+                    f.write(json.dumps(event, default=str) + "\n")
+        except OSError as e:
+            logging.warning(f"Could not write telemetry to {self.json_path}: {e}")
+
+    @contextmanager
+    def span(self, name, **attributes):
+        # Yields the attribute dict so the block can add results (status, rows)
+        otel_span = None
+        if self.exporter == "otel":
+            self._init_otel()
+            otel_span = self.tracer.start_span(name)
+        start = time.perf_counter()
+        try:
+            if otel_span is None:
+                yield attributes
+            else:
+                from opentelemetry import trace
+
+                with trace.use_span(otel_span, end_on_exit=False):
+                    yield attributes
+        except Exception as e:
+            attributes["error"] = type(e).__name__
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if otel_span is not None:
+                otel_span.set_attributes(attributes)
+                otel_span.end()
+            self._record({"type": "span", "name": name, "ts": time.time(), "duration_ms": round(duration_ms, 2), **attributes})
+
+    def count(self, name, value=1, **attributes):
+        if not value:
+            return
+        if self.exporter == "otel":
+            self._init_otel()
+            counter = self.counters.get(name)
+            if counter is None:
+                counter = self.counters[name] = self.meter.create_counter(name)
+            counter.add(value, attributes)
+        self._record({"type": "counter", "name": name, "ts": time.time(), "value": value, **attributes})
+
+    def gauge(self, name, value, **attributes):
+        key = (name, tuple(sorted(attributes.items())))
+        with self.lock:
+            self.gauges[key] = value
+        if self.exporter == "otel" and name not in self.observed_gauges:
+            self._init_otel()
+            self.observed_gauges.add(name)
+            self.meter.create_observable_gauge(name, callbacks=[self._observe(name)])
+        self._record({"type": "gauge", "name": name, "ts": time.time(), "value": value, **attributes})
+
+    def _observe(self, name):
+        def callback(options):
+            from opentelemetry.metrics import Observation
+
+            with self.lock:
+                items = [(attributes, value) for (gauge_name, attributes), value in self.gauges.items() if gauge_name == name]
+            return [Observation(value, dict(attributes)) for attributes, value in items]
+        return callback
+
+    @contextmanager
+    def invocation(self, function_name):
+        # Also usable as a decorator on a function's main()
+        stats = InvocationStats(function_name)
+        token = _current.set(stats)
+        try:
+            with self.span(f"function.{function_name}"):
+                yield stats
+        finally:
+            _current.reset(token)
+            with self.lock:
+                gauges = dict(self.gauges)
+            summary = stats.summary(gauges)
+            logging.info(f"Telemetry {function_name}: {json.dumps(summary)}")
+            if self.exporter == "json":
+                self._write(stats.events + [{"type": "summary", "ts": time.time(), **summary}])
+
+
+# Shared by every function on a worker
+telemetry = Telemetry()
@@ -0,0 +1,204 @@
+import argparse
+import importlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+
+PUUID_WORK_QUEUE = "puuid-work"
+MATCH_WORK_QUEUE = "match-work"
+
+# Mirrors the queues extension settings in host.json
+DEFAULT_VISIBILITY_TIMEOUT = 30
+DEFAULT_MAX_DEQUEUE_COUNT = 5
+
+# Queue -> the queue-triggered function that consumes it
+QUEUE_FUNCTIONS = {
+    PUUID_WORK_QUEUE: "ProcessPuuidQueue",
+    MATCH_WORK_QUEUE: "ProcessMatchQueue",
+}
+
+
+class StorageWorkQueue:
+    """Producer side of an Azure Storage queue.
+
+    The consumers are queue-triggered functions; the Functions host handles
+    visibility timeouts, retries and moving messages to <queue>-poison.
+    """
+
+    def __init__(self, queue_name, connection_string=None):
+        from azure.storage.queue import QueueClient, TextBase64EncodePolicy
+
+        # Queue triggers expect base64 message bodies by default
+        self.client = QueueClient.from_connection_string(
+            connection_string or os.environ["AzureWebJobsStorage"],
+            queue_name,
+            message_encode_policy=TextBase64EncodePolicy(),
+        )
+        self.queue_name = queue_name
+
+    def send_many(self, items):
+        try:
+            self.client.create_queue()
+        except Exception as e:
+            # Already exists (or no permission to create); sending will tell
+            logging.debug(f"create_queue for {self.queue_name}: {e}")
+        for item in items:
+            self.client.send_message(json.dumps(item))
+
+
+class SqliteWorkQueue:
+    """File-backed stand-in for Storage queues, for local runs and tests.
+
+    Implements the same delivery semantics: a received message is hidden for
+    visibility_timeout seconds and reappears unless deleted, and a message
+    received max_dequeue_count times without being deleted moves to
+    <queue>-poison.
+    """
+
+    def __init__(self, queue_name, path=None, max_dequeue_count=DEFAULT_MAX_DEQUEUE_COUNT):
+        self.queue_name = queue_name
+        self.path = path or os.getenv("WORK_QUEUE_SQLITE_PATH", "work_queue.db")
+        self.max_dequeue_count = max_dequeue_count
+        self.lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                queue TEXT NOT NULL,
+                body TEXT NOT NULL,
+                visible_at REAL NOT NULL,
+                dequeue_count INTEGER NOT NULL DEFAULT 0,
+                pop_receipt TEXT NULL
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_messages_queue ON messages (queue, visible_at)")
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def send_many(self, items):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO messages (queue, body, visible_at) VALUES (?, ?, ?)",
+                [(self.queue_name, json.dumps(item), now) for item in items],
+            )
+
+    def receive(self, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+        # Returns (message_id, pop_receipt, dequeue_count, item) or None
+        with self.lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    now = time.time()
+                    row = conn.execute(
+                        "SELECT id, body, dequeue_count FROM messages WHERE queue = ? AND visible_at <= ? ORDER BY id LIMIT 1",
+                        (self.queue_name, now),
+                    ).fetchone()
+                    if row is None:
+                        return None
+
+                    message_id, body, dequeue_count = row
+                    if dequeue_count >= self.max_dequeue_count:
+                        logging.error(f"Moving message {message_id} to {self.queue_name}-poison after {dequeue_count} attempts.")
+                        conn.execute(
+                            "UPDATE messages SET queue = ?, pop_receipt = NULL WHERE id = ?",
+                            (f"{self.queue_name}-poison", message_id),
+                        )
+                        continue
+
+                    pop_receipt = uuid.uuid4().hex
+                    conn.execute(
+                        "UPDATE messages SET visible_at = ?, dequeue_count = ?, pop_receipt = ? WHERE id = ?",
+                        (now + visibility_timeout, dequeue_count + 1, pop_receipt, message_id),
+                    )
+                    return message_id, pop_receipt, dequeue_count + 1, json.loads(body)
+            finally:
+                conn.execute("COMMIT")
+
+    def delete(self, message_id, pop_receipt):
+        # Only the latest receiver may delete; a stale worker's delete is a no-op
+        with self._connect() as conn:
+            conn.execute("DELETE FROM messages WHERE id = ? AND pop_receipt = ?", (message_id, pop_receipt))
+
+    def count(self, queue_name=None):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE queue = ?", (queue_name or self.queue_name,)
+            ).fetchone()[0]
+
+
+def get_work_queue(queue_name):
+    if os.getenv("WORK_QUEUE_BACKEND", "storage") == "sqlite":
+        return SqliteWorkQueue(queue_name)
+    return StorageWorkQueue(queue_name)
+
+
+class LocalQueueMessage:
+    """The parts of func.QueueMessage the queue-triggered functions use."""
+
+    def __init__(self, message_id, item, dequeue_count):
+        self.id = str(message_id)
+        self.item = item
+        self.dequeue_count = dequeue_count
+
+    def get_body(self):
+        return json.dumps(self.item).encode("utf-8")
+
+
+def drain_local_queue(queue, handler, workers=4, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+    # Local equivalent of the queue-triggered functions: several workers pull
+    # items until the queue is empty and pass each one to handler as a
+    # LocalQueueMessage. Failed items become visible again after the
+    # visibility timeout and are retried until they are poisoned.
+    def worker():
+        while True:
+            message = queue.receive(visibility_timeout)
+            if message is None:
+                if queue.count() == 0:
+                    return
+                # Only invisible (in-flight or failed) items left; wait for them
+                time.sleep(min(1.0, visibility_timeout))
+                continue
+            message_id, pop_receipt, dequeue_count, item = message
+            try:
+                handler(LocalQueueMessage(message_id, item, dequeue_count))
+            except Exception as e:
+                logging.warning(f"Work item {message_id} failed (attempt {dequeue_count}): {e}")
+                continue
+            queue.delete(message_id, pop_receipt)
+
+    threads = [threading.Thread(target=worker, name=f"queue-worker-{i}") for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_local_queue(queue_name, workers=4, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+    # Consumes what mode=queue enqueued with WORK_QUEUE_BACKEND=sqlite, through
+    # the same main() the queue trigger runs in Azure
+    handler = importlib.import_module(QUEUE_FUNCTIONS[queue_name]).main
+    queue = SqliteWorkQueue(queue_name)
+    logging.info(f"Draining {queue.count()} local {queue_name} items with {workers} workers.")
+    drain_local_queue(queue, handler, workers, visibility_timeout)
+    poisoned = queue.count(f"{queue_name}-poison")
+    if poisoned:
+        logging.warning(f"{poisoned} items are in {queue_name}-poison.")
+
+
+if __name__ == "__main__":
+    # From the function app directory, e.g.:
+    #   WORK_QUEUE_BACKEND=sqlite python -m shared_code.work_queue puuid-work
+    parser = argparse.ArgumentParser(description="Drain a local SQLite work queue through its queue-triggered function.")
+    parser.add_argument("queue", choices=sorted(QUEUE_FUNCTIONS))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--visibility-timeout", type=float, default=DEFAULT_VISIBILITY_TIMEOUT)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    run_local_queue(args.queue, args.workers, args.visibility_timeout)
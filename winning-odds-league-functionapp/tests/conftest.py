@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The function app directory is the import root, as in the Functions host
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
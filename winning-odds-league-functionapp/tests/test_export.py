@@ -0,0 +1,109 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from shared_code import export
+from shared_code.export import export_matches, export_summoners, read_snapshot
+
+T0 = datetime(2026, 10, 16, 12, 0, 0)
+
+
+class FakeCursor:
+    """Serves the Summoners and match queries from in-memory rows."""
+
+    def __init__(self, summoners=(), matches=()):
+        self.summoners = list(summoners)
+        self.matches = list(matches)
+        self.rows = []
+
+    def execute(self, sql, *params):
+        if "FROM Summoners" in sql:
+            self.rows = list(self.summoners)
+        else:
+            # WHERE m.IngestedAt > ?
+            self.rows = [row for row in self.matches if not params or row[-1] > params[0]]
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+
+def participants(match_id, ingested_at, platform="euw1"):
+    return [
+        (match_id, 420, "14.1", 1760000000000, 1800, f"puuid-{i}", 100 if i < 5 else 200, "TOP", 1, "Annie",
+         1, 2, 3, i < 5, platform, ingested_at)
+        for i in range(10)
+    ]
+
+
+def exported_match_ids(root):
+    return sorted(read_snapshot(os.path.join(root, "matches"), columns=["match_id"]).column("match_id").to_pylist())
+
+
+def test_same_day_summoner_rerun_replaces_the_snapshot(tmp_path):
+    cursor = FakeCursor(summoners=[
+        ("s1", "p1", "Challenger", 1000, 10, 5, False, False, "euw1"),
+        ("s2", "p2", "Challenger", 900, 10, 5, False, False, "kr"),
+    ])
+    export_summoners(cursor, str(tmp_path), "2026-10-16")
+    export_summoners(cursor, str(tmp_path), "2026-10-16")
+    export_summoners(cursor, str(tmp_path), "2026-10-17")
+
+    table = read_snapshot(os.path.join(tmp_path, "summoners"))
+    assert table.num_rows == 4
+
+
+def test_late_commit_inside_the_overlap_is_exported_once(tmp_path):
+    root = str(tmp_path)
+    cursor = FakeCursor(matches=participants("M1", T0) + participants("M2", T0 + timedelta(minutes=1)))
+    assert export_matches(cursor, root, fetch_size=7) == 20
+
+    # Another lane committed a match stamped before the watermark
+    cursor.matches += participants("M0", T0 - timedelta(minutes=2), "kr")
+    assert export_matches(cursor, root) == 10
+    assert export_matches(cursor, root) == 0
+
+    match_ids = exported_match_ids(root)
+    assert len(match_ids) == 30
+    assert sorted(set(match_ids)) == ["M0", "M1", "M2"]
+
+
+def test_recent_ids_outside_the_overlap_are_forgotten(tmp_path):
+    root = str(tmp_path)
+    cursor = FakeCursor(matches=participants("M1", T0))
+    export_matches(cursor, root)
+    cursor.matches += participants("M2", T0 + export.CATCH_UP_OVERLAP * 2)
+    export_matches(cursor, root)
+
+    state = export._load_state(root)
+    assert set(state["matches_exported_recent"]) == {"M2"}
+    assert state["matches_exported_until"] == (T0 + export.CATCH_UP_OVERLAP * 2).isoformat()
+
+
+def test_unfinished_export_is_removed_and_redone(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    cursor = FakeCursor(matches=participants("M1", T0))
+    export_matches(cursor, root)
+    cursor.matches += participants("M2", T0 + timedelta(minutes=30))
+
+    # Crash after the files are written but before the state records them
+    save_state = export._save_state
+    calls = []
+
+    def crash_on_final_save(root, state):
+        calls.append(state)
+        if len(calls) == 2:
+            raise RuntimeError("worker recycled")
+        save_state(root, state)
+
+    monkeypatch.setattr(export, "_save_state", crash_on_final_save)
+    with pytest.raises(RuntimeError):
+        export_matches(cursor, root)
+    monkeypatch.setattr(export, "_save_state", save_state)
+    assert len(exported_match_ids(root)) == 20
+    assert export._load_state(root)["matches_pending_export"]
+
+    assert export_matches(cursor, root) == 10
+    assert exported_match_ids(root) == ["M1"] * 10 + ["M2"] * 10
+    assert "matches_pending_export" not in export._load_state(root)
@@ -0,0 +1,88 @@
+from shared_code import puuids
+from shared_code.identity_index import IdentityIndex
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, sql, *params):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+
+SUMMONERS = [("puuid-1", "s1", "euw1"), ("puuid-2", "s2", "kr"), ("puuid-3", "s1", "kr")]
+
+
+def test_snapshot_is_memory_mapped(tmp_path):
+    path = str(tmp_path / "identity_index.bin")
+    index = IdentityIndex(path)
+    index.refresh(FakeCursor(SUMMONERS))
+
+    loaded = IdentityIndex(path)
+    assert loaded.load()
+    assert len(loaded) == 3
+    # Same summoner ID in two regions resolves per region
+    assert loaded.puuid_for("s1", "euw1") == "puuid-1"
+    assert loaded.puuid_for("s1", "kr") == "puuid-3"
+    assert loaded.puuid_for("s3", "euw1") is None
+    assert loaded.regions_for(["puuid-2", "puuid-9", "puuid-1"]) == ["kr", None, "euw1"]
+    assert not loaded.summoner_keys.flags.owndata
+    assert not loaded.summoner_keys.flags.writeable
+
+
+def test_snapshot_without_current_magic_is_rejected(tmp_path):
+    path = tmp_path / "identity_index.bin"
+    for magic in (b"WOLIDX1\n", b"WOLIDX2\n"):
+        path.write_bytes(magic + b"\0" * 64)
+        assert not IdentityIndex(str(path)).load()
+
+
+def test_overlay_is_compacted_on_save(tmp_path):
+    path = str(tmp_path / "identity_index.bin")
+    index = IdentityIndex(path)
+    index.refresh(FakeCursor(SUMMONERS[:1]))
+    index.add([("puuid-4", "s4", "euw1")])
+    assert index.known_puuids("euw1", ["s1", "s4", "s5"]) == {"s1": "puuid-1", "s4": "puuid-4"}
+    assert index.region_for("puuid-4") == "euw1"
+
+    assert not index.save_if_grown(max_recent=2)
+    assert index.save_if_grown(max_recent=1)
+    assert index.recent == {}
+
+    loaded = IdentityIndex(path)
+    assert loaded.load()
+    assert loaded.puuid_for("s4", "euw1") == "puuid-4"
+    assert loaded.region_for("puuid-4") == "euw1"
+
+
+def test_fetch_puuids_pairs_ids_with_their_puuids(tmp_path, monkeypatch):
+    index = IdentityIndex(str(tmp_path / "identity_index.bin"))
+    index.add([("puuid-1", "s1", "euw1")])
+    requested = []
+
+    class Response:
+        status_code = 200
+
+        def __init__(self, url):
+            self.summoner_id = url.rsplit("/", 1)[1]
+
+        def json(self):
+            return {"puuid": f"puuid-{self.summoner_id}"}
+
+    def get(url, region, method):
+        requested.append(url)
+        return Response(url)
+
+    monkeypatch.setattr(puuids, "identity_index", index)
+    monkeypatch.setattr(puuids.riot_client, "get", get)
+
+    rows, failures = puuids.fetch_puuids("euw1", ["s1", "s7", "s1", "s7", "s8"])
+
+    assert sorted(rows) == [("puuid-1", "s1", "euw1"), ("puuid-s7", "s7", "euw1"), ("puuid-s8", "s8", "euw1")]
+    assert failures == []
+    assert len(requested) == 2
+    assert index.puuid_for("s7", "euw1") == "puuid-s7"
+    assert index.puuid_for("s8", "euw1") == "puuid-s8"
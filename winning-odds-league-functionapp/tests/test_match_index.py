@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+from shared_code.match_index import _MAGIC, CATCH_UP_OVERLAP, BloomFilter, MatchIndex
+
+
+class FakeCursor:
+    """Answers the match index queries from in-memory (MatchID, IngestedAt) rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.result = []
+
+    def execute(self, sql, *params):
+        self.queries.append((sql, params))
+        if "COUNT(*)" in sql:
+            self.result = [(len(self.rows),)]
+        elif params:
+            self.result = [row for row in self.rows if row[1] > params[0]]
+        else:
+            self.result = list(self.rows)
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0]
+
+
+def test_bloom_counts_only_new_keys():
+    bloom = BloomFilter(capacity=1000)
+    assert bloom.add("EUW1_1")
+    assert not bloom.add("EUW1_1")
+    bloom.add("EUW1_2")
+    assert bloom.count == 2
+    assert "EUW1_1" in bloom
+    assert "EUW1_3" not in bloom
+
+
+def test_bloom_round_trip():
+    bloom = BloomFilter(capacity=1000)
+    for i in range(100):
+        bloom.add(f"EUW1_{i}")
+    copy = BloomFilter.from_bytes(bloom.to_bytes())
+    assert (copy.capacity, copy.num_bits, copy.num_hashes, copy.count) == (bloom.capacity, bloom.num_bits, bloom.num_hashes, bloom.count)
+    assert all(f"EUW1_{i}" in copy for i in range(100))
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "match_index.bin")
+    watermark = datetime(2026, 10, 1, 12, 0)
+    index = MatchIndex(path)
+    index.refresh(FakeCursor([("EUW1_1", watermark - timedelta(hours=1)), ("EUW1_2", watermark)]))
+    index.save()
+
+    bloom, loaded_watermark = MatchIndex(path)._load_file()
+    assert loaded_watermark == watermark
+    assert bloom.count == 2
+    assert "EUW1_1" in bloom and "EUW1_2" in bloom
+
+
+def test_snapshot_without_current_magic_is_rejected(tmp_path):
+    path = tmp_path / "match_index.bin"
+    bloom = BloomFilter(capacity=1000)
+    # The previous layout: watermark line and filter, no magic
+    path.write_bytes(b"2026-10-01T12:00:00\n" + bloom.to_bytes())
+    assert MatchIndex(str(path))._load_file() == (None, None)
+
+    path.write_bytes(_MAGIC + b"\n" + bloom.to_bytes()[:-1])
+    assert MatchIndex(str(path))._load_file() == (None, None)
+
+
+def test_refresh_reads_from_before_the_saved_watermark(tmp_path):
+    path = str(tmp_path / "match_index.bin")
+    watermark = datetime(2026, 10, 1, 12, 0)
+    index = MatchIndex(path)
+    index.refresh(FakeCursor([("EUW1_1", watermark)]))
+    index.save()
+
+    # Committed late, with an IngestedAt just before the saved watermark
+    late = ("EUW1_2", watermark - timedelta(minutes=1))
+    cursor = FakeCursor([("EUW1_1", watermark), late])
+    restarted = MatchIndex(path)
+    restarted.refresh(cursor)
+
+    sql, params = cursor.queries[-1]
+    assert params == (watermark - CATCH_UP_OVERLAP,) * 2
+    assert "EUW1_2" in restarted.bloom
+    assert restarted.bloom.count == 2
+
+
+def test_refresh_if_stale(tmp_path):
+    index = MatchIndex(str(tmp_path / "match_index.bin"))
+    cursor = FakeCursor([])
+    assert index.refresh_if_stale(cursor)
+    assert not index.refresh_if_stale(cursor)
+    assert index.refresh_if_stale(cursor, max_age=0)
+
+
+def test_claimed_ids_are_not_handed_out_twice(tmp_path):
+    index = MatchIndex(str(tmp_path / "match_index.bin"))
+    cursor = FakeCursor([])
+    index.refresh(cursor)
+
+    assert sorted(index.claim_new(cursor, ["EUW1_1", "EUW1_2", "EUW1_1"])) == ["EUW1_1", "EUW1_2"]
+    assert index.claim_new(cursor, ["EUW1_1"]) == []
+
+    index.release(["EUW1_1"])
+    index.release(["EUW1_2"], stored=False)
+    assert "EUW1_1" in index.bloom
+    assert index.claim_new(cursor, ["EUW1_2"]) == ["EUW1_2"]
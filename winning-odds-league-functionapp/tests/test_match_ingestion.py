@@ -0,0 +1,60 @@
+import pytest
+
+from shared_code import match_ingestion
+from shared_code.identity_index import IdentityIndex
+from shared_code.match_ingestion import INITIAL_LOOKBACK_SECONDS, count_tracked_participants, ingest_player
+
+
+class Response:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+        self.text = str(body)
+
+    def json(self):
+        return self.body
+
+
+def test_rejected_puuid_is_parked_not_retried_first(monkeypatch):
+    watermarks = []
+    monkeypatch.setattr(match_ingestion.riot_client, "get", lambda url, routing, method: Response(400, "Exception decrypting"))
+    monkeypatch.setattr(match_ingestion, "write_watermarks", lambda cursor, rows: watermarks.extend(rows))
+    monkeypatch.setattr(match_ingestion.time, "time", lambda: 2_000_000_000)
+
+    inserted, complete = ingest_player(None, "europe", ("stale-puuid", "euw1", None, 120))
+
+    assert (inserted, complete) == (0, True)
+    # Never synced: parked at the lookback start, with the current game count
+    assert watermarks == [("stale-puuid", "euw1", 2_000_000_000 - INITIAL_LOOKBACK_SECONDS, 120)]
+
+
+def test_parked_player_keeps_their_start_time(monkeypatch):
+    watermarks = []
+    monkeypatch.setattr(match_ingestion.riot_client, "get", lambda url, routing, method: Response(404))
+    monkeypatch.setattr(match_ingestion, "write_watermarks", lambda cursor, rows: watermarks.extend(rows))
+
+    ingest_player(None, "europe", ("puuid", "euw1", 1_900_000_000, 120))
+
+    assert watermarks == [("puuid", "euw1", 1_900_000_000, 120)]
+
+
+def test_transient_failures_still_raise(monkeypatch):
+    monkeypatch.setattr(match_ingestion.riot_client, "get", lambda url, routing, method: Response(503, "unavailable"))
+    with pytest.raises(Exception, match="unavailable"):
+        match_ingestion.list_match_ids("europe", "puuid", 0)
+
+
+def test_tracked_participants_are_counted_by_home_region(tmp_path, monkeypatch):
+    index = IdentityIndex(str(tmp_path / "identity_index.bin"))
+    index.add([("puuid-1", "s1", "euw1"), ("puuid-2", "s2", "eun1"), ("puuid-3", "s3", "euw1")])
+    counts = []
+    monkeypatch.setattr(match_ingestion, "identity_index", index)
+    monkeypatch.setattr(match_ingestion.telemetry, "count", lambda name, value, **attributes: counts.append((name, value, attributes)))
+
+    rows = [("EUW1_1", puuid) for puuid in ("puuid-1", "puuid-2", "puuid-3", "unknown")]
+    count_tracked_participants("europe", rows)
+
+    assert sorted(counts, key=lambda c: c[2]["region"]) == [
+        ("matches.tracked_participants", 1, {"routing": "europe", "region": "eun1"}),
+        ("matches.tracked_participants", 2, {"routing": "europe", "region": "euw1"}),
+    ]
@@ -0,0 +1,88 @@
+import io
+import json
+
+import pytest
+
+from benchmarks.mock_riot_server import Fixtures
+from shared_code import match_stream
+from shared_code.match_stream import TIMELINE_MINUTES, parse_match_stream, parse_timeline_stream, stream_matches
+from shared_code.matches import parse_match
+
+LEAGUE = {"entries": [{"summonerId": f"summoner-{i}", "leaguePoints": 1000 + i} for i in range(10)]}
+
+
+@pytest.fixture(scope="module")
+def fixtures():
+    return Fixtures(LEAGUE, platforms=("euw1",), matches_per_player=3)
+
+
+def as_stream(payload):
+    return io.BytesIO(json.dumps(payload).encode())
+
+
+def test_match_stream_matches_a_full_parse(fixtures):
+    # The streamed skeleton must give exactly what parse_match gives on the
+    # whole document, despite the challenges/perks padding being skipped
+    for match_id in list(fixtures.matches)[:5]:
+        payload = fixtures.match(match_id)
+        match_row, participant_rows = parse_match_stream(as_stream(payload))
+        assert (match_row, participant_rows) == parse_match(payload)
+        assert len(participant_rows) == 10
+        assert match_row[1] == "euw1"
+
+
+def test_timeline_stream_keeps_selected_minutes(fixtures):
+    match_id = next(iter(fixtures.matches))
+    payload = fixtures.timeline(match_id)
+    puuids = payload["metadata"]["participants"]
+
+    expected = []
+    for minute, frame in enumerate(payload["info"]["frames"]):
+        if minute not in TIMELINE_MINUTES:
+            continue
+        for participant_id in range(1, 11):
+            stats = frame["participantFrames"][str(participant_id)]
+            expected.append((
+                match_id, puuids[participant_id - 1], minute, stats["totalGold"], stats["xp"],
+                stats["minionsKilled"] + stats["jungleMinionsKilled"],
+            ))
+
+    assert parse_timeline_stream(as_stream(payload)) == sorted(expected, key=lambda row: (row[2], puuids.index(row[1])))
+
+
+def test_short_game_has_no_late_minutes(fixtures):
+    match_id = next(iter(fixtures.matches))
+    payload = fixtures.timeline(match_id)
+    payload["info"]["frames"] = payload["info"]["frames"][:12]
+
+    assert {row[2] for row in parse_timeline_stream(as_stream(payload))} == {10}
+
+
+class StreamedResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.raw = as_stream(payload) if payload is not None else io.BytesIO()
+        self.text = ""
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_unavailable_matches_are_reported_not_raised(fixtures, monkeypatch):
+    match_ids = list(fixtures.matches)[:3]
+    responses = []
+
+    def get(url, routing, method, stream=False):
+        match_id = url.rsplit("/", 1)[1]
+        response = StreamedResponse(404) if match_id == match_ids[1] else StreamedResponse(200, fixtures.match(match_id))
+        responses.append(response)
+        return response
+
+    monkeypatch.setattr(match_stream.riot_client, "get", get)
+    unavailable = []
+    parsed = list(stream_matches("europe", match_ids, "https://{routing}/matches/{match_id}", unavailable=unavailable))
+
+    assert [match_row[0] for match_row, _, _ in parsed] == [match_ids[0], match_ids[2]]
+    assert unavailable == [match_ids[1]]
+    assert all(response.closed for response in responses)
@@ -0,0 +1,68 @@
+import numpy as np
+
+from shared_code.odds_engine import BLUE_TEAM, MatchArrays, WinOddsModel, build_match_arrays
+
+RED_TEAM = 200
+
+
+def synthetic_matches(rng, strengths, count, intercept=0.1):
+    picks = np.array([rng.choice(len(strengths), 10, replace=False) for _ in range(count)])
+    blue, red = np.sort(picks[:, :5], axis=1), np.sort(picks[:, 5:], axis=1)
+    logit = intercept + strengths[blue].sum(axis=1) - strengths[red].sum(axis=1)
+    blue_win = rng.random(count) < 1 / (1 + np.exp(-logit))
+    match_ids = np.array([f"EUW1_{i}" for i in range(count)], dtype=object)
+    return MatchArrays(match_ids, blue.astype(np.int32), red.astype(np.int32), blue_win)
+
+
+def test_build_match_arrays_reshapes_participants_and_drops_incomplete_matches():
+    match_ids, team_ids, champion_ids, winning_teams = [], [], [], []
+    for match_id, champions, winner in (("M1", range(10, 0, -1), RED_TEAM), ("M2", range(20, 29), BLUE_TEAM)):
+        for position, champion in enumerate(champions):
+            match_ids.append(match_id)
+            team_ids.append(BLUE_TEAM if position % 2 == 0 else RED_TEAM)
+            champion_ids.append(champion)
+            winning_teams.append(winner)
+
+    arrays = build_match_arrays(match_ids, team_ids, champion_ids, winning_teams)
+
+    assert list(arrays.match_ids) == ["M1"]
+    assert arrays.blue_champions.tolist() == [[2, 4, 6, 8, 10]]
+    assert arrays.red_champions.tolist() == [[1, 3, 5, 7, 9]]
+    assert arrays.blue_win.tolist() == [False]
+
+
+def test_fit_recovers_champion_strengths():
+    rng = np.random.default_rng(7)
+    strengths = rng.normal(0, 0.5, 30)
+    train = synthetic_matches(rng, strengths, 8000)
+    test = synthetic_matches(rng, strengths, 2000)
+
+    model = WinOddsModel().fit(train, l2=1.0)
+
+    assert model.champion_ids.tolist() == list(range(30))
+    assert np.corrcoef(model.coefficients, strengths)[0, 1] > 0.9
+    assert model.games.sum() == 10 * len(train)
+    # Better than always predicting the base rate
+    base_rate = test.blue_win.mean()
+    base_log_loss = -(base_rate * np.log(base_rate) + (1 - base_rate) * np.log(1 - base_rate))
+    assert model.evaluate(test)["log_loss"] < base_log_loss
+
+
+def test_incremental_fit_keeps_history():
+    rng = np.random.default_rng(3)
+    strengths = rng.normal(0, 0.5, 20)
+    first, second = synthetic_matches(rng, strengths, 3000), synthetic_matches(rng, strengths, 500)
+
+    model = WinOddsModel().fit(first)
+    before = model.coefficients.copy()
+    model.fit(second, incremental=True)
+
+    assert model.games.sum() == 10 * (len(first) + len(second))
+    # Pulled towards the previous model rather than refitted from scratch
+    assert np.abs(model.coefficients - before).max() < 0.5
+
+
+def test_unknown_champions_are_neutral():
+    model = WinOddsModel(champion_ids=[1, 2], coefficients=[1.0, -1.0], intercept=0.0)
+    p = model.predict(np.array([[1, 999, 0, 0, 0]]), np.array([[2, 0, 0, 0, 0]]))
+    assert np.allclose(p, 1 / (1 + np.exp(-2.0)))
@@ -0,0 +1,43 @@
+from shared_code import puuids
+from shared_code.identity_index import IdentityIndex
+from shared_code.rate_limiter import RiotRateLimiter
+
+
+class Response:
+    status_code = 200
+
+    def __init__(self, url):
+        self.summoner_id = url.rsplit("/", 1)[1]
+
+    def json(self):
+        return {"puuid": f"puuid-{self.summoner_id}"}
+
+
+def test_fetch_stops_at_the_deadline_including_rate_limit_waits(tmp_path, monkeypatch):
+    now = [0.0]
+    limiter = RiotRateLimiter([(3, 120)], clock=lambda: now[0], sleep=lambda seconds: None)
+
+    def get(url, region, method):
+        limiter.acquire(region, method)
+        now[0] += 1
+        return Response(url)
+
+    monkeypatch.setattr(puuids, "identity_index", IdentityIndex(str(tmp_path / "identity_index.bin")))
+    monkeypatch.setattr(puuids.riot_client, "limiter", limiter)
+    monkeypatch.setattr(puuids.riot_client, "get", get)
+    monkeypatch.setattr(puuids.time, "monotonic", lambda: now[0])
+
+    rows, failures = puuids.fetch_puuids("euw1", [f"s{i}" for i in range(10)], deadline=60)
+
+    # The fourth call would wait ~117s for the window, past the deadline
+    assert [summoner_id for _, summoner_id, _ in rows] == ["s0", "s1", "s2"]
+    assert failures == []
+
+
+def test_fetch_without_deadline_fetches_everything(tmp_path, monkeypatch):
+    monkeypatch.setattr(puuids, "identity_index", IdentityIndex(str(tmp_path / "identity_index.bin")))
+    monkeypatch.setattr(puuids.riot_client, "get", lambda url, region, method: Response(url))
+
+    rows, _ = puuids.fetch_puuids("euw1", ["s1", "s2"])
+
+    assert len(rows) == 2
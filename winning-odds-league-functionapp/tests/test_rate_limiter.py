@@ -0,0 +1,86 @@
+from shared_code.rate_limiter import RiotRateLimiter, parse_rate_limit_header
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Response:
+    def __init__(self, status_code=200, **headers):
+        self.status_code = status_code
+        self.headers = {name.replace("_", "-"): value for name, value in headers.items()}
+
+
+def make_limiter(limits):
+    clock = FakeClock()
+    return RiotRateLimiter(limits, clock=clock, sleep=clock.sleep), clock
+
+
+def test_parse_rate_limit_header():
+    assert parse_rate_limit_header("20:1,100:120") == [(20, 1), (100, 120)]
+    assert parse_rate_limit_header("20:1,bogus") == [(20, 1)]
+    assert parse_rate_limit_header(None) == []
+
+
+def test_waits_for_the_oldest_request_to_leave_the_window():
+    limiter, clock = make_limiter([(2, 1)])
+    limiter.acquire("euw1", "m")
+    clock.now += 0.25
+    limiter.acquire("euw1", "m")
+    assert clock.sleeps == []
+
+    limiter.acquire("euw1", "m")
+    assert clock.sleeps == [0.75]
+    # Regions have separate budgets
+    limiter.acquire("kr", "m")
+    assert clock.sleeps == [0.75]
+
+
+def test_longest_window_applies():
+    limiter, clock = make_limiter([(5, 1), (6, 10)])
+    for _ in range(6):
+        limiter.acquire("euw1", "m")
+        clock.now += 0.5
+    limiter.acquire("euw1", "m")
+    # The first request was 3s ago; the 10s window holds the seventh back
+    assert clock.sleeps == [7.0]
+
+
+def test_learns_limits_and_counts_from_headers():
+    limiter, clock = make_limiter([(100, 1)])
+    limiter.acquire("euw1", "m")
+    # Other instances sharing the key already used 3 of 3
+    limiter.update("euw1", "m", Response(X_App_Rate_Limit="3:1", X_App_Rate_Limit_Count="3:1"))
+    assert limiter.headroom("euw1") == 0
+
+    limiter.acquire("euw1", "m")
+    assert clock.sleeps == [1.0]
+
+
+def test_method_limit_only_blocks_its_method():
+    limiter, clock = make_limiter([(100, 1)])
+    limiter.acquire("euw1", "a")
+    limiter.update("euw1", "a", Response(429, Retry_After="5", X_Rate_Limit_Type="method"))
+
+    limiter.acquire("euw1", "b")
+    assert clock.sleeps == []
+    limiter.acquire("euw1", "a")
+    assert clock.sleeps == [5.0]
+
+
+def test_application_limit_blocks_the_region():
+    limiter, clock = make_limiter([(100, 1)])
+    limiter.acquire("euw1", "a")
+    limiter.update("euw1", "a", Response(429, Retry_After="2", X_Rate_Limit_Type="application"))
+
+    limiter.acquire("euw1", "b")
+    assert clock.sleeps == [2.0]
@@ -0,0 +1,76 @@
+import math
+import os
+
+import pytest
+import requests
+
+from shared_code import response_cache
+from shared_code.response_cache import ResponseCache
+
+URL = "https://euw1.api.riotgames.com/lol/league/v4/challengerleagues/by-queue/RANKED_SOLO_5x5"
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(response_cache.time, "time", fake.time)
+    return fake
+
+
+def make_response(content):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+
+def test_round_trip(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    cache.put(URL, {"page": 1}, "league-v4.challengerleagues", make_response(b'{"entries": []}'))
+
+    cached = cache.get(URL, {"page": 1})
+    assert cached.status_code == 200
+    assert cached.json() == {"entries": []}
+    assert cached.headers["Content-Type"] == "application/json"
+    assert cache.get(URL, {"page": 2}) is None
+
+
+def test_entries_expire_after_their_endpoint_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttls={"league-v4": 300, "summoner-v4": math.inf})
+    cache.put(URL, None, "league-v4.challengerleagues", make_response(b"ladder"))
+    cache.put("https://euw1/summoner", None, "summoner-v4.by-id", make_response(b"summoner"))
+    cache.put("https://europe/match", None, "match-v5.matches", make_response(b"match"))
+
+    clock.now += 299
+    assert cache.get(URL) is not None
+    clock.now += 2
+    assert cache.get(URL) is None
+    clock.now += 10 ** 9
+    assert cache.get("https://euw1/summoner").content == b"summoner"
+    # Endpoints without a TTL are never stored
+    assert cache.get("https://europe/match") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    # Incompressible bodies, so each entry takes ~1000 bytes
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=2500, ttls={"summoner-v4": math.inf})
+    for name in ("a", "b"):
+        cache.put(f"https://euw1/{name}", None, "summoner-v4.by-id", make_response(os.urandom(1000)))
+        clock.now += 1
+    assert cache.get("https://euw1/a") is not None
+    clock.now += 1
+
+    cache.put("https://euw1/c", None, "summoner-v4.by-id", make_response(os.urandom(1000)))
+
+    assert cache.get("https://euw1/b") is None
+    assert cache.get("https://euw1/a") is not None
+    assert cache.get("https://euw1/c") is not None
@@ -0,0 +1,134 @@
+import pytest
+import requests
+
+from shared_code import runtime
+from shared_code.rate_limiter import RiotRateLimiter
+from shared_code.riot_client import RiotClient
+
+URL = "https://euw1.api.riotgames.com/lol/league/v4/challengerleagues/by-queue/RANKED_SOLO_5x5"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Response:
+    def __init__(self, status_code=200, **headers):
+        self.status_code = status_code
+        self.headers = {name.replace("_", "-"): value for name, value in headers.items()}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    """Plays back scripted responses, raising exceptions and calling callables."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        self.requests.append(headers)
+        outcome = self.script.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome() if callable(outcome) else outcome
+
+
+def make_client(*script):
+    clock = FakeClock()
+    backoffs = []
+    client = RiotClient(limiter=RiotRateLimiter(clock=clock, sleep=clock.sleep), sleep=backoffs.append,
+                        base_url=None, cache=None)
+    session = FakeSession(*script)
+    client.sessions["euw1.api.riotgames.com"] = session
+    return client, session, clock, backoffs
+
+
+@pytest.fixture
+def api_key(monkeypatch):
+    # Read the key from the environment instead of Key Vault
+    monkeypatch.setattr(runtime, "SECRETS_FROM_ENV", True)
+    monkeypatch.setenv("RiotApiKey", "old-key")
+    runtime.invalidate_secrets("RiotApiKey")
+    yield monkeypatch
+    runtime.invalidate_secrets("RiotApiKey")
+
+
+def test_429_is_replayed_after_retry_after():
+    throttled = Response(429, Retry_After="2", X_Rate_Limit_Type="method")
+    client, session, clock, backoffs = make_client(throttled, Response(200))
+
+    response = client.get(URL, "euw1", "league-v4", headers={})
+
+    assert response.status_code == 200
+    assert throttled.closed
+    # The limiter waited out Retry-After; no extra backoff on top of it
+    assert clock.sleeps == [2.0]
+    assert backoffs == []
+
+
+def test_5xx_backs_off_until_success():
+    client, session, clock, backoffs = make_client(Response(503), Response(502), Response(200))
+
+    assert client.get(URL, "euw1", "league-v4", headers={}).status_code == 200
+    assert len(session.requests) == 3
+    assert len(backoffs) == 2
+    assert all(0 <= delay <= client.backoff_cap for delay in backoffs)
+
+
+def test_5xx_is_returned_after_max_retries():
+    client, session, clock, backoffs = make_client(*[Response(503) for _ in range(4)])
+
+    assert client.get(URL, "euw1", "league-v4", headers={}).status_code == 503
+    assert len(session.requests) == client.max_retries + 1
+    assert len(backoffs) == client.max_retries
+
+
+def test_connection_errors_are_retried_then_raised():
+    client, session, clock, backoffs = make_client(requests.ConnectionError("reset"), Response(200))
+    assert client.get(URL, "euw1", "league-v4", headers={}).status_code == 200
+    assert len(backoffs) == 1
+
+    client, session, clock, backoffs = make_client(*[requests.Timeout("slow") for _ in range(4)])
+    with pytest.raises(requests.Timeout):
+        client.get(URL, "euw1", "league-v4", headers={})
+    assert len(backoffs) == client.max_retries
+
+
+def test_401_refreshes_the_api_key_once(api_key):
+    def rotated():
+        # The key was rotated in Key Vault after the old one was cached
+        api_key.setenv("RiotApiKey", "new-key")
+        return Response(401)
+
+    client, session, clock, backoffs = make_client(rotated, Response(200))
+
+    assert client.get(URL, "euw1", "league-v4").status_code == 200
+    assert [headers["X-Riot-Token"] for headers in session.requests] == ["old-key", "new-key"]
+    assert backoffs == []
+
+
+def test_repeated_401_is_returned(api_key):
+    client, session, clock, backoffs = make_client(Response(403), Response(403))
+
+    assert client.get(URL, "euw1", "league-v4").status_code == 403
+    assert len(session.requests) == 2
+
+
+def test_explicit_headers_skip_the_key_refresh(api_key):
+    client, session, clock, backoffs = make_client(Response(401))
+
+    assert client.get(URL, "euw1", "league-v4", headers={"X-Riot-Token": "caller-key"}).status_code == 401
+    assert len(session.requests) == 1
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta, timezone
+
+from shared_code.scheduler import MAX_IDLE_SECONDS, build_refresh_queue, refresh_priority
+
+NOW = datetime(2026, 10, 16, 12, 0, tzinfo=timezone.utc)
+
+
+def test_unchanged_players_wait_until_idle():
+    recently = NOW - timedelta(hours=1)
+    assert refresh_priority(100, 100, recently, NOW) is None
+    assert refresh_priority(100, 100, NOW - timedelta(seconds=MAX_IDLE_SECONDS + 1), NOW) is not None
+    # Naive timestamps from SQL are UTC
+    assert refresh_priority(101, 100, recently.replace(tzinfo=None), NOW) == refresh_priority(101, 100, recently, NOW)
+
+
+def test_queue_order_and_limit():
+    hour_ago = NOW - timedelta(hours=1)
+    candidates = [
+        ("idle", 50, 50, hour_ago),
+        ("one game", 51, 50, hour_ago),
+        ("never synced", 10, None, None),
+        ("five games", 55, 50, hour_ago),
+        ("also one game", 51, 50, hour_ago),
+    ]
+    queue = build_refresh_queue(candidates, limit=3, now=NOW)
+    # Ties keep the input order
+    assert queue == ["never synced", "five games", "one game"]
+    assert build_refresh_queue(candidates, limit=10, now=NOW) == ["never synced", "five games", "one game", "also one game"]
+
+
+def test_staleness_breaks_ties_between_equal_game_counts():
+    candidates = [
+        ("synced yesterday", 51, 50, NOW - timedelta(days=1)),
+        ("synced last week", 51, 50, NOW - timedelta(days=6)),
+    ]
+    assert build_refresh_queue(candidates, limit=2, now=NOW) == ["synced last week", "synced yesterday"]
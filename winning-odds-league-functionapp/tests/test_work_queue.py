@@ -0,0 +1,64 @@
+import json
+import sys
+import threading
+import types
+
+from shared_code.work_queue import (
+    PUUID_WORK_QUEUE,
+    QUEUE_FUNCTIONS,
+    SqliteWorkQueue,
+    drain_local_queue,
+    run_local_queue,
+)
+
+
+def test_drain_retries_failed_items(tmp_path):
+    queue = SqliteWorkQueue("work", path=str(tmp_path / "queue.db"))
+    queue.send_many([{"n": n} for n in range(10)])
+    seen = []
+    lock = threading.Lock()
+
+    def handler(msg):
+        item = json.loads(msg.get_body().decode("utf-8"))
+        with lock:
+            seen.append((item["n"], msg.dequeue_count))
+        if item["n"] == 3 and msg.dequeue_count == 1:
+            raise RuntimeError("transient")
+
+    drain_local_queue(queue, handler, workers=3, visibility_timeout=0.05)
+
+    assert queue.count() == 0
+    assert sorted({n for n, _ in seen}) == list(range(10))
+    assert (3, 2) in seen
+
+
+def test_drain_poisons_after_max_dequeue_count(tmp_path):
+    queue = SqliteWorkQueue("work", path=str(tmp_path / "queue.db"), max_dequeue_count=2)
+    queue.send_many([{"n": 1}])
+    attempts = []
+
+    def handler(msg):
+        attempts.append(msg.dequeue_count)
+        raise RuntimeError("permanent")
+
+    drain_local_queue(queue, handler, workers=1, visibility_timeout=0.05)
+
+    assert attempts == [1, 2]
+    assert queue.count() == 0
+    assert queue.count("work-poison") == 1
+
+
+def test_run_local_queue_calls_the_queue_function(tmp_path, monkeypatch):
+    monkeypatch.setenv("WORK_QUEUE_SQLITE_PATH", str(tmp_path / "queue.db"))
+    items = [{"region": "euw1", "summoner_ids": [f"s{i}"]} for i in range(5)]
+    SqliteWorkQueue(PUUID_WORK_QUEUE).send_many(items)
+
+    received = []
+    function = types.ModuleType(QUEUE_FUNCTIONS[PUUID_WORK_QUEUE])
+    function.main = lambda msg: received.append(json.loads(msg.get_body().decode("utf-8")))
+    monkeypatch.setitem(sys.modules, function.__name__, function)
+
+    run_local_queue(PUUID_WORK_QUEUE, workers=2, visibility_timeout=0.05)
+
+    assert sorted(received, key=lambda item: item["summoner_ids"]) == items
+    assert SqliteWorkQueue(PUUID_WORK_QUEUE).count() == 0